@@ -1,117 +1,558 @@
-from flask import Flask, render_template, session, jsonify, request
+from flask import (Blueprint, Flask, Response, current_app, render_template, session, jsonify, request,
+                   stream_with_context)
 from flask_restful import Resource, Api, reqparse
-from model import get_rand_question, Question, db
+from model import (get_questions_version, init_db, on_questions_changed, questions_changed,
+                   default_database_uri, Question, QuestionRecord, PERMUTATIONS, db)
+from search import search_questions  # registers the FTS5 index DDL, so it must be imported before init_db()
+from game_state import create_game_state_store
+from page_cache import CachedPage, LRUCache
+from payloads import EncodedQuestion, json_response
+from changes import ChangeNotifier, last_seq
+import payloads
+from markupsafe import Markup
+from sqlalchemy.exc import IntegrityError
+import functools
+import io
 import os
+import random
 
-app = Flask(__name__)
-api = Api(app)
-app.secret_key = 'super_secret_key_for_millionaire_game'  # Required for session
+# Routes are registered on this blueprint; create_app() builds the app around it
+bp = Blueprint('millionaire', __name__)
+api = Api(bp)
 
-# Database Configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'millionaire.sqlite3')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db.init_app(app)
-
-# questions = read_questions(QUESTIONS_FILE) REMOVED
-
-
-@app.route('/')
+def create_app(config=None):
+    """Application factory: the defaults below (many from the environment), overridden by `config`."""
+    app = Flask(__name__)
+    app.secret_key = 'super_secret_key_for_millionaire_game'  # Required for session
+
+    # Database Configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = default_database_uri()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Game state lives on the server; the session cookie only carries the game id.
+    # 'memory' keeps games in this process, 'sqlite:///<path>' shares them between workers.
+    app.config['GAME_STATE_STORE'] = os.environ.get('GAME_STATE_STORE', 'memory')
+    app.config['GAME_STATE_TTL'] = 3600  # seconds until an abandoned game is evicted
+
+    # Bounded connection pool: at most DB_POOL_SIZE concurrent DB connections per process,
+    # further requests wait up to pool_timeout seconds for a free one
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': 0,
+        'pool_timeout': 30,
+    }
+
+    # Extra question banks, played with /api/start?bank=<name>. Each one is a separate SQLite file,
+    # opened read-only on first use and closed again after QUESTION_BANK_IDLE_TIMEOUT seconds without games.
+    app.config['QUESTION_BANKS'] = {
+        'classic': os.path.join(basedir, 'SQLAlchemy Millionaire', 'millionaire.sqlite3'),
+        'open_day': os.path.join(basedir, 'SQLAlchemy Millionaire', 'millionaire2_fragen_tag_der_offenen_tuer.sqlite3'),
+    }
+    app.config['QUESTION_BANKS_DIR'] = os.environ.get('QUESTION_BANKS_DIR')  # each <name>.sqlite3 in it is a bank too
+    app.config['QUESTION_BANK_IDLE_TIMEOUT'] = 600  # seconds
+    app.config['QUESTION_BANK_MAX_OPEN'] = 32
+
+    # Size limits of the rendered /questions page cache and the game page's question fragments
+    app.config['PAGE_CACHE_MAX_BYTES'] = 32 * 1024 * 1024
+    app.config['FRAGMENT_CACHE_MAX_BYTES'] = 16 * 1024 * 1024
+
+    # Question JSON is encoded once per question and cached (see payloads.py), up to PAYLOAD_CACHE_MAX_BYTES.
+    # JSON_ENCODER: 'orjson', 'json' or 'auto' (orjson if installed)
+    app.config['PAYLOAD_CACHE_MAX_BYTES'] = 16 * 1024 * 1024
+    app.config['JSON_ENCODER'] = os.environ.get('JSON_ENCODER', 'auto')
+
+    # Finished games are queued and written in batches of up to RESULTS_BATCH_SIZE rows by a
+    # background thread, at least every RESULTS_FLUSH_INTERVAL seconds; /api/leaderboard keeps
+    # the best LEADERBOARD_SIZE results per question bank in memory
+    app.config['RESULTS_BATCH_SIZE'] = 500
+    app.config['RESULTS_FLUSH_INTERVAL'] = 1.0
+    app.config['LEADERBOARD_SIZE'] = 100
+
+    # Per-question shown/answered/correct counters of the app's database, written every
+    # ANSWER_STATS_FLUSH_INTERVAL seconds. Every CALIBRATION_INTERVAL seconds (0: never) they are
+    # turned into difficulty estimates; CALIBRATION_REBUCKET=1 also moves questions with at least
+    # CALIBRATION_MIN_ANSWERS answers to the level matching their difficulty (see calibration.py).
+    app.config['ANSWER_STATS_FLUSH_INTERVAL'] = 5.0
+    app.config['CALIBRATION_INTERVAL'] = int(os.environ.get('CALIBRATION_INTERVAL', 3600))
+    app.config['CALIBRATION_REBUCKET'] = os.environ.get('CALIBRATION_REBUCKET') == '1'
+    app.config['CALIBRATION_MIN_ANSWERS'] = 30
+
+    # /admin/stats is built from the hourly rollup tables and rebuilt at most every STATS_REFRESH_INTERVAL
+    # seconds (0: on the next view), only if games or answers were flushed or questions changed since;
+    # the games-per-hour chart covers the last STATS_HOURS hours (see dashboard.py)
+    app.config['STATS_REFRESH_INTERVAL'] = int(os.environ.get('STATS_REFRESH_INTERVAL', 60))
+    app.config['STATS_HOURS'] = 48
+
+    # Every CHANGES_POLL_INTERVAL seconds (0: never) the question change log is checked for writes of
+    # other processes, which are then applied to this process's pool and caches; log entries older
+    # than CHANGE_LOG_RETENTION seconds are pruned (see changes.py)
+    app.config['CHANGES_POLL_INTERVAL'] = float(os.environ.get('CHANGES_POLL_INTERVAL', 2))
+    app.config['CHANGE_LOG_RETENTION'] = 7 * 24 * 3600
+
+    # Live show mode (see show.py): questions are pushed to the Socket.IO namespace '/show' when run by
+    # server.py and, if MQTT_BROKER_URL is set, to MQTT topics under MQTT_SHOW_TOPIC
+    app.config['MQTT_BROKER_URL'] = os.environ.get('MQTT_BROKER_URL')
+    app.config['MQTT_BROKER_PORT'] = int(os.environ.get('MQTT_BROKER_PORT', 1883))
+    app.config['MQTT_SHOW_TOPIC'] = 'millionaire/show'
+    app.config['SHOW_TTL'] = 3600  # seconds after the host's last action until a show is dropped
+
+    # Seed for question draws and answer orders; set SHUFFLE_SEED to replay the same games (e.g. in tests)
+    app.config['SHUFFLE_SEED'] = os.environ.get('SHUFFLE_SEED')
+
+    # Seconds between background `PRAGMA optimize` runs (0 disables them)
+    app.config['DB_OPTIMIZE_INTERVAL'] = int(os.environ.get('DB_OPTIMIZE_INTERVAL', 3600))
+
+    # Opt-in profiling: per-endpoint timings, SQL and template metrics on /metrics
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED') == '1'
+    app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # share of requests run under cProfile
+    app.config['PROFILE_SLOW_MS'] = 500  # sampled requests slower than this are dumped to PROFILE_DIR
+    app.config['PROFILE_DIR'] = os.path.join(basedir, 'profiles')
+
+    app.config.update(config or {})
+
+    db.init_app(app)
+    init_db(app)
+    if app.config['METRICS_ENABLED']:
+        from instrumentation import init_instrumentation
+        init_instrumentation(app, db)
+    app.extensions['millionaire'] = Services(app)
+    app.register_blueprint(bp)
+    return app
+
+
+class Services:
+    """The app's question pool, caches, stores and background workers; see services()."""
+
+    def __init__(self, app):
+        from banks import QuestionBankRegistry
+        from calibration import AnswerCounters
+        from dashboard import StatsDashboard
+        from question_pool import QuestionPool
+        from results import ResultLog
+        from show import ShowRegistry
+
+        config = app.config
+        with app.app_context():
+            engine = db.engine
+        self.optimizer = self.calibrator = self.change_follower = None
+        if config['DB_OPTIMIZE_INTERVAL']:
+            from schema import start_optimizer
+            self.optimizer = start_optimizer(engine, config['DB_OPTIMIZE_INTERVAL'])
+
+        self.shuffle_rng = random.Random(config['SHUFFLE_SEED'])
+        self.game_store = create_game_state_store(config['GAME_STATE_STORE'], ttl=config['GAME_STATE_TTL'])
+        self.question_pool = QuestionPool(engine)
+        self.question_banks = QuestionBankRegistry(self.question_pool, config['QUESTION_BANKS'],
+                                                   config['QUESTION_BANKS_DIR'],
+                                                   idle_timeout=config['QUESTION_BANK_IDLE_TIMEOUT'],
+                                                   max_open=config['QUESTION_BANK_MAX_OPEN'])
+        # (page name, table version) -> CachedPage
+        self.page_cache = LRUCache(config['PAGE_CACHE_MAX_BYTES'])
+        # (bank, question id, permutation) -> rendered question_body.html
+        self.fragment_cache = LRUCache(config['FRAGMENT_CACHE_MAX_BYTES'])
+        # (bank, question id) -> EncodedQuestion
+        self.payload_cache = LRUCache(config['PAYLOAD_CACHE_MAX_BYTES'])
+        payloads.use_encoder(config['JSON_ENCODER'])
+        # Wakes the SSE change streams on every questions_changed()
+        self.change_notifier = ChangeNotifier()
+        on_questions_changed(app, self.question_pool.apply_changes)
+        on_questions_changed(app, self.invalidate_rendered)
+        on_questions_changed(app, self.change_notifier)
+        notify = functools.partial(questions_changed, app=app)
+
+        self.results_log = ResultLog(engine, leaderboard_size=config['LEADERBOARD_SIZE'],
+                                     batch_size=config['RESULTS_BATCH_SIZE'],
+                                     flush_interval=config['RESULTS_FLUSH_INTERVAL'])
+        self.results_log.load()
+        self.results_log.start()
+
+        self.answer_counters = AnswerCounters(engine, config['ANSWER_STATS_FLUSH_INTERVAL'])
+        if config['CALIBRATION_INTERVAL']:
+            from calibration import start_calibration
+            self.calibrator = start_calibration(engine, config['CALIBRATION_INTERVAL'], self.answer_counters,
+                                                config['CALIBRATION_REBUCKET'], config['CALIBRATION_MIN_ANSWERS'],
+                                                notify)
+        self.answer_counters.start()
+
+        self.stats_dashboard = StatsDashboard(engine, (self.results_log, self.answer_counters),
+                                              interval=config['STATS_REFRESH_INTERVAL'],
+                                              hours=config['STATS_HOURS'],
+                                              min_answers=config['CALIBRATION_MIN_ANSWERS'])
+        if config['STATS_REFRESH_INTERVAL']:
+            self.stats_dashboard.start()
+
+        if config['CHANGES_POLL_INTERVAL']:
+            from changes import ChangeFollower
+            self.change_follower = ChangeFollower(engine, notify, config['CHANGES_POLL_INTERVAL'],
+                                                  config['CHANGE_LOG_RETENTION'])
+            self.change_follower.start()
+
+        self.shows = ShowRegistry(ttl=config['SHOW_TTL'])
+        if config['MQTT_BROKER_URL']:
+            from show import init_mqtt
+            init_mqtt(app, self.shows)
+
+    def invalidate_rendered(self, updated, deleted):
+        """
+        Drops cached HTML and JSON of changed questions. Pages are keyed by table
+        version, so for them this only frees memory early.
+        """
+        self.page_cache.clear()
+        if not updated and not deleted:
+            self.fragment_cache.clear()
+            self.payload_cache.clear()
+            return
+        for question_id in [question.id for question in updated] + list(deleted):
+            self.payload_cache.discard((None, question_id))
+            for permutation in range(len(PERMUTATIONS)):
+                self.fragment_cache.discard((None, question_id, permutation))
+
+    def close(self):
+        """Stops the background workers and writes what the result log and answer counters still hold."""
+        for worker in (self.optimizer, self.calibrator, self.change_follower, self.stats_dashboard,
+                       self.answer_counters, self.results_log):
+            if worker is not None:
+                worker.close()
+        self.question_banks.close()
+
+
+def services():
+    """The Services of the app handling the current request."""
+    return current_app.extensions['millionaire']
+
+
+def __getattr__(name):
+    # `from app import app` (WSGI servers, older scripts) builds the default app on first use
+    if name == 'app':
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+# Upper bound for ?limit= on the question listing
+MAX_PAGE_SIZE = 1000
+# Upper bound for the id list of PATCH/DELETE /api/questions (SQLite binds each id as a parameter)
+MAX_BULK_IDS = 10_000
+# Ids of matching questions listed in a dry run's reply
+DRY_RUN_SAMPLE = 20
+# Rows fetched per round-trip while streaming the listing
+STREAM_BATCH_SIZE = 1000
+
+
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/game')
-@app.route('/game/<int:answer>')
-def game(answer=-1):
-    # Initialize session if not present
-    if 'level' not in session:
-        session['level'] = 0
-        session['score'] = 0
+def current_game():
+    """Returns the GameState referenced by the session cookie, or None."""
+    game_id = session.get('game_id')
+    if game_id is None:
+        return None
+    return services().game_store.get(game_id)
+
+
+def start_deck(bank):
+    """
+    (deck seed, cursors) for a new game: the deck of the session's previous
+    game on the same bank, so restarts keep dealing unseen questions, else a
+    fresh one. See GameState.deck_seed.
+    """
+    deck = session.get('deck')
+    if deck and deck['bank'] == bank:
+        return deck['seed'], list(deck['cursors'])
+    return services().shuffle_rng.getrandbits(63), []
+
+
+def new_game(bank=None):
+    state = services().game_store.create(bank, *start_deck(bank))
+    session['game_id'] = state.game_id
+    return state
+
+
+def discard_game(state):
+    """Drops a finished or restarted game; its deck stays in the session for the next one."""
+    session['deck'] = {'bank': state.bank, 'seed': state.deck_seed, 'cursors': state.cursors}
+    services().game_store.delete(state.game_id)
+
+
+def end_game(state, won):
+    """Ends the game and logs its result (written to the database later, see results.py)."""
+    discard_game(state)
+    session.pop('game_id', None)
+    services().results_log.record(state.score, state.level, won, state.bank)
+
+
+def grade_answer(state, answer):
+    """
+    Checks an answer against the active question and updates the state.
+    The question is consumed either way, so a replayed request cannot be
+    graded twice. Returns True/False, or None if no question is active.
+    """
+    if state.correct_index is None:
+        return None
+    correct = answer == state.correct_index
+    if state.bank is None:
+        services().answer_counters.answered(state.question_id, correct, state.level)
+    state.correct_index = None
+    state.question_id = None
+    if correct:
+        state.level += 1
+        state.score += 100 * state.level  # Simple scoring
+    else:
+        state.next_correct_index = None
+        state.next_question_id = None
+    return correct
+
+
+def draw_question(state, level):
+    """Deals the next question of `level` from the game's deck: no repeats until the level is used up."""
+    bank = services().question_banks.get(state.bank)
+    return bank.get_nth(level, state.deck_seed, state.next_position(level), services().shuffle_rng)
+
+
+def ask_question(state):
+    """Draws a question for the state's level and remembers where its correct answer is."""
+    q = draw_question(state, state.level)
+    state.next_correct_index = None
+    state.next_question_id = None
+    if q:
+        # The answer order is a permutation index, so the correct position is a table lookup
+        state.correct_index = q.correct_index
+        state.question_id = q.id
+        if state.bank is None:
+            services().answer_counters.shown(q.id)
+    services().game_store.save(state)
+    return q
+
+
+def prefetch_question(state):
+    """
+    Draws the question for the next level ahead of time. Its correct index
+    stays on the server and only becomes active once the current question
+    was answered correctly.
+    """
+    q = draw_question(state, state.level + 1)
+    if q:
+        state.next_correct_index = q.correct_index
+        state.next_question_id = q.id
+    return q
+
+
+def promote_prefetched(state):
+    """Makes the prefetched question the active one. Returns False if there is none."""
+    if state.next_correct_index is None:
+        return False
+    state.correct_index, state.question_id = state.next_correct_index, state.next_question_id
+    state.next_correct_index = state.next_question_id = None
+    if state.bank is None:
+        services().answer_counters.shown(state.question_id)
+    return True
+
+
+def encoded_question(bank, q):
+    """The question's JSON parts, encoded once (see payloads.py)."""
+    key = (bank, q.id)
+    encoded = services().payload_cache.get(key)
+    if encoded is None:
+        encoded = EncodedQuestion(q)
+        services().payload_cache.put(key, encoded)
+    return encoded
+
+
+def question_payload(q):
+    return {
+        'text': q.text,
+        'answers': q.answers,
+        'level': q.level
+    }
 
-    current_level = session['level']
+
+@bp.route('/game')
+@bp.route('/game/<int:answer>')
+def game(answer=-1):
+    state = current_game() or new_game()
 
     # Check answer if provided
     if answer != -1:
-        # Retrieve stored correct answer index from session
-        correct_index = session.get('correct_index')
-
-        if correct_index is not None:
-            if answer == correct_index:
-                # Correct answer
-                session['level'] += 1
-                session['score'] = session.get('score', 0) + 100 * (session['level']) # Simple scoring
-                current_level = session['level']
-            else:
-                # Wrong answer - Game Over or Reset
-                final_score = session['score']
-                session.pop('level', None)
-                session.pop('score', None)
-                session.pop('correct_index', None)
-                return render_template('game_over.html', score=final_score)
-
+        correct = grade_answer(state, answer)
+        if correct is False:
+            # Wrong answer - Game Over
+            end_game(state, won=False)
+            return render_template('game_over.html', score=state.score)
 
     # Get a random question for the current level
-    q = get_rand_question(current_level)
+    q = ask_question(state)
 
     if not q:
-        # No more questions for this level (Win?)
+        # No more questions for this level (Win)
+        end_game(state, won=True)
+        return render_template('win.html', score=state.score)
 
-        final_score = session.get('score', 0)
-        session.pop('level', None)
-        session.pop('score', None)
-        return render_template('win.html', score=final_score)
+    return render_template('game.html', question_body=question_body(state.bank, q),
+                           level=state.level, score=state.score)
 
-    # Store the correct answer index in session
-    # q.answers is shuffled. We need to find where q.correct_answer is.
-    correct_index = q.answers.index(q.correct_answer)
-    session['correct_index'] = correct_index
 
-    return render_template('game.html', question=q, level=current_level, score=session.get('score', 0))
+def question_body(bank, q):
+    """Question text and answer buttons, rendered once per question and answer order."""
+    key = (bank, q.id, q.permutation)  # ask_question() has drawn the permutation
+    body = services().fragment_cache.get(key)
+    if body is None:
+        body = Markup(render_template('question_body.html', question=q))
+        services().fragment_cache.put(key, body)
+    return body
 
-@app.route('/questions')
-def all_questions():
-    questions = Question.query.all()
-    return render_template('questions.html', questions=questions)
 
-@app.route('/react')
+@bp.route('/questions')
+def all_questions():
+    # Keyed by table version, so writes from other processes are picked up too
+    version = get_questions_version()
+    page = services().page_cache.get(('questions', version))
+    if page is None:
+        questions = Question.query.all()
+        page = CachedPage(render_template('questions.html', questions=questions), f'questions-{version}')
+        services().page_cache.put(('questions', version), page)
+    return page.response(request)
+
+@bp.route('/admin/stats')
+def admin_stats():
+    """Dashboard of questions per level, answer accuracy and games per hour, served from the last rollup build."""
+    snapshot = services().stats_dashboard.snapshot()
+    page = services().page_cache.get(('admin_stats', snapshot.etag))
+    if page is None:
+        # '</' escaped so the JSON cannot close the script element it is embedded in
+        figures = Markup(snapshot.figures.decode('utf-8').replace('</', '<\\/'))
+        page = CachedPage(render_template('admin_stats.html', snapshot=snapshot, figures=figures,
+                                          refresh=services().stats_dashboard.interval), f'admin-stats-{snapshot.etag}')
+        services().page_cache.put(('admin_stats', snapshot.etag), page)
+    return page.response(request)
+
+@bp.route('/admin/stats.json')
+def admin_stats_json():
+    """The dashboard's plotly figures as JSON, by chart name."""
+    snapshot = services().stats_dashboard.snapshot()
+    page = services().page_cache.get(('admin_stats.json', snapshot.etag))
+    if page is None:
+        page = CachedPage(snapshot.figures, f'admin-stats-json-{snapshot.etag}', mimetype='application/json')
+        services().page_cache.put(('admin_stats.json', snapshot.etag), page)
+    return page.response(request)
+
+@bp.route('/react')
 def react_game():
     return render_template('react_game.html')
 
 # --- REST API ---
 
-@app.route('/api/start', methods=['POST'])
+@bp.route('/api/start', methods=['POST'])
 def api_start():
-    session['level'] = 0
-    session['score'] = 0
-    return jsonify({'status': 'started', 'level': 0, 'score': 0})
-
-@app.route('/api/question', methods=['GET'])
+    """Starts a new game; ?bank=<name> plays it from another question bank (see /api/banks)."""
+    bank = request.args.get('bank')
+    if bank not in services().question_banks:
+        return jsonify({'error': 'Unknown question bank'}), 404
+    state = current_game()
+    if state is not None:
+        discard_game(state)
+    new_game(bank)
+    return jsonify({'status': 'started', 'level': 0, 'score': 0, 'bank': bank})
+
+
+@bp.route('/api/banks', methods=['GET'])
+def api_banks():
+    banks = services().question_banks
+    return jsonify({'banks': banks.names(), 'open': banks.open_names()})
+
+@bp.route('/api/leaderboard', methods=['GET'])
+def api_leaderboard():
+    """
+    Best results and per-level pass rates of finished games, served from
+    in-memory aggregates. ?bank=<name> for another question bank, ?limit=
+    for the number of results (default 10, at most LEADERBOARD_SIZE).
+    """
+    bank = request.args.get('bank')
+    if bank not in services().question_banks:
+        return jsonify({'error': 'Unknown question bank'}), 404
+    limit = max(1, min(request.args.get('limit', default=10, type=int), services().results_log.leaderboard_size))
+    return jsonify(services().results_log.leaderboard(bank, limit))
+
+def host_show(show_id):
+    """The show `show_id` if the request carries its host token (X-Show-Token), else an error response."""
+    show = services().shows.get(show_id)
+    if show is None:
+        return None, (jsonify({'error': 'Unknown show'}), 404)
+    if request.headers.get('X-Show-Token') != show.host_token:
+        return None, (jsonify({'error': 'Not the host of this show'}), 403)
+    services().shows.touch(show)
+    return show, None
+
+@bp.route('/api/show', methods=['POST'])
+def api_show_start():
+    """Starts a live show (see show.py); ?bank=<name> plays it from another question bank. Returns the host token."""
+    bank = request.args.get('bank')
+    if bank not in services().question_banks:
+        return jsonify({'error': 'Unknown question bank'}), 404
+    show = services().shows.create(bank, services().shuffle_rng.getrandbits(63))
+    return jsonify({'show': show.show_id, 'host_token': show.host_token, 'bank': bank})
+
+@bp.route('/api/show/<show_id>', methods=['GET'])
+def api_show_status(show_id):
+    show = services().shows.get(show_id)
+    if show is None:
+        return jsonify({'error': 'Unknown show'}), 404
+    return jsonify(show.status())
+
+@bp.route('/api/show/<show_id>/next', methods=['POST'])
+def api_show_next(show_id):
+    """Host: closes the open round and broadcasts the next question (with its correct index for the host)."""
+    show, error = host_show(show_id)
+    if error:
+        return error
+    show_round = show.next_round(services().question_banks.get(show.bank_name), services().shuffle_rng)
+    if show_round is None:
+        return jsonify({'status': 'finished', 'leaderboard': show.leaderboard()})
+    return jsonify(dict(show_round.payload, correct_index=show_round.correct_index))
+
+@bp.route('/api/show/<show_id>/close', methods=['POST'])
+def api_show_close(show_id):
+    """Host: closes the open round and broadcasts its results."""
+    show, error = host_show(show_id)
+    if error:
+        return error
+    results = show.close_round()
+    if results is None:
+        return jsonify({'error': 'No open round'}), 400
+    return jsonify(results)
+
+@bp.route('/api/show/<show_id>', methods=['DELETE'])
+def api_show_end(show_id):
+    show, error = host_show(show_id)
+    if error:
+        return error
+    show.end()
+    services().shows.remove(show_id)
+    return jsonify({'status': 'ended', 'leaderboard': show.leaderboard()})
+
+@bp.route('/api/question', methods=['GET'])
 def api_question():
-    if 'level' not in session:
+    state = current_game()
+    if state is None:
         return jsonify({'error': 'Game not started'}), 400
 
-    current_level = session['level']
-    q = get_rand_question(current_level)
+    q = ask_question(state)
 
     if not q:
         # No more questions (Win)
-        return jsonify({'status': 'win', 'score': session.get('score', 0)})
-
-    # Store correct index
-    correct_index = q.answers.index(q.correct_answer)
-    session['correct_index'] = correct_index
+        end_game(state, won=True)
+        return jsonify({'status': 'win', 'score': state.score})
 
     # Return question data
-    return jsonify({
-        'text': q.text,
-        'answers': q.answers,
-        'level': q.level
-    })
+    return json_response(encoded_question(state.bank, q).game_json(q))
 
-@app.route('/api/answer', methods=['POST'])
+@bp.route('/api/answer', methods=['POST'])
 def api_answer():
-    if 'level' not in session:
+    state = current_game()
+    if state is None:
         return jsonify({'error': 'Game not started'}), 400
 
     data = request.get_json()
@@ -123,42 +564,287 @@ def api_answer():
     except ValueError:
         return jsonify({'error': 'Invalid answer_index'}), 400
 
-    correct_index = session.get('correct_index')
+    correct = grade_answer(state, answer_index)
 
-    if correct_index is None:
-         return jsonify({'error': 'No active question'}), 400
+    if correct is None:
+        return jsonify({'error': 'No active question'}), 400
 
-    if answer_index == correct_index:
-        session['level'] += 1
-        session['score'] = session.get('score', 0) + 100 * session['level']
+    if correct:
+        services().game_store.save(state)
         return jsonify({
             'correct': True,
-            'score': session['score'],
-            'level': session['level']
+            'score': state.score,
+            'level': state.level
         })
     else:
-        final_score = session['score']
-        session.pop('level', None)
-        session.pop('score', None)
-        session.pop('correct_index', None)
+        end_game(state, won=False)
         return jsonify({
             'correct': False,
             'game_over': True,
-            'score': final_score
+            'score': state.score
         })
 
-@app.route('/api/questions', methods=['GET'])
+def play_turn(state, data):
+    """
+    Grades data['answer_index'] (if given) and draws the next question.
+    Shared by POST /api/turn and the WebSocket game channel.
+    Returns (payload, HTTP status).
+    """
+    response = {'level': state.level, 'score': state.score}
+
+    if 'answer_index' in data:
+        try:
+            answer_index = int(data['answer_index'])
+        except (TypeError, ValueError):
+            return {'error': 'Invalid answer_index'}, 400
+
+        correct = grade_answer(state, answer_index)
+        if correct is None:
+            return {'error': 'No active question'}, 400
+        if not correct:
+            end_game(state, won=False)
+            return {'correct': False, 'game_over': True, 'score': state.score}, 200
+        response.update(correct=True, level=state.level, score=state.score)
+
+    if response.get('correct') and promote_prefetched(state):
+        response['use_prefetched'] = True
+    else:
+        q = ask_question(state)
+        if not q:
+            end_game(state, won=True)
+            response.update(status='win')
+            return response, 200
+        response['question'] = question_payload(q)
+
+    if data.get('prefetch'):
+        prefetched = prefetch_question(state)
+        if prefetched:
+            response['prefetched'] = question_payload(prefetched)
+    services().game_store.save(state)
+    return response, 200
+
+
+@bp.route('/api/turn', methods=['POST'])
+def api_turn():
+    """
+    One round-trip per level: grades an answer and returns the next question.
+
+    JSON body (all optional):
+        start:        true starts a new game (replaces /api/start)
+        bank:         question bank of the new game (with start)
+        answer_index: answer to the active question
+        prefetch:     true also returns the question for the following level
+                      as 'prefetched'. After answering it correctly the next
+                      turn activates it instead of drawing a new one and
+                      replies with 'use_prefetched': true instead of 'question'.
+    """
+    data = request.get_json(silent=True) or {}
+
+    if data.get('start'):
+        if data.get('bank') not in services().question_banks:
+            return jsonify({'error': 'Unknown question bank'}), 404
+        state = current_game()
+        if state is not None:
+            discard_game(state)
+        state = new_game(data.get('bank'))
+    else:
+        state = current_game()
+        if state is None:
+            return jsonify({'error': 'Game not started'}), 400
+
+    payload, status = play_turn(state, data)
+    return jsonify(payload), status
+
+
+def list_questions_response():
+    """
+    Shared implementation of GET /api/questions.
+
+    Query parameters:
+        after_id: only return questions with a larger id (keyset pagination)
+        limit:    page size (capped at MAX_PAGE_SIZE); the next cursor is sent
+                  in the X-Next-After-Id header when more rows may follow
+        format:   'ndjson' streams one JSON object per line
+                  (also chosen by 'Accept: application/x-ndjson')
+
+    The weak ETag comes from the table version (answers are shuffled per response).
+    """
+    after_id = request.args.get('after_id', type=int)
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+    ndjson = (request.args.get('format') == 'ndjson'
+              or request.accept_mimetypes.best == 'application/x-ndjson')
+
+    etag = f"q{get_questions_version()}-{after_id}-{limit}-{'ndjson' if ndjson else 'json'}"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+
+    # Read before the rows: changes after this seq may already be in the listing, and replaying them is harmless
+    changes_seq = last_seq(db.session.connection())
+    columns = [getattr(Question, field) for field in QuestionRecord.FIELDS]
+    query = db.select(*columns).order_by(Question.id)
+    if after_id is not None:
+        query = query.where(Question.id > after_id)
+    if limit is not None:
+        query = query.limit(limit)
+
+    if limit is not None:
+        # A single page is small enough to build in one go
+        rows = db.session.execute(query).all()
+        if ndjson:
+            response = Response(b''.join(payloads.dumps(QuestionRecord(*row).to_dict()) + b'\n' for row in rows),
+                                mimetype='application/x-ndjson')
+        else:
+            response = json_response(payloads.dumps([QuestionRecord(*row).to_dict() for row in rows]))
+        if len(rows) == limit:
+            response.headers['X-Next-After-Id'] = str(rows[-1][0])
+        response.headers['X-Changes-Seq'] = str(changes_seq)
+        response.set_etag(etag, weak=True)
+        return response
+
+    def generate():
+        result = db.session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        if ndjson:
+            for row in result:
+                yield payloads.dumps(QuestionRecord(*row).to_dict()) + b'\n'
+            return
+        # Plain JSON array, written element by element
+        separator = b'['
+        for row in result:
+            yield separator + payloads.dumps(QuestionRecord(*row).to_dict())
+            separator = b','
+        yield b'[]' if separator == b'[' else b']'
+
+    response = Response(stream_with_context(generate()),
+                        mimetype='application/x-ndjson' if ndjson else 'application/json')
+    response.headers['X-Changes-Seq'] = str(changes_seq)
+    response.set_etag(etag, weak=True)
+    return response
+
+
+@bp.route('/api/questions', methods=['GET'])
 def api_all_questions():
-    questions = Question.query.all()
-    return jsonify([q.to_dict() for q in questions])
+    return list_questions_response()
+
+@bp.route('/api/questions/changes', methods=['GET'])
+def api_question_changes():
+    """
+    Questions changed after ?since=<seq> (see changes.py), as one JSON reply
+    of at most ?limit= log entries, or, for 'Accept: text/event-stream', as
+    a Server-Sent Events stream that stays open (resumes from Last-Event-ID).
+    Start from the X-Changes-Seq header of a full GET /api/questions.
+    """
+    from changes import MAX_CHANGES, event_stream, read_changes
+
+    since = request.args.get('since', type=int)
+    if request.accept_mimetypes.best == 'text/event-stream':
+        last_event_id = request.headers.get('Last-Event-ID', '')
+        if last_event_id.isdigit():
+            since = int(last_event_id)
+        if since is None:
+            since = last_seq(db.session.connection())
+        db.session.close()  # the stream reads with its own short-lived connections
+        response = Response(stream_with_context(event_stream(db.engine, services().change_notifier, since)),
+                            mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # no proxy buffering
+        return response
+
+    if since is None:
+        return jsonify({'error': 'Missing since'}), 400
+    limit = max(1, min(request.args.get('limit', default=MAX_CHANGES, type=int), MAX_CHANGES))
+    return json_response(payloads.dumps(read_changes(db.session.connection(), since, limit)))
+
+@bp.route('/api/questions/bulk', methods=['POST'])
+def api_bulk_import():
+    """
+    Imports NDJSON (one question object per line, same fields as POST /api/questions).
+    The body is read as a stream and written in batches inside one transaction;
+    identical questions are updated instead of duplicated.
+    """
+    from bulk_import import import_rows, read_ndjson
+
+    # Buffer the body: line iteration straight on the WSGI stream reads byte by byte
+    body = io.BufferedReader(request.stream, buffer_size=1 << 16)
+    with db.engine.begin() as connection:
+        result = import_rows(connection, read_ndjson(body))
+    questions_changed()
+    return jsonify(result.to_dict())
 
 # --- API Resources ---
 
+def is_integer(value):
+    # JSON true/false decode to bool, which is an int subclass
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def question_selection(data):
+    """
+    WHERE clause for the questions a bulk request selects: 'ids' (a list)
+    and/or 'filter' ({'level': n, 'text': substring}), all conditions
+    combined. Returns (clause, None) or (None, error message); a request
+    selecting nothing is an error, so a typo cannot hit the whole table.
+    """
+    conditions = []
+    ids = data.get('ids')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(is_integer(i) for i in ids):
+            return None, 'ids must be a list of integers'
+        if len(ids) > MAX_BULK_IDS:
+            return None, f'At most {MAX_BULK_IDS} ids per request'
+        conditions.append(Question.id.in_(ids))
+    criteria = data.get('filter') or {}
+    if not isinstance(criteria, dict):
+        return None, 'filter must be an object'
+    unknown = set(criteria) - {'level', 'text'}
+    if unknown:
+        return None, f"Unknown filter field: {', '.join(sorted(unknown))}"
+    if 'level' in criteria:
+        if not is_integer(criteria['level']):
+            return None, 'filter level must be an integer'
+        conditions.append(Question.level == criteria['level'])
+    if criteria.get('text'):
+        conditions.append(Question.text.contains(str(criteria['text']), autoescape=True))
+    if not conditions:
+        return None, 'Select questions with ids or a filter'
+    return db.and_(*conditions), None
+
+
+def dry_run_reply(clause):
+    """Number and first ids of the questions `clause` selects, without changing anything."""
+    matched = db.session.execute(db.select(db.func.count()).select_from(Question).where(clause)).scalar()
+    sample = db.session.execute(db.select(Question.id).where(clause).order_by(Question.id)
+                                .limit(DRY_RUN_SAMPLE)).scalars().all()
+    return {'dry_run': True, 'matched': matched, 'sample_ids': sample}
+
+
+def question_fields(data, question=None):
+    """
+    Validates a POST/PUT body like a bulk import row (bulk_import.make_row); fields missing
+    from a PUT keep `question`'s values. Returns (level, text, correct_answer, wrong_answers, info).
+    Raises ValueError.
+    """
+    from bulk_import import make_row
+
+    def field(name, current):
+        return data[name] if name in data else current
+
+    row = make_row(field('level', question.level if question else None),
+                   field('text', question.text if question else None),
+                   field('correct_answer', question.correct_answer if question else None),
+                   field('wrong_answers', question.wrong_answers if question else []),
+                   field('info', question.info if question else ''))
+    return row[0], row[1], row[2], list(row[3:6]), row[6]
+
+
 class QuestionResource(Resource):
     def get(self, question_id):
         question = Question.query.get(question_id)
         if question:
-            return jsonify(question.to_dict())
+            return json_response(encoded_question(None, question).to_json(question))
         return {'message': 'Question not found'}, 404
 
     def delete(self, question_id):
@@ -166,6 +852,7 @@ class QuestionResource(Resource):
         if question:
             db.session.delete(question)
             db.session.commit()
+            questions_changed(deleted=[question_id])
             return {'message': 'Question deleted'}
         return {'message': 'Question not found'}, 404
 
@@ -178,33 +865,29 @@ class QuestionResource(Resource):
         if not question:
             return {'message': 'Question not found'}, 404
 
-        if 'level' in data:
-            question.level = int(data['level'])
-        if 'text' in data:
-            question.text = data['text']
-        if 'info' in data:
-            question.info = data.get('info', "")
-
-        if 'correct_answer' in data:
-            question.correct_answer = data['correct_answer']
-            # Removing cached shuffled list so it regenerates on next access
-            if hasattr(question, '_shuffled_answers'):
-                del question._shuffled_answers
-
-        if 'wrong_answers' in data:
-            # Setter handles mapping to answer2, answer3, answer4
-            question.wrong_answers = data['wrong_answers']
-            if hasattr(question, '_shuffled_answers'):
-                del question._shuffled_answers
-
-        db.session.commit()
+        try:
+            level, text, correct_answer, wrong_answers, info = question_fields(data, question)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        question.level = level
+        question.text = text
+        question.info = info
+        question.correct_answer = correct_answer
+        # Setter handles mapping to answer2, answer3, answer4
+        question.wrong_answers = wrong_answers
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return {'message': 'An identical question already exists'}, 409
+        questions_changed(updated=[question])
         return jsonify(question.to_dict())
 
 
 class QuestionsListResource(Resource):
     def get(self):
-        questions = Question.query.all()
-        return jsonify([q.to_dict() for q in questions])
+        return list_questions_response()
 
     def post(self):
         data = request.get_json()
@@ -217,40 +900,104 @@ class QuestionsListResource(Resource):
             if field not in data:
                 return {'message': f'Missing field: {field}'}, 400
 
+        try:
+            level, text, correct_answer, wrong_answers, info = question_fields(data)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
         new_question = Question()
-        new_question.level = int(data['level'])
-        new_question.text = data['text']
-        new_question.correct_answer = data['correct_answer']
-        new_question.wrong_answers = data['wrong_answers'] # Uses setter
-        new_question.info = data.get('info', "")
+        new_question.level = level
+        new_question.text = text
+        new_question.correct_answer = correct_answer
+        new_question.wrong_answers = wrong_answers # Uses setter
+        new_question.info = info
 
         # ID is auto-increment usually, let DB handle it
 
         db.session.add(new_question)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return {'message': 'An identical question already exists'}, 409
+        questions_changed(updated=[new_question])
 
         return jsonify(new_question.to_dict())
 
+    def patch(self):
+        """
+        Sets fields of many questions with one UPDATE in one transaction.
+        JSON body: {ids | filter, set: {level, info}, dry_run}. Returns the number updated.
+        """
+        data = request.get_json(silent=True)
+        if not data:
+            return {'message': 'No input data provided'}, 400
+        clause, error = question_selection(data)
+        if error:
+            return {'message': error}, 400
+        fields = data.get('set') or {}
+        if not isinstance(fields, dict) or not fields:
+            return {'message': 'Nothing to set'}, 400
+        unknown = set(fields) - {'level', 'info'}
+        if unknown:
+            return {'message': f"Cannot bulk set: {', '.join(sorted(unknown))}"}, 400
+        values = {}
+        if 'level' in fields:
+            if not is_integer(fields['level']):
+                return {'message': 'level must be an integer'}, 400
+            values['level'] = fields['level']
+        if 'info' in fields:
+            from bulk_import import _text
+            try:
+                values['info'] = _text(fields['info'], 'info')
+            except ValueError as e:
+                return {'message': str(e)}, 400
+        if data.get('dry_run'):
+            return jsonify(dry_run_reply(clause))
+
+        result = db.session.execute(db.update(Question).where(clause).values(**values)
+                                    .execution_options(synchronize_session=False))
+        db.session.commit()
+        if result.rowcount:
+            questions_changed()  # one full invalidation instead of one per row
+        return jsonify({'dry_run': False, 'updated': result.rowcount})
+
+    def delete(self):
+        """
+        Deletes many questions with one DELETE in one transaction.
+        JSON body: {ids | filter, dry_run}. Returns the number deleted.
+        """
+        data = request.get_json(silent=True)
+        if not data:
+            return {'message': 'No input data provided'}, 400
+        clause, error = question_selection(data)
+        if error:
+            return {'message': error}, 400
+        if data.get('dry_run'):
+            return jsonify(dry_run_reply(clause))
+
+        result = db.session.execute(db.delete(Question).where(clause)
+                                    .execution_options(synchronize_session=False))
+        db.session.commit()
+        if result.rowcount:
+            questions_changed()
+        return jsonify({'dry_run': False, 'deleted': result.rowcount})
+
 
 class QuestionSearchResource(Resource):
     def get(self, query):
-        # ILIKE is not standard in SQLite but SQLAlchemy emulates or we use logic.
-        # For simplicity let's use contains.
-        search = f"%{query}%"
-        # Search in text or any of the answers.
-        # It's complex to search in all answer columns in one go cleanly OR logic.
-        from sqlalchemy import or_
-        results = Question.query.filter(
-            or_(
-                Question.text.like(search),
-                Question.correct_answer.like(search),
-                Question.answer2.like(search),
-                Question.answer3.like(search),
-                Question.answer4.like(search)
-            )
-        ).all()
-
-        return jsonify([q.to_dict() for q in results])
+        """
+        Ranked full-text search over the question text and all answers.
+        Optional query parameters: level, limit (default 50), offset and
+        prefix=0 to match whole words only.
+        """
+        level = request.args.get('level', type=int)
+        limit = max(1, min(request.args.get('limit', default=50, type=int), MAX_PAGE_SIZE))
+        offset = max(0, request.args.get('offset', default=0, type=int))
+        prefix = request.args.get('prefix', default='1') != '0'
+
+        results = search_questions(query, level=level, limit=limit, offset=offset, prefix=prefix)
+        return json_response(b'[' + b','.join(encoded_question(None, q).to_json(q) for q in results) + b']')
 
 # Register Resources
 api.add_resource(QuestionResource, '/api/questions/<int:question_id>')
@@ -258,13 +1005,13 @@ api.add_resource(QuestionsListResource, '/api/questions')
 api.add_resource(QuestionSearchResource, '/api/questions/search/<string:query>')
 
 
-@app.route('/game_random_question')
+@bp.route('/game_random_question')
 def game_random_question():
     level = request.args.get('level', default=1, type=int)
-    question = get_rand_question(level)
+    question = services().question_pool.get_random(level)
     if question:
-        return jsonify(question.to_dict())
+        return json_response(encoded_question(None, question).to_json(question))
     return jsonify({'message': 'No question found for this level'}), 404
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
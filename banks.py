@@ -0,0 +1,159 @@
+"""
+Question banks: extra read-only SQLite files or snapshots (*.snap) a game
+can be played from, opened on first use and closed again when idle.
+"""
+import os
+import random
+import re
+import threading
+import time
+from urllib.parse import quote
+
+from sqlalchemy import create_engine
+
+from question_pool import QuestionPool
+from schema import tune_engine
+from snapshot import SNAPSHOT_SUFFIX, open_snapshot
+
+# Allowed bank names; also keeps names from QUESTION_BANKS_DIR inside that directory
+BANK_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+# Seconds between sweeps for idle banks
+SWEEP_INTERVAL = 60
+
+
+class QuestionBank:
+    """An open bank: its engine and question pool, or its mapped snapshot (engine None)."""
+    __slots__ = ('name', 'path', 'engine', 'pool', 'levels', 'last_used')
+
+    def __init__(self, name, path, engine, pool):
+        self.name = name
+        self.path = path
+        self.engine = engine
+        self.pool = pool
+        self.levels = None  # the bank's own level numbers, lowest first; loaded on the first draw
+        self.last_used = time.monotonic()
+
+    def __repr__(self):
+        return f'<QuestionBank {self.name}: {self.path}>'
+
+    def get_random(self, level, rng=random):
+        """Draws a question for game level `level`: the bank's level-th lowest level (banks number levels differently)."""
+        level = self._bank_level(level)
+        return None if level is None else self.pool.get_random(level, rng)
+
+    def get_nth(self, level, seed, position, rng=random):
+        """Question `position` of game level `level` in the order picked by `seed` (no repeats, see QuestionPool)."""
+        level = self._bank_level(level)
+        return None if level is None else self.pool.get_nth(level, seed, position, rng)
+
+    def _bank_level(self, level):
+        if self.name is None:
+            return level
+        if self.levels is None:
+            self.levels = self.pool.levels()
+        return self.levels[level] if level < len(self.levels) else None
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.dispose()
+
+
+class QuestionBankRegistry:
+    """
+    Opens banks on demand and closes idle ones. banks: name -> path; every <name>.sqlite3 or
+    <name>.snap in `directory` is a bank too. The name None is the app's own database, served by `pool`.
+    """
+
+    def __init__(self, pool, banks=None, directory=None, idle_timeout=600, max_open=32, pool_size=2):
+        self.banks = dict(banks or {})
+        self.directory = directory
+        self.idle_timeout = idle_timeout
+        self.max_open = max_open
+        self.pool_size = pool_size
+        self.default = QuestionBank(None, None, None, pool)
+        self._open = {}   # name -> QuestionBank
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+    def path_of(self, name):
+        """Returns the file of bank `name`, or None if there is no such bank."""
+        if not isinstance(name, str) or not BANK_NAME.match(name):
+            return None
+        path = self.banks.get(name)
+        if path is None and self.directory:
+            for suffix in ('.sqlite3', SNAPSHOT_SUFFIX):
+                path = os.path.join(self.directory, name + suffix)
+                if os.path.isfile(path):
+                    break
+        return path if path and os.path.isfile(path) else None
+
+    def __contains__(self, name):
+        return name is None or self.path_of(name) is not None
+
+    def names(self):
+        """Names of all available banks, sorted."""
+        names = {name for name in self.banks if self.path_of(name)}
+        if self.directory and os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                name, suffix = os.path.splitext(filename)
+                if suffix in ('.sqlite3', SNAPSHOT_SUFFIX) and BANK_NAME.match(name):
+                    names.add(name)
+        return sorted(names)
+
+    def open_names(self):
+        return sorted(self._open)
+
+    def get(self, name):
+        """Returns bank `name` (None: the app's database), opening it on first use. KeyError if unknown."""
+        if name is None:
+            return self.default
+        bank = self._open.get(name)  # dict lookups are atomic, so the hit path skips the lock
+        if bank is None:
+            bank = self._open_bank(name)
+        now = time.monotonic()
+        bank.last_used = now
+        if now >= self._next_sweep:
+            self.sweep(now)
+        return bank
+
+    def _open_bank(self, name):
+        with self._lock:
+            bank = self._open.get(name)
+            if bank is not None:
+                return bank
+            path = self.path_of(name)
+            if path is None:
+                raise KeyError(name)
+            if path.endswith(SNAPSHOT_SUFFIX):
+                bank = QuestionBank(name, path, None, open_snapshot(path))
+            else:
+                # Read-only: games never write to a bank, and the files stay untouched
+                engine = create_engine(f'sqlite:///file:{quote(os.path.abspath(path))}?mode=ro&uri=true',
+                                       pool_size=self.pool_size, max_overflow=0, pool_timeout=30)
+                tune_engine(engine, read_only=True)
+                bank = QuestionBank(name, path, engine, QuestionPool(engine))
+            self._open[name] = bank
+            if len(self._open) > self.max_open:
+                self._evict_least_recent()
+            return bank
+
+    def sweep(self, now=None):
+        """Closes banks idle for longer than idle_timeout. Returns the names closed."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._next_sweep = now + SWEEP_INTERVAL
+            idle = [name for name, bank in self._open.items() if now - bank.last_used > self.idle_timeout]
+            for name in idle:
+                self._open.pop(name).close()
+        return idle
+
+    def _evict_least_recent(self):
+        # Caller holds the lock
+        name = min(self._open, key=lambda name: self._open[name].last_used)
+        self._open.pop(name).close()
+
+    def close(self):
+        with self._lock:
+            for bank in self._open.values():
+                bank.close()
+            self._open.clear()
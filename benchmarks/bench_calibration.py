@@ -0,0 +1,72 @@
+"""
+Recalibration speed (calibration.py): a synthetic question table gets
+answer counters drawn from a hidden "true" difficulty, then recalibrate()
+estimates the difficulties and re-buckets the levels. Prints the time of
+each phase and how well the new levels follow the true difficulty.
+
+Usage:
+    python benchmarks/bench_calibration.py [row counts...]
+"""
+import sys
+import time
+
+import numpy as np
+
+from common import make_app, temp_database, LEVELS
+
+# Answers per question on average, so 1M questions carry ~20M answer events
+ANSWERS_PER_QUESTION = 20
+
+
+def seed_stats(connection, count, seed=1):
+    """Fills question_stats; returns the hidden true difficulty per question id (index = id - 1)."""
+    rnd = np.random.default_rng(seed)
+    levels = np.arange(count) % LEVELS  # as common.synthetic_rows
+    # True difficulty: rises with the level, but with enough noise that many questions sit on the wrong level
+    truth = np.clip(0.1 + 0.05 * levels + rnd.normal(0, 0.15, count), 0.01, 0.99)
+    answered = rnd.poisson(ANSWERS_PER_QUESTION, count)
+    correct = rnd.binomial(answered, 1 - truth)
+    connection.exec_driver_sql(
+        'INSERT INTO question_stats (question_id, shown, answered, correct) VALUES (?, ?, ?, ?)',
+        list(zip(range(1, count + 1), answered.tolist(), answered.tolist(), correct.tolist())))
+    return truth
+
+
+def level_correlation(connection, truth):
+    levels = np.array(connection.exec_driver_sql('SELECT difficulty FROM millionaire ORDER BY id').fetchall())[:, 0]
+    return np.corrcoef(levels, truth)[0, 1]
+
+
+def run(count):
+    from calibration import recalibrate
+    from model import db
+
+    app = make_app(temp_database(count, name=f'millionaire_calibration_{count}.sqlite3'))
+    with app.app_context():
+        with db.engine.begin() as connection:
+            truth = seed_stats(connection, count)
+            before = level_correlation(connection, truth)
+
+        start = time.perf_counter()
+        with db.engine.begin() as connection:
+            estimate = recalibrate(connection)
+        estimate_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with db.engine.begin() as connection:
+            summary = recalibrate(connection, rebucket_levels=True, min_answers=10)
+        rebucket_s = time.perf_counter() - start
+
+        with db.engine.connect() as connection:
+            after = level_correlation(connection, truth)
+        db.engine.dispose()
+
+    print(f"{count:>9} questions, {estimate['answers']:>11,} answers | estimate {estimate_s:6.2f} s | "
+          f"estimate + rebucket {rebucket_s:6.2f} s, {summary['moved']:,} moved | "
+          f"level/true difficulty correlation {before:.2f} -> {after:.2f}")
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for n in counts:
+        run(n)
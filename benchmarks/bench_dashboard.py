@@ -0,0 +1,88 @@
+"""
+The /admin/stats dashboard (dashboard.py) over a year of synthetic rollups:
+hourly game_rollup and answer_rollup rows and question_stats for every
+question, adding up to tens of millions of recorded answers. Times a full
+rebuild of the figures, the tick check that skips it when nothing was
+flushed, and cached page and JSON views through the test client.
+
+Usage:
+    python benchmarks/bench_dashboard.py [--questions 100000] [--days 365] [--answers-per-hour 5000]
+"""
+import argparse
+import random
+import sqlite3
+import time
+
+from common import LEVELS, temp_database
+
+
+def seed_rollups(path, questions, days, answers_per_hour, seed=3):
+    """Fills the rollup tables and question_stats. Returns the number of answers recorded."""
+    rnd = random.Random(seed)
+    conn = sqlite3.connect(path)
+    now = int(time.time()) // 3600 * 3600
+    hours = [now - i * 3600 for i in range(days * 24)]
+    games, answers = [], []
+    for hour in hours:
+        played = rnd.randint(50, 500)
+        games.append((hour, '', played, played // 100, played * 2000, played * 5))
+        for level in range(LEVELS):
+            answered = answers_per_hour // LEVELS
+            answers.append((hour, level, answered, int(answered * (0.95 - level * 0.05))))
+    conn.executemany('INSERT INTO game_rollup (hour, bank, games, won, score, level) VALUES (?, ?, ?, ?, ?, ?)', games)
+    conn.executemany('INSERT INTO answer_rollup (hour, level, answered, correct) VALUES (?, ?, ?, ?)', answers)
+    stats = []
+    per_question = max(1, len(hours) * answers_per_hour // questions)
+    for question_id in range(1, questions + 1):
+        answered = rnd.randint(per_question // 2, per_question * 3 // 2)
+        stats.append((question_id, answered, answered, rnd.randint(0, answered)))
+    conn.executemany('INSERT INTO question_stats (question_id, shown, answered, correct) VALUES (?, ?, ?, ?)', stats)
+    conn.commit()
+    conn.close()
+    return len(hours) * (answers_per_hour // LEVELS) * LEVELS
+
+
+def ms(seconds):
+    return f'{seconds * 1000:9.3f} ms'
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the rollup-backed stats dashboard.')
+    parser.add_argument('--questions', type=int, default=100_000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--answers-per-hour', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    import app as millionaire
+
+    db_path = temp_database(args.questions, name='millionaire_dashboard.sqlite3')
+    app = millionaire.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path, 'CALIBRATION_INTERVAL': 0,
+                                  'DB_OPTIMIZE_INTERVAL': 0, 'CHANGES_POLL_INTERVAL': 0,
+                                  'STATS_REFRESH_INTERVAL': 0})
+    answers = seed_rollups(db_path, args.questions, args.days, args.answers_per_hour)
+    print(f'{args.questions:,} questions, {args.days * 24:,} hours, {answers:,} answers in the rollups')
+
+    dashboard = app.extensions['millionaire'].stats_dashboard
+    start = time.perf_counter()
+    dashboard.refresh(force=True)  # includes importing pandas and plotly
+    print(f'{"first build (with imports)":<32} {ms(time.perf_counter() - start)}')
+    print(f'{"rebuild":<32} {ms(timed(lambda: dashboard.refresh(force=True), 5))}')
+    print(f'{"tick check, nothing new":<32} {ms(timed(dashboard.refresh, args.repeat))}')
+    print(f'{"figures JSON":<32} {len(dashboard.snapshot().figures):>9,} bytes')
+
+    client = app.test_client()
+    client.get('/admin/stats')
+    print(f'{"GET /admin/stats (cached)":<32} {ms(timed(lambda: client.get("/admin/stats"), args.repeat))}')
+    print(f'{"GET /admin/stats.json (cached)":<32} {ms(timed(lambda: client.get("/admin/stats.json"), args.repeat))}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Serialization CPU per question response (payloads.py): building the dict
+with to_dict() and encoding it with Flask's JSON provider, as the endpoints
+did before, against splicing a cached EncodedQuestion in the request's
+answer order, with the json and (if installed) orjson encoders. Also times
+whole /game_random_question and /api/questions/<id> requests through the
+test client, where the splice path is what the app serves.
+
+Usage:
+    python benchmarks/bench_payloads.py [--questions 1000] [--repeat 100000]
+"""
+import argparse
+import random
+import time
+
+from common import make_app, temp_database
+
+
+def cpu_us(func, repeat):
+    """Mean CPU time of func() in microseconds."""
+    start = time.process_time()
+    for _ in range(repeat):
+        func()
+    return (time.process_time() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark question JSON serialization.')
+    parser.add_argument('--questions', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=100_000)
+    args = parser.parse_args()
+
+    import payloads
+    from flask import jsonify
+    from payloads import EncodedQuestion
+    from question_pool import QuestionPool
+
+    db_path = temp_database(args.questions, name='millionaire_payloads.sqlite3')
+    app = make_app(db_path)
+    rnd = random.Random(1)
+    with app.test_request_context():
+        pool = QuestionPool()
+        questions = [pool.get_random(level, rnd) for level in range(15) for _ in range(20)]
+        count = len(questions)
+        counter = iter(range(10 ** 12))
+
+        def question():
+            q = questions[next(counter) % count]
+            q.shuffle(rnd)
+            return q
+
+        print(f'{"per response":<44} {"CPU":>10}')
+        print(f'{"to_dict() + jsonify (before)":<44} {cpu_us(lambda: jsonify(question().to_dict()), args.repeat):8.2f} us')
+        print(f'{"to_dict() + app.json.dumps":<44} '
+              f'{cpu_us(lambda: app.json.dumps(question().to_dict()), args.repeat):8.2f} us')
+        encoders = ['json'] + (['orjson'] if payloads.orjson is not None else [])
+        for encoder in encoders:
+            payloads.use_encoder(encoder)
+            print(f'{"to_dict() + payloads.dumps, " + encoder:<44} '
+                  f'{cpu_us(lambda: payloads.dumps(question().to_dict()), args.repeat):8.2f} us')
+            encoded = {q.id: EncodedQuestion(q) for q in questions}
+            print(f'{"cached EncodedQuestion.to_json, " + encoder:<44} '
+                  f'{cpu_us(lambda: (lambda q: encoded[q.id].to_json(q))(question()), args.repeat):8.2f} us')
+            print(f'{"cached + json_response, " + encoder:<44} '
+                  f'{cpu_us(lambda: (lambda q: payloads.json_response(encoded[q.id].to_json(q)))(question()), args.repeat):8.2f} us')
+            print(f'{"EncodedQuestion built (cache miss), " + encoder:<44} '
+                  f'{cpu_us(lambda: EncodedQuestion(question()), args.repeat // 10):8.2f} us')
+
+    import app as millionaire
+    full_app = millionaire.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path,
+                                       'CALIBRATION_INTERVAL': 0, 'DB_OPTIMIZE_INTERVAL': 0})
+    client = full_app.test_client()
+    requests = max(1000, args.repeat // 20)
+    print(f'\n{"per request (test client)":<44} {"CPU":>10}')
+    for encoder in encoders:
+        payloads.use_encoder(encoder)
+        full_app.extensions['millionaire'].payload_cache.clear()
+        print(f'{"GET /game_random_question, " + encoder:<44} '
+              f'{cpu_us(lambda: client.get(f"/game_random_question?level={rnd.randrange(15)}"), requests):8.2f} us')
+        print(f'{"GET /api/questions/<id>, " + encoder:<44} '
+              f'{cpu_us(lambda: client.get(f"/api/questions/{rnd.randrange(1, args.questions)}"), requests):8.2f} us')
+        print(f'{"GET /api/questions?limit=1000, " + encoder:<44} '
+              f'{cpu_us(lambda: client.get("/api/questions?limit=1000"), requests // 100):8.2f} us')
+
+
+if __name__ == '__main__':
+    main()
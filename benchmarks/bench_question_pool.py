@@ -0,0 +1,66 @@
+"""
+Compares the old `ORDER BY RANDOM()` lookup with the in-memory question pool,
+and the old shuffle-then-index() answer order with permutation indexes.
+
+Usage:
+    python benchmarks/bench_question_pool.py [row counts...]
+"""
+import random
+import sys
+import time
+
+from common import temp_database, make_app, timeit, LEVELS
+
+
+def order_by_random(level):
+    from sqlalchemy.sql.expression import func
+    from model import Question
+    return Question.query.filter_by(level=level).order_by(func.random()).first()
+
+
+def shuffle_and_index(question):
+    # What Question.answers and the game routes did before permutation indexes
+    answers = [a for a in (question.correct_answer, question.answer2, question.answer3, question.answer4) if a]
+    random.shuffle(answers)
+    return answers, answers.index(question.correct_answer)
+
+
+def permutation_lookup(question):
+    question.shuffle()
+    return question.answers, question.correct_index
+
+
+def run_shuffle(repeat):
+    from model import QuestionRecord
+    question = QuestionRecord(1, 0, 'Question?', 'right', 'wrong 1', 'wrong 2', 'wrong 3', '')
+    old_us = timeit(lambda: shuffle_and_index(question), repeat)
+    new_us = timeit(lambda: permutation_lookup(question), repeat)
+    print(f'answer order | shuffle + index(): {old_us:6.2f} us | permutation index: {new_us:6.2f} us')
+
+
+def run(count, repeat):
+    from question_pool import QuestionPool
+
+    app = make_app(temp_database(count))
+    with app.app_context():
+        level = LEVELS // 2
+        query_us = timeit(lambda: order_by_random(level), max(3, repeat // 100))
+
+        pool = QuestionPool()
+        start = time.perf_counter()
+        pool.get_random(level)
+        load_ms = (time.perf_counter() - start) * 1000
+        pool_us = timeit(lambda: pool.get_random(level), repeat)
+        positions = iter(range(repeat))
+        deck_us = timeit(lambda: pool.get_nth(level, 12345, next(positions)), repeat)
+
+    print(f'{count:>9} rows | ORDER BY RANDOM(): {query_us:10.1f} us | '
+          f'pool: {pool_us:6.2f} us (one-off load {load_ms:8.1f} ms) | '
+          f'no-repeat deck: {deck_us:6.2f} us | speedup x{query_us / pool_us:,.0f}')
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    run_shuffle(repeat=100_000)
+    for n in counts:
+        run(n, repeat=10_000)
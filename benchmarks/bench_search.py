@@ -0,0 +1,33 @@
+"""
+Compares the LIKE '%q%' search with the FTS5 index on a synthetic corpus.
+
+Usage:
+    python benchmarks/bench_search.py [row count]     # default 1,000,000
+"""
+import sys
+import time
+
+from common import temp_database, make_app, timeit, WORDS
+
+# A single word, a prefix, two words, a number-like token and a miss
+QUERIES = (WORDS[100], WORDS[2000][:4], f'{WORDS[300]} {WORDS[4000]}', 'Right 4242', 'nothingmatches')
+
+
+def run(count, repeat=5):
+    from model import init_db
+    from search import search_questions, like_search
+
+    app = make_app(temp_database(count, name=f'millionaire_search_{count}.sqlite3'))
+    start = time.perf_counter()
+    init_db(app)  # builds the FTS5 index
+    print(f'{count} rows, index build {time.perf_counter() - start:.1f} s')
+
+    with app.app_context():
+        for query in QUERIES:
+            like_us = timeit(lambda: like_search(query, limit=50), repeat)
+            fts_us = timeit(lambda: search_questions(query, limit=50), repeat)
+            print(f'{query!r:>18} | LIKE: {like_us / 1000:9.2f} ms | FTS5: {fts_us / 1000:9.2f} ms')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,172 @@
+"""
+Live show mode (show.py) with many simulated players on one box. A host
+drives rounds through the REST API; every round's question is fanned out
+to all players, each player answers from one of several threads, and the
+host closes the round, which tallies the answers and fans out the results.
+
+Transports:
+    local     in-process stand-in for a broker (show.LocalBroadcaster): one
+              JSON encode per publish, a callback per player; reports the
+              fan-out latency distribution (publish start -> player has it)
+    socketio  Flask-SocketIO test clients on namespace '/show': the real
+              room emit and answer handlers, without the network; reports
+              the time until the last player has the message
+
+Usage:
+    python benchmarks/bench_show.py [--players 10000] [--rounds 5] [--transport local|socketio]
+"""
+import argparse
+import random
+import threading
+import time
+
+from common import temp_database
+from loadtest import percentile
+
+
+class Timed:
+    """Wraps a broadcaster and remembers when, and for how long, the last publish of each event ran."""
+
+    def __init__(self, broadcaster):
+        self.broadcaster = broadcaster
+        self.started = {}
+        self.duration = {}
+
+    def publish(self, show_id, event, payload):
+        start = self.started[event] = time.perf_counter()
+        self.broadcaster.publish(show_id, event, payload)
+        self.duration[event] = time.perf_counter() - start
+
+
+class LocalPlayers:
+    """Players subscribed to a LocalBroadcaster; each one keeps the receive time and body of the last message."""
+
+    def __init__(self, count, show_id, broadcaster, registry):
+        self.registry = registry
+        self.show_id = show_id
+        self.received = [None] * count
+        for player in range(count):
+            broadcaster.subscribe(show_id, self._receiver(player))
+
+    def _receiver(self, player):
+        received = self.received
+
+        def receive(event, body):
+            received[player] = (time.perf_counter(), event, body)
+        return receive
+
+    def latencies(self, started):
+        return [entry[0] - started for entry in self.received]
+
+    def answer(self, players, round_number, rnd):
+        accepted = 0
+        for player in players:
+            accepted += self.registry.answer(self.show_id, player, round_number, rnd.randrange(4))
+        return accepted
+
+
+class SocketIOPlayers:
+    """Flask-SocketIO test clients joined to the show's room."""
+
+    def __init__(self, count, show_id, socketio, app):
+        self.show_id = show_id
+        self.clients = []
+        for _ in range(count):
+            client = socketio.test_client(app, namespace='/show')
+            client.emit('join', {'show': show_id}, namespace='/show', callback=True)
+            self.clients.append(client)
+
+    def received(self, event):
+        return sum(any(packet['name'] == event for packet in client.get_received('/show')) for client in self.clients)
+
+    def answer(self, players, round_number, rnd):
+        accepted = 0
+        for player in players:
+            ack = self.clients[player].emit('answer', {'show': self.show_id, 'round': round_number,
+                                                       'answer': rnd.randrange(4)}, namespace='/show', callback=True)
+            accepted += ack['accepted']
+        return accepted
+
+
+def answer_all(players, count, round_number, threads):
+    """Every player answers once, from `threads` threads. Returns (accepted answers, seconds)."""
+    accepted = [0] * threads
+    slices = [range(i, count, threads) for i in range(threads)]
+
+    def run(i):
+        accepted[i] = players.answer(slices[i], round_number, random.Random(round_number * threads + i))
+
+    workers = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return sum(accepted), time.perf_counter() - start
+
+
+def ms(seconds):
+    return f'{seconds * 1000:8.2f} ms'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate a live show with many players.')
+    parser.add_argument('--players', type=int, default=10_000)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--threads', type=int, default=8, help='threads submitting answers')
+    parser.add_argument('--transport', choices=('local', 'socketio'), default='local')
+    args = parser.parse_args()
+
+    import app as millionaire
+    from show import LocalBroadcaster, SocketIOBroadcaster
+
+    db_path = temp_database(1000, name='millionaire_show.sqlite3')
+    app = millionaire.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path,
+                                  'CALIBRATION_INTERVAL': 0, 'DB_OPTIMIZE_INTERVAL': 0})
+    registry = app.extensions['millionaire'].shows
+    host = app.test_client()
+
+    if args.transport == 'local':
+        local = LocalBroadcaster()
+        timed = Timed(local)
+    else:
+        from game_socket import socketio
+        socketio.init_app(app, async_mode='threading')
+        timed = Timed(SocketIOBroadcaster(socketio))
+    registry.broadcasters.append(timed)
+
+    started = host.post('/api/show').get_json()
+    show_id, headers = started['show'], {'X-Show-Token': started['host_token']}
+    start = time.perf_counter()
+    if args.transport == 'local':
+        players = LocalPlayers(args.players, show_id, local, registry)
+    else:
+        players = SocketIOPlayers(args.players, show_id, socketio, app)
+    print(f'{args.players:,} players joined via {args.transport} in {time.perf_counter() - start:.2f} s')
+
+    for _ in range(args.rounds):
+        question = host.post(f'/api/show/{show_id}/next', headers=headers).get_json()
+        number = question['round']
+        if args.transport == 'local':
+            latencies = players.latencies(timed.started['question'])
+            fanout = (f"p50 {ms(percentile(latencies, 50))} | p95 {ms(percentile(latencies, 95))} | "
+                      f"p99 {ms(percentile(latencies, 99))} | max {ms(max(latencies))}")
+        else:
+            fanout = f"all {ms(timed.duration['question'])}, {players.received('question'):,} received"
+
+        accepted, answer_s = answer_all(players, args.players, number, args.threads)
+        start = time.perf_counter()
+        results = host.post(f'/api/show/{show_id}/close', headers=headers).get_json()
+        close_s = time.perf_counter() - start
+        assert results['answers'] == accepted == args.players, (results['answers'], accepted)
+
+        print(f'round {number:2}: question fan-out {fanout}')
+        print(f'          {accepted:,} answers in {ms(answer_s)} ({accepted / answer_s:,.0f}/s) | '
+              f"close + tally + results fan-out {ms(close_s)} (publish {ms(timed.duration['results'])}) | "
+              f"tally {results['tally']}")
+
+    host.delete(f'/api/show/{show_id}', headers=headers)
+
+
+if __name__ == '__main__':
+    main()
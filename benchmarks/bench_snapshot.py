@@ -0,0 +1,82 @@
+"""
+Compares loading a question bank by parsing the TSV file into dicts (as
+model/questions.load_questions_from_file does) with mapping a binary
+snapshot (snapshot.py): cold load time, Python heap allocated by the load
+and the cost of drawing a random question.
+
+Usage:
+    python benchmarks/bench_snapshot.py [row counts...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import synthetic_rows, timeit, LEVELS
+
+
+def parse_tsv(path):
+    # Same work as model/questions.load_questions_from_file
+    questions = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line in file:
+            parts = line.strip().split('\t')
+            if len(parts) >= 7:
+                questions.append({
+                    'difficulty': parts[0],
+                    'question': parts[1],
+                    'correct_answer': parts[2],
+                    'answers': parts[2:6],
+                    'background_info': parts[6]
+                })
+    return questions
+
+
+def measure(load):
+    """Returns (result, load time in ms, heap bytes); timed without tracemalloc, which slows allocations."""
+    start = time.perf_counter()
+    result = load()
+    elapsed = (time.perf_counter() - start) * 1000
+    del result
+    tracemalloc.start()
+    result = load()
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, heap
+
+
+def run(count):
+    from snapshot import open_snapshot, write_snapshot
+
+    directory = tempfile.gettempdir()
+    tsv_path = os.path.join(directory, f'millionaire_bench_{count}.txt')
+    snapshot_path = os.path.join(directory, f'millionaire_bench_{count}.snap')
+    rows = [(i + 1, *row) for i, row in enumerate(synthetic_rows(count))]
+    with open(tsv_path, 'w', encoding='utf-8') as file:
+        for row in rows:
+            file.write('\t'.join(str(value) for value in row[1:]) + '\n')
+    start = time.perf_counter()
+    write_snapshot(snapshot_path, rows)
+    export_ms = (time.perf_counter() - start) * 1000
+    del rows
+
+    questions, tsv_ms, tsv_heap = measure(lambda: parse_tsv(tsv_path))
+    level = str(LEVELS // 2)
+    by_level = [q for q in questions if q['difficulty'] == level]
+    tsv_us = timeit(lambda: random.choice(by_level)['question'], 100_000)
+    del questions, by_level
+
+    snapshot, snapshot_ms, snapshot_heap = measure(lambda: open_snapshot(snapshot_path))
+    snapshot_us = timeit(lambda: snapshot.get_random(LEVELS // 2).text, 100_000)
+
+    print(f'{count:>9} rows | export {export_ms:8.1f} ms, {os.path.getsize(snapshot_path) / 2**20:6.1f} MiB | '
+          f'TSV parse: {tsv_ms:8.1f} ms, {tsv_heap / 2**20:7.1f} MiB heap, draw {tsv_us:5.2f} us | '
+          f'snapshot open: {snapshot_ms:6.2f} ms, {snapshot_heap / 2**10:5.1f} KiB heap, draw {snapshot_us:5.2f} us')
+
+
+if __name__ == '__main__':
+    counts = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for n in counts:
+        run(n)
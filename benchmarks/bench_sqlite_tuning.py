@@ -0,0 +1,102 @@
+"""
+Concurrent read/write mix against a default SQLite file and one with the
+schema.py migrations (level index) and connection pragmas (WAL, ...).
+
+Reader threads do level lookups like the game and admin listing; writer
+threads update single rows with one commit each, like QuestionResource.put.
+
+Usage:
+    python benchmarks/bench_sqlite_tuning.py [--rows 100000] [--readers 8] [--writers 2] [--seconds 5]
+"""
+import argparse
+import random
+import threading
+import time
+
+from common import temp_database, LEVELS
+from loadtest import percentile
+
+
+READ_QUERIES = (
+    'SELECT COUNT(*) FROM millionaire WHERE difficulty = ?',
+    'SELECT id FROM millionaire WHERE difficulty = ? ORDER BY id LIMIT 50',
+)
+
+
+def make_engine(path, tuned):
+    from sqlalchemy import create_engine
+    from schema import migrate, tune_engine
+
+    engine = create_engine('sqlite:///' + path, pool_size=16, max_overflow=0,
+                           connect_args={'timeout': 5})
+    if tuned:
+        tune_engine(engine)
+        with engine.begin() as connection:
+            migrate(connection)
+    return engine
+
+
+def reader(engine, stop, latencies, errors, rows):
+    rnd = random.Random()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql(rnd.choice(READ_QUERIES), (rnd.randrange(LEVELS),)).fetchall()
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def writer(engine, stop, latencies, errors, rows):
+    rnd = random.Random()
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            with engine.begin() as connection:
+                connection.exec_driver_sql('UPDATE millionaire SET background_information = ? WHERE id = ?',
+                                           (f'edited {rnd.random()}', rnd.randrange(1, rows + 1)))
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(label, engine, args):
+    stop = threading.Event()
+    results = {'read': ([], []), 'write': ([], [])}
+    threads = [threading.Thread(target=reader, args=(engine, stop, *results['read'], args.rows))
+               for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(engine, stop, *results['write'], args.rows))
+                for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    for kind, (latencies, errors) in results.items():
+        print(f'{label:>8} {kind:>5}s: {len(latencies) / args.seconds:9,.0f}/s | '
+              f'p50 {percentile(latencies, 50) * 1000:8.2f} ms | '
+              f'p95 {percentile(latencies, 95) * 1000:8.2f} ms | '
+              f'p99 {percentile(latencies, 99) * 1000:8.2f} ms | errors {len(errors)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    for label, tuned in (('default', False), ('tuned', True)):
+        path = temp_database(args.rows, name=f'millionaire_tuning_{label}_{args.rows}.sqlite3')
+        run(label, make_engine(path, tuned), args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Startup time of the app and the command line tools.
+
+Every measurement runs in a fresh interpreter: module imports are timed
+with `python -X importtime` (the module's cumulative time), commands by
+wall time. Each is repeated and the fastest run is kept, so the numbers
+reflect a warm OS page cache rather than disk noise.
+
+Results can be written to a JSON file and compared against an earlier run
+to track regressions:
+
+    python benchmarks/bench_startup.py --output startup.json
+    python benchmarks/bench_startup.py --compare startup.json
+    python benchmarks/bench_startup.py --root /path/to/other/checkout
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from common import PROJECT_ROOT, temp_database
+
+# Modules whose import time is measured
+MODULES = ('records', 'snapshot', 'bulk_import', 'model', 'app', 'game_socket')
+
+# name -> interpreter arguments, run from the project root (wall time, including interpreter start)
+COMMANDS = {
+    'interpreter': ['-c', 'pass'],
+    'import app': ['-c', 'import app'],
+    'create_app()': ['-c', 'import app; app.create_app({"DB_OPTIMIZE_INTERVAL": 0})'],
+    'bulk_import.py --help': ['bulk_import.py', '--help'],
+    'snapshot.py --help': ['snapshot.py', '--help'],
+}
+
+
+def import_time_ms(module, root):
+    """Import time of `module` in ms: its cumulative -X importtime entry, interpreter startup excluded."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=root, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if len(fields) == 3 and fields[2] == f' {module}':  # top level: no extra indentation
+            return int(fields[1]) / 1000
+    return None
+
+
+def command_ms(arguments, root):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, *arguments], cwd=root, capture_output=True)
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed if result.returncode == 0 else None
+
+
+def best(measure, repeat):
+    runs = [measure() for _ in range(repeat)]
+    runs = [run for run in runs if run is not None]
+    return min(runs) if runs else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import and startup times.')
+    parser.add_argument('--root', default=PROJECT_ROOT, help='checkout to measure (default: this one)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--compare', help='JSON file of an earlier run to compare with')
+    args = parser.parse_args()
+
+    # create_app() migrates its database; keep it away from the checkout's millionaire.sqlite3
+    os.environ['DATABASE_URL'] = 'sqlite:///' + temp_database(1000, name='millionaire_startup.sqlite3')
+
+    results = {}
+    for module in MODULES:
+        results[f'import {module}'] = best(lambda: import_time_ms(module, args.root), args.repeat)
+    for name, arguments in COMMANDS.items():
+        results[f'run {name}'] = best(lambda: command_ms(arguments, args.root), args.repeat)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    for name, value in results.items():
+        line = f'{name:>26}: ' + ('   failed' if value is None else f'{value:8.1f} ms')
+        before = baseline.get(name)
+        if before and value:
+            line += f'   (was {before:8.1f} ms, x{before / value:.1f})'
+        print(line)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
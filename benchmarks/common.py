@@ -0,0 +1,88 @@
+"""
+Shared helpers for the benchmark scripts: synthetic question tables and a
+Flask app bound to them.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Make the project root importable when running `python benchmarks/<script>.py`
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+LEVELS = 15
+
+CREATE_TABLE = (
+    'CREATE TABLE IF NOT EXISTS "millionaire"("id" INTEGER, "difficulty" INTEGER, "question" TEXT, '
+    '"correct_answer" TEXT, "answer2" TEXT, "answer3" TEXT, "answer4" TEXT, '
+    '"background_information" TEXT, PRIMARY KEY (id))'
+)
+
+SYLLABLES = ('ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'pe', 'da', 'zu', 'ri', 'an', 'el', 'or')
+
+
+def vocabulary(size=10_000, seed=7):
+    """Returns `size` distinct pseudo-words so search terms have realistic selectivity."""
+    rnd = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))))
+    return sorted(words)
+
+
+WORDS = vocabulary()
+
+
+def synthetic_rows(count, levels=LEVELS, seed=42):
+    """Yields `count` question rows spread evenly over `levels` levels."""
+    rnd = random.Random(seed)
+    for i in range(count):
+        words = ' '.join(rnd.choice(WORDS) for _ in range(6))
+        yield (i % levels, f'Question {i}: which {words}?', f'Right {i}',
+               f'Wrong {i}a', f'Wrong {i}b', f'Wrong {i}c', f'Info about {words}')
+
+
+def seed_database(path, count, levels=LEVELS):
+    """Creates (or replaces) an SQLite file holding `count` synthetic questions."""
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_TABLE)
+    conn.executemany(
+        'INSERT INTO millionaire (difficulty, question, correct_answer, answer2, answer3, answer4, '
+        'background_information) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        synthetic_rows(count, levels))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def temp_database(count, levels=LEVELS, name=None):
+    """Seeds a database in the temp dir and returns its path."""
+    path = os.path.join(tempfile.gettempdir(), name or f'millionaire_bench_{count}.sqlite3')
+    return seed_database(path, count, levels)
+
+
+def make_app(db_path):
+    """Returns a minimal Flask app with the model's `db` bound to db_path and its tables created."""
+    from flask import Flask
+    from model import db, init_db
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    init_db(app)
+    return app
+
+
+def timeit(func, repeat):
+    """Runs func `repeat` times and returns the mean duration in microseconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
@@ -0,0 +1,265 @@
+"""
+Load test for the game and admin APIs.
+
+Seeds a synthetic question table, then simulates concurrent players running
+full games plus an admin client doing CRUD and search traffic, either
+in-process through Flask's test client or against a real local HTTP server.
+Prints (or writes) a JSON report with p50/p95/p99 latency, throughput and the
+number of SQL statements each endpoint executed.
+
+Usage:
+    python benchmarks/loadtest.py [--rows 100000] [--players 20] [--games 10]
+                                  [--mode testclient|server] [--turn] [--output report.json]
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from common import temp_database
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+class Recorder:
+    """Collects client-side latencies per endpoint and server-side query counts."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)   # 'METHOD /path' -> [seconds]
+        self.errors = defaultdict(int)
+        self.queries = defaultdict(int)      # flask endpoint -> SQL statements
+        self.requests = defaultdict(int)     # flask endpoint -> requests served
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            if not ok:
+                self.errors[name] += 1
+
+    def report(self, wall_time):
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            endpoints[name] = {
+                'requests': len(values),
+                'errors': self.errors[name],
+                'p50_ms': percentile(values, 50) * 1000,
+                'p95_ms': percentile(values, 95) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': max(values) * 1000,
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            'wall_time_s': wall_time,
+            'total_requests': total,
+            'throughput_rps': total / wall_time if wall_time else None,
+            'endpoints': endpoints,
+            'queries': {
+                endpoint: {'statements': count, 'per_request': count / max(1, self.requests[endpoint])}
+                for endpoint, count in sorted(self.queries.items())
+            },
+        }
+
+
+def instrument(app, db, recorder):
+    """Counts SQL statements per Flask endpoint via SQLAlchemy engine events."""
+    from flask import has_request_context, request
+    from sqlalchemy import event
+
+    with app.app_context():
+        engine = db.engine
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        endpoint = request.endpoint if has_request_context() else '<startup>'
+        with recorder.lock:
+            recorder.queries[endpoint] += 1
+
+    @app.before_request
+    def count_request():
+        with recorder.lock:
+            recorder.requests[request.endpoint] += 1
+
+
+class TestClientTransport:
+    """Drives the app in-process; one Flask test client per simulated user."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, json_body=None):
+        response = self.client.open(path, method=method, json=json_body)
+        return response.status_code, response.get_json(silent=True), self.client.get_cookie('session')
+
+    def close(self):
+        pass
+
+
+class HttpTransport:
+    """Drives a real HTTP server with a keep-alive requests.Session."""
+
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def request(self, method, path, json_body=None):
+        response = self.session.request(method, self.base_url + path, json=json_body)
+        try:
+            data = response.json()
+        except ValueError:
+            data = None
+        return response.status_code, data, self.session.cookies.get('session')
+
+    def close(self):
+        self.session.close()
+
+
+class Simulation:
+    def __init__(self, app, game_store, recorder, make_transport, accuracy, use_turn):
+        self.app = app
+        self.game_store = game_store
+        self.recorder = recorder
+        self.make_transport = make_transport
+        self.accuracy = accuracy
+        self.use_turn = use_turn
+        self.serializer = app.session_interface.get_signing_serializer(app)
+
+    def call(self, transport, method, path, json_body=None, name=None):
+        start = time.perf_counter()
+        status, data, cookie = transport.request(method, path, json_body)
+        self.recorder.record(name or f'{method} {path.split("?")[0]}', time.perf_counter() - start, status < 400)
+        return status, data, cookie
+
+    def correct_index(self, cookie):
+        """Peeks at the server-side game state so bots can play whole games."""
+        if cookie is None:
+            return None
+        game_id = self.serializer.loads(cookie.value if hasattr(cookie, 'value') else cookie).get('game_id')
+        state = self.game_store.get(game_id)
+        return state.correct_index if state else None
+
+    def choose(self, cookie):
+        correct = self.correct_index(cookie)
+        if correct is not None and random.random() < self.accuracy:
+            return correct
+        return random.randrange(4)
+
+    def play_game(self, transport):
+        if self.use_turn:
+            status, data, cookie = self.call(transport, 'POST', '/api/turn', {'start': True})
+            while status == 200 and data.get('question'):
+                status, data, cookie = self.call(transport, 'POST', '/api/turn',
+                                                 {'answer_index': self.choose(cookie)})
+            return
+        status, data, cookie = self.call(transport, 'POST', '/api/start')
+        while status == 200:
+            status, data, cookie = self.call(transport, 'GET', '/api/question')
+            if status != 200 or 'answers' not in data:
+                return
+            status, data, cookie = self.call(transport, 'POST', '/api/answer',
+                                             {'answer_index': self.choose(cookie)})
+            if status != 200 or not data.get('correct'):
+                return
+
+    def player(self, games):
+        transport = self.make_transport()
+        try:
+            for _ in range(games):
+                self.play_game(transport)
+        finally:
+            transport.close()
+
+    def admin(self, operations, words):
+        transport = self.make_transport()
+        try:
+            for i in range(operations):
+                self.call(transport, 'GET', f'/api/questions?limit=100&after_id={random.randrange(1000)}')
+                self.call(transport, 'GET', f'/api/questions/search/{random.choice(words)}?limit=20',
+                          name='GET /api/questions/search')
+                status, data, _ = self.call(transport, 'POST', '/api/questions', {
+                    'level': random.randrange(15), 'text': f'Load test question {i} {random.random()}',
+                    'correct_answer': 'yes', 'wrong_answers': ['no', 'maybe', 'never']})
+                if status == 200 and data:
+                    question_id = data['id']
+                    self.call(transport, 'GET', f'/api/questions/{question_id}', name='GET /api/questions/<id>')
+                    self.call(transport, 'PUT', f'/api/questions/{question_id}', {'info': 'updated'},
+                              name='PUT /api/questions/<id>')
+                    self.call(transport, 'DELETE', f'/api/questions/{question_id}',
+                              name='DELETE /api/questions/<id>')
+        finally:
+            transport.close()
+
+
+def start_server(app):
+    """Runs app on a threaded werkzeug server on a free local port."""
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # no access log per request
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Load test the Millionaire game and admin APIs.')
+    parser.add_argument('--rows', type=int, default=100_000, help='synthetic questions to seed')
+    parser.add_argument('--players', type=int, default=20, help='concurrent players')
+    parser.add_argument('--games', type=int, default=10, help='games per player')
+    parser.add_argument('--admin-ops', type=int, default=50, help='CRUD/search rounds of the admin client')
+    parser.add_argument('--accuracy', type=float, default=0.8, help='chance a bot answers correctly')
+    parser.add_argument('--mode', choices=('testclient', 'server'), default='testclient')
+    parser.add_argument('--turn', action='store_true', help='play through POST /api/turn')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args(argv)
+
+    db_path = temp_database(args.rows, name=f'millionaire_load_{args.rows}.sqlite3')
+    import app as millionaire
+    from model import db
+    from common import WORDS
+    app = millionaire.create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path})
+    game_store = app.extensions['millionaire'].game_store
+
+    recorder = Recorder()
+    instrument(app, db, recorder)
+
+    server = None
+    if args.mode == 'server':
+        server, base_url = start_server(app)
+        make_transport = lambda: HttpTransport(base_url)
+    else:
+        make_transport = lambda: TestClientTransport(app)
+
+    simulation = Simulation(app, game_store, recorder, make_transport, args.accuracy, args.turn)
+    threads = [threading.Thread(target=simulation.player, args=(args.games,)) for _ in range(args.players)]
+    threads.append(threading.Thread(target=simulation.admin, args=(args.admin_ops, WORDS)))
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall_time = time.perf_counter() - start
+    if server:
+        server.shutdown()
+
+    report = recorder.report(wall_time)
+    report['config'] = vars(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
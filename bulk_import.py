@@ -0,0 +1,212 @@
+"""
+Streaming bulk importer for question files.
+
+Supported inputs:
+    *.txt   tab separated, as in millionaire.txt
+            (Difficulty, Question, Correct Answer, Answer #2-4, Background information)
+    *.csv   semicolon separated with a header row, as in SQLAlchemy Millionaire/millionaire.csv
+    NDJSON  one JSON object per line with the API's field names, used by POST /api/questions/bulk
+
+Questions already in the table (same content hash) get their level and info updated.
+
+Usage:
+    python bulk_import.py <file> [--db millionaire.sqlite3] [--batch-size 5000]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from records import content_hash
+
+# Rows written per executemany() call
+BATCH_SIZE = 5000
+# Number of rejected rows reported back in detail
+MAX_REPORTED_ERRORS = 100
+
+UPSERT_SQL = (
+    'INSERT INTO millionaire (difficulty, question, correct_answer, answer2, answer3, answer4, '
+    'background_information, content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+    'ON CONFLICT(content_hash) DO UPDATE SET difficulty = excluded.difficulty, '
+    'background_information = excluded.background_information'
+)
+
+
+class ImportResult:
+    """Counters of one import run."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors = []  # (line number, message), capped at MAX_REPORTED_ERRORS
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    def to_dict(self):
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'errors': [{'line': line, 'error': message} for line, message in self.errors]
+        }
+
+
+def _text(value, field):
+    """Stripped string of an optional text field. Raises ValueError for non-strings."""
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError(f'Expected a string for {field}, got {value!r}')
+    return value.strip()
+
+
+def make_row(level, text, correct_answer, wrong_answers, info):
+    """Validates one question and returns the tuple written to the DB. Raises ValueError."""
+    try:
+        level = int(level)
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid level: {level!r}')
+    text = _text(text, 'text')
+    correct_answer = _text(correct_answer, 'correct_answer')
+    if not isinstance(wrong_answers, (list, tuple)):
+        raise ValueError(f'Expected a list of wrong answers, got {wrong_answers!r}')
+    wrong_answers = [_text(answer, 'wrong_answers') for answer in wrong_answers]
+    info = _text(info, 'info')
+    if not text:
+        raise ValueError('Missing question text')
+    if not correct_answer:
+        raise ValueError('Missing correct answer')
+    if len(wrong_answers) != 3 or not all(wrong_answers):
+        raise ValueError('Expected 3 wrong answers')
+    return (level, text, correct_answer, *wrong_answers, info,
+            content_hash(text, correct_answer, wrong_answers))
+
+
+def read_tsv(lines):
+    """Yields (line number, row or ValueError) for the millionaire.txt format."""
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if not line.strip() or line.startswith('#'):
+            continue
+        parts = line.split('\t')
+        if len(parts) < 6:
+            yield number, ValueError(f'Expected at least 6 columns, got {len(parts)}')
+            continue
+        try:
+            yield number, make_row(parts[0], parts[1], parts[2], parts[3:6], parts[6] if len(parts) > 6 else '')
+        except ValueError as e:
+            yield number, e
+
+
+def read_csv(lines, delimiter=';'):
+    """Yields (line number, row or ValueError) for CSV files with a header row."""
+    reader = csv.DictReader(lines, delimiter=delimiter)
+    for record in reader:
+        try:
+            yield reader.line_num, make_row(
+                record.get('difficulty'), record.get('question'), record.get('correct_answer'),
+                [record.get('answer2'), record.get('answer3'), record.get('answer4')],
+                record.get('background_information'))
+        except ValueError as e:
+            yield reader.line_num, e
+
+
+def read_ndjson(lines):
+    """Yields (line number, row or ValueError) for NDJSON with the API's field names."""
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError('Expected a JSON object')
+            yield number, make_row(data.get('level'), data.get('text'), data.get('correct_answer'),
+                                   data.get('wrong_answers') or [], data.get('info'))
+        except ValueError as e:
+            yield number, e
+
+
+def reader_for(path):
+    return read_csv if path.lower().endswith('.csv') else read_tsv
+
+
+def import_rows(connection, rows, batch_size=BATCH_SIZE, progress=None):
+    """
+    Writes the (line number, row or ValueError) pairs of a reader in batches, inside the caller's
+    transaction. progress: optional callable(ImportResult) called after every batch.
+    """
+    result = ImportResult()
+    batch = {}
+
+    def flush():
+        hashes = list(batch)
+        existing = 0
+        # Count rows that will be updated rather than inserted (chunked for SQLite's parameter limit)
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            existing += connection.exec_driver_sql(
+                f'SELECT COUNT(*) FROM millionaire WHERE content_hash IN ({placeholders})',
+                tuple(chunk)).scalar()
+        connection.exec_driver_sql(UPSERT_SQL, list(batch.values()))
+        result.inserted += len(batch) - existing
+        result.updated += existing
+        batch.clear()
+        if progress:
+            progress(result)
+
+    for number, row in rows:
+        if isinstance(row, ValueError):
+            result.reject(number, str(row))
+            continue
+        # Duplicates inside a batch collapse to the last occurrence
+        batch[row[-1]] = row
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return result
+
+
+def import_file(engine, path, batch_size=BATCH_SIZE, progress=None):
+    """Imports a .txt (TSV) or .csv question file in a single transaction."""
+    with open(path, 'r', encoding='utf-8', newline='') as file, engine.begin() as connection:
+        return import_rows(connection, reader_for(path)(file), batch_size, progress)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Bulk import questions into the millionaire database.')
+    parser.add_argument('file', help='millionaire.txt style TSV or millionaire.csv style CSV')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                     'millionaire.sqlite3'))
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    # Make sure the content hash column and the other managed tables exist
+    from model import create_db_app, db
+    app = create_db_app('sqlite:///' + os.path.abspath(args.db))
+
+    start = time.perf_counter()
+
+    def progress(result):
+        done = result.inserted + result.updated
+        print(f'\r{done:,} questions written, {result.rejected:,} rejected '
+              f'({done / (time.perf_counter() - start):,.0f}/s)', end='', flush=True)
+
+    with app.app_context():
+        result = import_file(db.engine, args.file, args.batch_size, progress)
+    print(f'\nInserted: {result.inserted}, updated: {result.updated}, rejected: {result.rejected}')
+    for line, message in result.errors:
+        print(f'  line {line}: {message}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,261 @@
+"""
+Answer counters and the pandas/NumPy difficulty recalibration.
+
+Usage:
+    python calibration.py [--rebucket] [--min-answers 30] [--db millionaire.sqlite3]
+"""
+import argparse
+import atexit
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+
+from sqlalchemy.exc import DBAPIError
+
+from model import hour_bucket
+from periodic import PeriodicThread
+
+log = logging.getLogger(__name__)
+
+# Adds a flush's counts to the stored ones
+UPSERT_SQL = (
+    'INSERT INTO question_stats (question_id, shown, answered, correct) VALUES (?, ?, ?, ?) '
+    'ON CONFLICT(question_id) DO UPDATE SET shown = shown + excluded.shown, '
+    'answered = answered + excluded.answered, correct = correct + excluded.correct'
+)
+ROLLUP_SQL = (
+    'INSERT INTO answer_rollup (hour, level, answered, correct) VALUES (?, ?, ?, ?) '
+    'ON CONFLICT(hour, level) DO UPDATE SET answered = answered + excluded.answered, '
+    'correct = correct + excluded.correct'
+)
+
+# Questions need this many answers before they are moved to another level
+MIN_ANSWERS = 30
+# Weight, in answers, of the level's average correct rate in a question's estimate.
+# Keeps a question answered twice from jumping to 0% or 100%.
+PRIOR_ANSWERS = 10
+
+
+class AnswerCounters:
+    """
+    In-memory per-question and per-(hour, level) counters, added to
+    question_stats and answer_rollup every `flush_interval` seconds.
+    `flushes` counts the flushes that wrote anything.
+    """
+
+    def __init__(self, engine, flush_interval=5.0):
+        self.engine = engine
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self._counts = {}  # question id -> [shown, answered, correct]
+        self._hours = {}   # (hour, level) -> [answered, correct]
+        self._lock = threading.Lock()
+        self._worker = PeriodicThread(self.flush, flush_interval, 'answer-counters')
+
+    def _entry(self, question_id):
+        counts = self._counts.get(question_id)
+        if counts is None:
+            counts = self._counts[question_id] = [0, 0, 0]
+        return counts
+
+    def shown(self, question_id):
+        with self._lock:
+            self._entry(question_id)[0] += 1
+
+    def answered(self, question_id, correct, level=None):
+        """Counts an answer; with `level` (the question's level) also in the hourly rollup."""
+        with self._lock:
+            counts = self._entry(question_id)
+            counts[1] += 1
+            counts[2] += bool(correct)
+            if level is not None:
+                key = (hour_bucket(time.time()), level)
+                hour = self._hours.get(key)
+                if hour is None:
+                    hour = self._hours[key] = [0, 0]
+                hour[0] += 1
+                hour[1] += bool(correct)
+
+    def flush(self):
+        """Adds the counts gathered since the last flush to the tables. Returns the number of questions."""
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            hours, self._hours = self._hours, {}
+        if not counts and not hours:
+            return 0
+        try:
+            with self.engine.begin() as connection:
+                if counts:
+                    connection.exec_driver_sql(UPSERT_SQL, [(question_id, *values) for question_id, values in counts.items()])
+                if hours:
+                    connection.exec_driver_sql(ROLLUP_SQL, [(*key, *values) for key, values in hours.items()])
+        except DBAPIError:
+            log.exception('Writing answer counters failed; retrying with the next flush')
+            with self._lock:
+                for question_id, values in counts.items():
+                    entry = self._entry(question_id)
+                    for i, value in enumerate(values):
+                        entry[i] += value
+                for key, values in hours.items():
+                    entry = self._hours.setdefault(key, [0, 0])
+                    entry[0] += values[0]
+                    entry[1] += values[1]
+            return 0
+        self.flushes += 1
+        return len(counts)
+
+    def start(self):
+        atexit.register(self.close)
+        return self._worker.start()
+
+    def close(self):
+        self._worker.close()
+        self.flush()
+
+
+def load_stats(connection):
+    """DataFrame of every question with a level: id, level, answered, correct (0 without stats)."""
+    import numpy as np
+    import pandas as pd
+
+    # Plain DB-API tuples flattened by fromiter; converting SQLAlchemy rows one by one is ~100x slower
+    cursor = connection.connection.cursor()
+    try:
+        rows = cursor.execute(
+            'SELECT m.id, m.difficulty, COALESCE(s.answered, 0), COALESCE(s.correct, 0) '
+            'FROM millionaire m LEFT JOIN question_stats s ON s.question_id = m.id '
+            'WHERE m.difficulty IS NOT NULL').fetchall()
+    finally:
+        cursor.close()
+    columns = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=4 * len(rows))
+    columns = columns.reshape(-1, 4).T
+    return pd.DataFrame({'id': columns[0], 'level': columns[1], 'answered': columns[2], 'correct': columns[3]})
+
+
+def estimate_difficulty(frame, prior_answers=PRIOR_ANSWERS):
+    """
+    Share of wrong answers per question, smoothed towards its level's average
+    (a beta prior worth `prior_answers` answers). Returns a float Series.
+    """
+    totals = frame.groupby('level')[['answered', 'correct']].transform('sum')
+    overall = frame['correct'].sum() / max(frame['answered'].sum(), 1)
+    # Levels nobody answered yet fall back to the overall rate
+    level_rate = (totals['correct'] / totals['answered'].where(totals['answered'] > 0)).fillna(overall)
+    rate = (frame['correct'] + prior_answers * level_rate) / (frame['answered'] + prior_answers)
+    return 1.0 - rate
+
+
+def rebucket(frame, difficulty, min_answers=MIN_ANSWERS):
+    """
+    New level per question (int array aligned with frame): questions with `min_answers` answers
+    are dealt out to their levels by difficulty, each level keeping its count.
+    """
+    import numpy as np
+
+    levels = frame['level'].to_numpy().copy()
+    eligible = np.flatnonzero(frame['answered'].to_numpy() >= min_answers)
+    if len(eligible) < 2:
+        return levels
+    sizes = np.bincount(levels[eligible] - levels[eligible].min())
+    targets = np.repeat(np.arange(len(sizes)) + levels[eligible].min(), sizes)
+    order = np.argsort(difficulty.to_numpy()[eligible], kind='stable')
+    levels[eligible[order]] = targets
+    return levels
+
+
+def recalibrate(connection, rebucket_levels=False, min_answers=MIN_ANSWERS, prior_answers=PRIOR_ANSWERS):
+    """
+    Stores difficulty estimates and, with rebucket_levels, moves questions to matching levels.
+    Returns a summary dict; callers must run model.questions_changed() if 'moved' > 0.
+    """
+    import numpy as np
+
+    frame = load_stats(connection)
+    summary = {'questions': len(frame), 'with_answers': 0, 'answers': 0, 'moved': 0}
+    if frame.empty:
+        return summary
+
+    difficulty = estimate_difficulty(frame, prior_answers)
+    answered = frame['answered'].to_numpy() > 0
+    summary['with_answers'] = int(answered.sum())
+    summary['answers'] = int(frame['answered'].sum())
+    if not answered.any():
+        return summary
+    connection.exec_driver_sql(
+        'UPDATE question_stats SET difficulty_estimate = ? WHERE question_id = ?',
+        list(zip(difficulty.to_numpy()[answered].tolist(), frame['id'].to_numpy()[answered].tolist())))
+
+    if rebucket_levels:
+        levels = rebucket(frame, difficulty, min_answers)
+        moved = np.flatnonzero(levels != frame['level'].to_numpy())
+        if len(moved):
+            connection.exec_driver_sql(
+                'UPDATE millionaire SET difficulty = ? WHERE id = ?',
+                list(zip(levels[moved].tolist(), frame['id'].to_numpy()[moved].tolist())))
+        summary['moved'] = len(moved)
+    return summary
+
+
+class Calibrator:
+    """
+    Runs recalibrate() every `interval` seconds on a daemon thread, after flushing `counters`, until close().
+    notify(): called after questions were moved (the app's model.questions_changed()).
+    """
+
+    def __init__(self, engine, interval, counters=None, rebucket_levels=False, min_answers=MIN_ANSWERS, notify=None):
+        self.engine = engine
+        self.interval = interval
+        self.counters = counters
+        self.rebucket_levels = rebucket_levels
+        self.min_answers = min_answers
+        self.notify = notify
+        self._worker = PeriodicThread(self.run_once, interval, 'calibration')
+
+    def run_once(self):
+        if self.counters is not None:
+            self.counters.flush()
+        start = time.perf_counter()
+        with self.engine.begin() as connection:
+            summary = recalibrate(connection, self.rebucket_levels, self.min_answers)
+        if summary['moved'] and self.notify is not None:
+            self.notify()
+        log.info('Recalibrated %s in %.2fs', summary, time.perf_counter() - start)
+        return summary
+
+    def start(self):
+        return self._worker.start()
+
+    def close(self):
+        self._worker.close()
+
+
+def start_calibration(engine, interval, counters=None, rebucket_levels=False, min_answers=MIN_ANSWERS, notify=None):
+    """Starts a Calibrator. Returns it; close() stops it."""
+    calibrator = Calibrator(engine, interval, counters, rebucket_levels, min_answers, notify)
+    calibrator.start()
+    return calibrator
+
+
+def main(argv):
+    from model import create_db_app, db
+
+    parser = argparse.ArgumentParser(description='Estimate question difficulty from answer statistics.')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'millionaire.sqlite3'))
+    parser.add_argument('--rebucket', action='store_true', help='move questions to the level matching their difficulty')
+    parser.add_argument('--min-answers', type=int, default=MIN_ANSWERS)
+    args = parser.parse_args(argv)
+
+    app = create_db_app('sqlite:///' + os.path.abspath(args.db))
+    start = time.perf_counter()
+    with app.app_context(), db.engine.begin() as connection:
+        summary = recalibrate(connection, args.rebucket, args.min_answers)
+    print(f"{summary['questions']:,} questions, {summary['with_answers']:,} with answers "
+          f"({summary['answers']:,} answers), {summary['moved']:,} moved, "
+          f"{time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,180 @@
+"""
+Question change feed, read from the trigger-written question_changes log
+(see model.QuestionChange): GET /api/questions/changes, its SSE stream and
+the follower that applies other processes' writes to this one.
+"""
+import threading
+import time
+
+from periodic import PeriodicThread
+from records import QuestionRecord
+
+# Upper bound for ?limit= on the change feed
+MAX_CHANGES = 1000
+# Seconds between SSE keep-alive comments when nothing changed
+KEEPALIVE_INTERVAL = 15
+
+_QUESTION_COLUMNS = ('id', 'difficulty', 'question', 'correct_answer', 'answer2', 'answer3', 'answer4',
+                     'background_information')  # QuestionRecord.FIELDS order
+
+
+def last_seq(connection):
+    """Seq of the newest change ever logged (0 if none), pruned or not."""
+    row = connection.exec_driver_sql(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'question_changes'").fetchone()
+    return row[0] if row else 0
+
+
+def _read(connection, since, limit):
+    """(reply without 'changes', [(seq, question id, FIELDS row or None if deleted)]); see read_changes()."""
+    newest = last_seq(connection)
+    oldest = connection.exec_driver_sql('SELECT MIN(seq) FROM question_changes').scalar()
+    reset = since > newest or since < (oldest if oldest is not None else newest + 1) - 1
+    reply = {'since': since, 'last_seq': newest if reset else since, 'more': False, 'reset': reset}
+    if reset:
+        return reply, []
+
+    entries = connection.exec_driver_sql(
+        'SELECT seq, question_id FROM question_changes WHERE seq > ? ORDER BY seq LIMIT ?',
+        (since, limit)).fetchall()
+    if not entries:
+        return reply, []
+    latest = {}
+    for seq, question_id in entries:
+        latest.pop(question_id, None)
+        latest[question_id] = seq  # re-inserted, so the dict stays in seq order
+    rows = {}
+    ids = list(latest)
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        for row in connection.exec_driver_sql(
+                f"SELECT {', '.join(_QUESTION_COLUMNS)} FROM millionaire WHERE id IN ({', '.join('?' * len(chunk))})",
+                tuple(chunk)):
+            rows[row[0]] = tuple(row)
+    reply['last_seq'] = entries[-1][0]
+    reply['more'] = len(entries) == limit
+    return reply, [(seq, question_id, rows.get(question_id)) for question_id, seq in latest.items()]
+
+
+def read_changes(connection, since, limit=MAX_CHANGES):
+    """
+    Changes after `since` (at most `limit` log entries), one per question with its current to_dict().
+    'reset' means the entries after `since` are gone and the client must reload the full list.
+    """
+    reply, changes = _read(connection, since, limit)
+    reply['changes'] = [{'seq': seq, 'id': question_id, 'deleted': row is None,
+                         'question': QuestionRecord(*row).to_dict() if row is not None else None}
+                        for seq, question_id, row in changes]
+    return reply
+
+
+def prune(connection, retention):
+    """Deletes log entries older than `retention` seconds. Returns the number deleted."""
+    return connection.exec_driver_sql('DELETE FROM question_changes WHERE changed_at < ?',
+                                      (time.time() - retention,)).rowcount
+
+
+class ChangeFollower:
+    """
+    Reports new log entries to notify(updated, deleted) (the app's model.questions_changed())
+    every `interval` seconds and prunes old ones.
+    """
+
+    # Batches with more changed questions than this reload everything instead
+    max_deltas = 100
+
+    def __init__(self, engine, notify, interval=2.0, retention=7 * 24 * 3600, prune_interval=3600):
+        self.engine = engine
+        self.notify = notify
+        self.interval = interval
+        self.retention = retention
+        self.prune_interval = prune_interval
+        self.seq = None
+        self._next_prune = None
+        self._worker = PeriodicThread(self.run_once, interval, 'change-follower')
+
+    def poll(self):
+        """Reports the changes since the last poll. Returns how many changed questions were reported."""
+        with self.engine.connect() as connection:
+            if self.seq is None:
+                self.seq = last_seq(connection)
+                return 0
+            count = 0
+            while True:
+                reply, changes = _read(connection, self.seq, MAX_CHANGES)
+                self.seq = reply['last_seq']
+                if reply['reset'] or len(changes) > self.max_deltas:
+                    # Applying row by row would cost more than reloading
+                    self.notify()
+                    count += len(changes)
+                elif changes:
+                    self.notify(updated=[QuestionRecord(*row) for _, _, row in changes if row is not None],
+                                deleted=[question_id for _, question_id, row in changes if row is None])
+                    count += len(changes)
+                if not reply['more']:
+                    return count
+
+    def run_once(self):
+        """Polls, and prunes the log every `prune_interval` seconds."""
+        self.poll()
+        if self.retention and time.monotonic() >= self._next_prune:
+            self._next_prune = time.monotonic() + self.prune_interval
+            with self.engine.begin() as connection:
+                prune(connection, self.retention)
+
+    def start(self):
+        self.poll()  # start from the current end of the log
+        self._next_prune = time.monotonic() + self.prune_interval
+        return self._worker.start()
+
+    def close(self):
+        self._worker.close()
+
+
+class ChangeNotifier:
+    """Wakes SSE streams when questions_changed() runs for the app (including ChangeFollower's reports)."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    def __call__(self, updated, deleted):
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation, timeout):
+        """Waits until a change after `generation` or `timeout` seconds. Returns the current generation."""
+        with self._condition:
+            if self._generation == generation:
+                self._condition.wait(timeout)
+            return self._generation
+
+    @property
+    def generation(self):
+        return self._generation
+
+
+def event_stream(engine, notifier, since, keepalive=KEEPALIVE_INTERVAL):
+    """Yields SSE 'changes' events (read_changes() replies) and keep-alives; ends after a 'reset' event."""
+    import payloads
+
+    generation = notifier.generation
+    yield 'retry: 5000\n\n'
+    while True:
+        with engine.connect() as connection:
+            reply = read_changes(connection, since)
+        while reply['changes'] or reply['reset']:
+            since = reply['last_seq']
+            yield f"id: {since}\nevent: {'reset' if reply['reset'] else 'changes'}\n" \
+                  f"data: {payloads.dumps(reply).decode('utf-8')}\n\n"
+            if reply['reset']:
+                return
+            if not reply['more']:
+                break
+            with engine.connect() as connection:
+                reply = read_changes(connection, since)
+        new_generation = notifier.wait(generation, keepalive)
+        if new_generation == generation:
+            yield ': keep-alive\n\n'
+        generation = new_generation
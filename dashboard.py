@@ -0,0 +1,147 @@
+"""
+/admin/stats charts (pandas/plotly), built from the rollup tables and
+question_stats only and cached until the next rollup tick.
+"""
+import hashlib
+import logging
+import threading
+import time
+
+from calibration import MIN_ANSWERS
+from model import hour_bucket
+from periodic import PeriodicThread
+
+log = logging.getLogger(__name__)
+
+# Hours of the games-per-hour chart
+HOURS = 48
+# Width of the per-question accuracy histogram's bins
+ACCURACY_BINS = 20
+# Questions listed in the "hardest questions" table
+HARDEST = 10
+
+
+class StatsSnapshot:
+    """One build of the dashboard: the figures' JSON and the figures shown as HTML."""
+    __slots__ = ('figures', 'totals', 'hardest', 'etag', 'built_at', 'build_seconds')
+
+    def __init__(self, figures, totals, hardest, built_at, build_seconds):
+        self.figures = figures  # JSON bytes: {chart name: plotly figure}
+        self.totals = totals
+        self.hardest = hardest
+        self.etag = hashlib.blake2b(figures, digest_size=8).hexdigest()
+        self.built_at = built_at
+        self.build_seconds = build_seconds
+
+
+def _rows(connection, sql, parameters=()):
+    return connection.exec_driver_sql(sql, parameters).fetchall()
+
+
+def _figure_json(figure):
+    return figure.to_json().encode('utf-8')
+
+
+def build_snapshot(connection, hours=HOURS, min_answers=MIN_ANSWERS, now=None):
+    """Reads the rollups and builds a StatsSnapshot. connection: an SQLAlchemy connection."""
+    import pandas as pd
+    import plotly.express as px
+
+    start = time.perf_counter()
+    now = time.time() if now is None else now
+    figures = {}
+
+    levels = pd.DataFrame(_rows(connection,
+                                'SELECT difficulty, COUNT(*) FROM millionaire WHERE difficulty IS NOT NULL '
+                                'GROUP BY difficulty'), columns=['level', 'questions'])
+    figures['questions_per_level'] = px.bar(levels, x='level', y='questions', title='Questions per level')
+
+    answers = pd.DataFrame(_rows(connection,
+                                 'SELECT level, SUM(answered), SUM(correct) FROM answer_rollup GROUP BY level'),
+                           columns=['level', 'answered', 'correct'])
+    answers['accuracy'] = answers['correct'] / answers['answered']
+    figure = px.bar(answers, x='level', y='accuracy', hover_data=['answered', 'correct'],
+                    title='Answer accuracy per level')
+    figures['accuracy_per_level'] = figure.update_yaxes(tickformat='.0%', range=[0, 1])
+
+    # Binned in SQL: one row per (level, bin) instead of one per question
+    bins = pd.DataFrame(_rows(connection,
+                              f'SELECT m.difficulty, MIN(s.correct * {ACCURACY_BINS} / s.answered, {ACCURACY_BINS - 1}), '
+                              'COUNT(*) FROM question_stats s JOIN millionaire m ON m.id = s.question_id '
+                              'WHERE s.answered >= ? GROUP BY 1, 2', (min_answers,)),
+                        columns=['level', 'bin', 'questions'])
+    bins['accuracy'] = bins['bin'] / ACCURACY_BINS
+    bins['level'] = bins['level'].astype(str)
+    figure = px.bar(bins, x='accuracy', y='questions', color='level',
+                    title=f'Answer accuracy per question (questions with at least {min_answers} answers)')
+    figures['accuracy_per_question'] = figure.update_xaxes(tickformat='.0%', range=[0, 1])
+
+    since = hour_bucket(now) - (hours - 1) * 3600
+    games = pd.DataFrame(_rows(connection, 'SELECT hour, bank, games, won FROM game_rollup WHERE hour >= ?', (since,)),
+                         columns=['hour', 'bank', 'games', 'won'])
+    games['hour'] = pd.to_datetime(games['hour'], unit='s', utc=True)
+    games['bank'] = games['bank'].replace('', 'default')
+    figure = px.bar(games, x='hour', y='games', color='bank', hover_data=['won'],
+                    title=f'Games per hour (last {hours} hours, UTC)')
+    figures['games_per_hour'] = figure.update_xaxes(range=[pd.to_datetime(since, unit='s', utc=True),
+                                                           pd.to_datetime(since + hours * 3600, unit='s', utc=True)])
+
+    game_totals = _rows(connection, 'SELECT TOTAL(games), TOTAL(won) FROM game_rollup')[0]
+    totals = {'questions': int(levels['questions'].sum()), 'answers': int(answers['answered'].sum()),
+              'correct': int(answers['correct'].sum()), 'games': int(game_totals[0]), 'won': int(game_totals[1])}
+    hardest = [dict(zip(('id', 'level', 'text', 'answered', 'correct'), row)) for row in _rows(
+        connection,
+        'SELECT m.id, m.difficulty, m.question, s.answered, s.correct FROM question_stats s '
+        'JOIN millionaire m ON m.id = s.question_id WHERE s.answered >= ? '
+        'ORDER BY CAST(s.correct AS REAL) / s.answered, s.answered DESC LIMIT ?', (min_answers, HARDEST))]
+
+    body = b'{' + b','.join(b'"%s":%s' % (name.encode('ascii'), _figure_json(figure))
+                            for name, figure in figures.items()) + b'}'
+    return StatsSnapshot(body, totals, hardest, now, time.perf_counter() - start)
+
+
+class StatsDashboard:
+    """
+    The current StatsSnapshot, rebuilt every `interval` seconds if the tick (the sources' flushes,
+    the question version, the hour) changed; with `interval` 0, on the next snapshot() instead.
+    """
+
+    def __init__(self, engine, sources=(), interval=60, hours=HOURS, min_answers=MIN_ANSWERS):
+        self.engine = engine
+        self.sources = sources
+        self.interval = interval
+        self.hours = hours
+        self.min_answers = min_answers
+        self._snapshot = None
+        self._tick = None
+        self._lock = threading.Lock()
+        self._worker = PeriodicThread(self.refresh, interval, 'stats-dashboard')
+
+    def tick(self):
+        with self.engine.connect() as connection:
+            version = connection.exec_driver_sql('SELECT version FROM millionaire_version WHERE id = 1').scalar()
+        return tuple(source.flushes for source in self.sources) + (version, hour_bucket(time.time()))
+
+    def refresh(self, force=False):
+        """Rebuilds the snapshot if the tick changed (or `force`). Returns True if it did."""
+        with self._lock:
+            tick = self.tick()
+            if not force and self._snapshot is not None and tick == self._tick:
+                return False
+            with self.engine.connect() as connection:
+                snapshot = build_snapshot(connection, self.hours, self.min_answers)
+            self._snapshot, self._tick = snapshot, tick
+        log.info('Rebuilt the stats dashboard in %.3fs', snapshot.build_seconds)
+        return True
+
+    def snapshot(self):
+        """The last build; built here only before the first one or without a background thread."""
+        if self._snapshot is None or not self.interval:
+            self.refresh()
+        return self._snapshot
+
+    def start(self):
+        return self._worker.start()
+
+    def close(self):
+        self._worker.close()
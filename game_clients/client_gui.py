@@ -1,8 +1,64 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox
 import requests
 
 API_BASE = "http://127.0.0.1:5000/api"
+# (connect, read) timeouts in seconds; a dead server must not leave the client waiting forever
+REQUEST_TIMEOUT = (3.05, 10)
+# How often the Tk loop picks up finished requests, in ms
+POLL_INTERVAL = 20
+
+
+class ApiWorker:
+    """
+    Runs HTTP requests on a background thread so the Tk main loop never blocks.
+    Requests run one at a time in submission order (they share the game's
+    session cookie); each callback is called on the Tk thread via root.after
+    with (data, error), exactly one of them not None.
+    """
+
+    def __init__(self, root, session):
+        self.root = root
+        self.session = session
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="api-worker", daemon=True)
+        self._thread.start()
+        self.root.after(POLL_INTERVAL, self._deliver)
+
+    def submit(self, method, path, callback, json=None):
+        self._requests.put((method, path, json, callback))
+
+    def stop(self):
+        self._requests.put(None)
+
+    def _run(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            method, path, json, callback = item
+            try:
+                response = self.session.request(method, f"{API_BASE}{path}", json=json, timeout=REQUEST_TIMEOUT)
+                data = response.json()
+                if response.status_code >= 400 and 'error' not in data:
+                    data['error'] = data.get('message', f"HTTP {response.status_code}")
+                self._results.put((callback, data, None))
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self._results.put((callback, None, e))
+
+    def _deliver(self):
+        # Tk widgets may only be touched from the main thread, so results are handed over here
+        try:
+            while True:
+                callback, data, error = self._results.get_nowait()
+                callback(data, error)
+        except queue.Empty:
+            pass
+        self.root.after(POLL_INTERVAL, self._deliver)
+
 
 class MillionaireClient:
     def __init__(self, root):
@@ -11,6 +67,9 @@ class MillionaireClient:
         self.root.geometry("600x400")
 
         self.session = requests.Session()
+        self.worker = ApiWorker(root, self.session)
+        # The next level's question, sent along with the current one (POST /api/turn with prefetch)
+        self.prefetched = None
 
         # UI Elements
         self.header_frame = tk.Frame(root)
@@ -38,8 +97,20 @@ class MillionaireClient:
         self.start_button = tk.Button(root, text="Start Game", font=("Arial", 14), bg="green", fg="white", command=self.start_game)
         self.start_button.pack(pady=20)
 
+        self.status_label = tk.Label(root, text="", font=("Arial", 10), fg="gray")
+        self.status_label.pack(side=tk.BOTTOM, pady=5)
+
         # Initial State
         self.disable_answers()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def close(self):
+        self.worker.stop()
+        self.root.destroy()
+
+    def set_busy(self, busy):
+        self.status_label.config(text="Waiting for server..." if busy else "")
+        self.start_button.config(state=tk.DISABLED if busy else tk.NORMAL)
 
     def disable_answers(self):
         for btn in self.answer_buttons:
@@ -50,59 +121,64 @@ class MillionaireClient:
             btn.config(state=tk.NORMAL)
 
     def start_game(self):
-        try:
-            response = self.session.post(f"{API_BASE}/start")
-            if response.status_code == 200:
-                data = response.json()
-                self.update_stats(data['level'], data['score'])
-                self.start_button.pack_forget()
-                self.fetch_question()
-            else:
-                messagebox.showerror("Error", "Could not start game. Is the server running?")
-        except requests.exceptions.ConnectionError:
-            messagebox.showerror("Error", "Could not connect to server. Make sure app.py is running!")
+        self.set_busy(True)
+        self.worker.submit("POST", "/turn", self.on_started, json={'start': True, 'prefetch': True})
 
-    def fetch_question(self):
-        try:
-            response = self.session.get(f"{API_BASE}/question")
-            data = response.json()
-
-            if data.get('status') == 'win':
-                self.game_over(True, data.get('score'))
-                return
-
-            if 'error' in data:
-                messagebox.showerror("Error", data['error'])
-                return
-
-            self.question_label.config(text=data['text'])
-            answers = data['answers']
-
-            for i, btn in enumerate(self.answer_buttons):
-                if i < len(answers):
-                    btn.config(text=f"{chr(65+i)}. {answers[i]}", state=tk.NORMAL)
-                else:
-                    btn.config(text="", state=tk.DISABLED)
-
-        except Exception as e:
-            messagebox.showerror("Error", f"Error fetching question: {e}")
-
-    def submit_answer(self, index):
-        try:
-            response = self.session.post(f"{API_BASE}/answer", json={'answer_index': index})
-            data = response.json()
-
-            if data.get('correct'):
-                self.update_stats(data['level'], data['score'])
-                messagebox.showinfo("Correct!", "That is correct!")
-                self.fetch_question()
-            elif data.get('game_over'):
-                self.game_over(False, data.get('score'))
+    def on_started(self, data, error):
+        self.set_busy(False)
+        if error is not None:
+            messagebox.showerror("Error", "Could not connect to server. Make sure app.py is running!")
+            return
+        if 'error' in data:
+            messagebox.showerror("Error", f"Could not start game: {data['error']}")
+            return
+        if data.get('status') == 'win':  # no questions at all
+            self.game_over(True, data.get('score'))
+            return
+        self.update_stats(data['level'], data['score'])
+        self.start_button.pack_forget()
+        self.prefetched = data.get('prefetched')
+        self.show_question(data['question'])
+
+    def show_question(self, question):
+        self.question_label.config(text=question['text'])
+        answers = question['answers']
+
+        for i, btn in enumerate(self.answer_buttons):
+            if i < len(answers):
+                btn.config(text=f"{chr(65+i)}. {answers[i]}", state=tk.NORMAL)
             else:
-                messagebox.showerror("Error", data.get('error', "Unknown error"))
+                btn.config(text="", state=tk.DISABLED)
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Error submitting answer: {e}")
+    def submit_answer(self, index):
+        # No second click while the answer is on its way
+        for btn in self.answer_buttons:
+            btn.config(state=tk.DISABLED)
+        self.set_busy(True)
+        self.worker.submit("POST", "/turn", self.on_answered, json={'answer_index': index, 'prefetch': True})
+
+    def on_answered(self, data, error):
+        self.set_busy(False)
+        if error is not None:
+            messagebox.showerror("Error", f"Error submitting answer: {error}")
+            self.enable_answers()
+            return
+
+        if data.get('status') == 'win':
+            self.game_over(True, data.get('score'))
+        elif data.get('correct'):
+            # The next question came with the previous turn, so it is on screen
+            # as soon as the dialog closes; the one after it arrives with this reply
+            question = self.prefetched if data.get('use_prefetched') else data['question']
+            self.prefetched = data.get('prefetched')
+            self.update_stats(data['level'], data['score'])
+            messagebox.showinfo("Correct!", "That is correct!")
+            self.show_question(question)
+        elif data.get('game_over'):
+            self.game_over(False, data.get('score'))
+        else:
+            messagebox.showerror("Error", data.get('error', "Unknown error"))
+            self.enable_answers()
 
     def update_stats(self, level, score):
         self.level_label.config(text=f"Level: {level}")
@@ -122,4 +198,3 @@ if __name__ == "__main__":
     root = tk.Tk()
     app = MillionaireClient(root)
     root.mainloop()
-
@@ -0,0 +1,91 @@
+"""
+WebSocket game channel (Socket.IO namespace '/game') and live show channel ('/show').
+
+Events:
+
+    client -> server  'turn'      same JSON body as POST /api/turn
+                                  ({start, bank, answer_index, prefetch}); the reply
+                                  is sent back as the event's acknowledgement
+    server -> client  'question'  pushed after every successful turn
+                                  (same payload as the acknowledgement)
+"""
+from flask import request
+from flask_socketio import SocketIO, emit, join_room
+
+import app as millionaire  # handlers run in the app context, so services() is the app's
+
+socketio = SocketIO()
+
+# Socket.IO connection id -> game id; the cookie session is read-only here
+# (Flask-SocketIO keeps its changes per connection, which is where the question deck lives)
+_games = {}
+
+
+@socketio.on('turn', namespace='/game')
+def on_turn(data):
+    data = data or {}
+    sid = request.sid
+    state = None
+    if data.get('start'):
+        if data.get('bank') not in millionaire.services().question_banks:
+            return {'error': 'Unknown question bank'}
+        old_id = _games.pop(sid, None)
+        old_state = millionaire.services().game_store.get(old_id) if old_id is not None else None
+        if old_state is not None:
+            millionaire.discard_game(old_state)
+        state = millionaire.services().game_store.create(data.get('bank'), *millionaire.start_deck(data.get('bank')))
+        _games[sid] = state.game_id
+    elif sid in _games:
+        state = millionaire.services().game_store.get(_games[sid])
+    if state is None:
+        return {'error': 'Game not started'}
+
+    payload, status = millionaire.play_turn(state, data)
+    if status == 200 and (payload.get('game_over') or payload.get('status') == 'win'):
+        _games.pop(sid, None)
+    if status == 200:
+        emit('question', payload)
+    return payload
+
+
+@socketio.on('disconnect', namespace='/game')
+def on_disconnect(*args):
+    game_id = _games.pop(request.sid, None)
+    if game_id is not None:
+        millionaire.services().game_store.delete(game_id)
+
+
+# --- Live show mode (see show.py) ---
+#
+#     client -> server  'join'      {show, name}; joins the show's room, the acknowledgement
+#                                   carries the open question if a round is running
+#     client -> server  'answer'    {show, round, answer}; acknowledged with {accepted}
+#     server -> client  'question'  {show, round, level, text, answers}
+#     server -> client  'results'   {show, round, correct_index, tally, answers, correct, fastest, leaderboard}
+#     server -> client  'end'       {show, leaderboard}
+
+def attach_shows(registry):
+    """Makes the shows of `registry` publish to the '/show' namespace."""
+    from show import SocketIOBroadcaster
+    registry.broadcasters.append(SocketIOBroadcaster(socketio, namespace='/show'))
+
+
+@socketio.on('join', namespace='/show')
+def on_show_join(data):
+    data = data or {}
+    show = millionaire.services().shows.get(data.get('show'))
+    if show is None:
+        return {'error': 'Unknown show'}
+    join_room(show.show_id)
+    if data.get('name'):
+        show.names[request.sid] = str(data['name'])[:40]
+    show_round = show.current
+    if show_round is not None and not show_round.closed:
+        return {'status': 'joined', 'question': show_round.payload}
+    return {'status': 'joined'}
+
+
+@socketio.on('answer', namespace='/show')
+def on_show_answer(data):
+    data = data or {}
+    return {'accepted': millionaire.services().shows.answer(data.get('show'), request.sid, data.get('round'), data.get('answer'))}
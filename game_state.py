@@ -0,0 +1,212 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class GameState:
+    """State of one running game. Only the game_id travels in the session cookie."""
+    __slots__ = ('game_id', 'level', 'score', 'correct_index', 'question_id',
+                 'next_correct_index', 'next_question_id', 'bank', 'deck_seed', 'cursors', 'expires')
+
+    # Fields persisted by the stores (game_id and expires are kept separately)
+    FIELDS = ('level', 'score', 'correct_index', 'question_id', 'next_correct_index', 'next_question_id',
+              'bank', 'deck_seed', 'cursors')
+
+    def __init__(self, game_id, level=0, score=0, correct_index=None, question_id=None,
+                 next_correct_index=None, next_question_id=None, bank=None, deck_seed=0, cursors=None,
+                 expires=0.0):
+        self.game_id = game_id
+        self.level = level
+        self.score = score
+        self.correct_index = correct_index
+        self.question_id = question_id
+        # Prefetched question for the next level, handed out by /api/turn
+        self.next_correct_index = next_correct_index
+        self.next_question_id = next_question_id
+        # Question bank the game is played from (see banks.py), None for the app's database
+        self.bank = bank
+        # No-repeat draws: each level's questions are dealt in an order picked by deck_seed,
+        # cursors[level] is the next position (see QuestionPool.get_nth). Size grows with the
+        # number of levels, never with the number of questions.
+        self.deck_seed = deck_seed
+        self.cursors = cursors if cursors is not None else []
+        self.expires = expires
+
+    def __repr__(self):
+        return f'<GameState {self.game_id}: level={self.level} score={self.score}>'
+
+    def next_position(self, level):
+        """Returns the deck position to draw from at `level` and advances it."""
+        cursors = self.cursors
+        if len(cursors) <= level:
+            cursors.extend([0] * (level + 1 - len(cursors)))
+        position = cursors[level]
+        cursors[level] += 1
+        return position
+
+    def values(self):
+        return [getattr(self, field) for field in self.FIELDS]
+
+
+class ExpiringMap:
+    """
+    Thread-safe mapping of values with an `expires` attribute, dropped `ttl` seconds after
+    their last put() or beyond `max_size`. Kept in put order, which is also expiry order,
+    so eviction pops from the front.
+    """
+
+    def __init__(self, ttl, max_size):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        # dict lookups are atomic, so reads skip the lock
+        value = self._items.get(key)
+        if value is None or value.expires < time.time():
+            return None
+        return value
+
+    def put(self, key, value):
+        """Stores `value` and sets its expiry `ttl` seconds from now."""
+        now = time.time()
+        value.expires = now + self.ttl
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            self._evict(now)
+
+    def discard(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def _evict(self, now):
+        items = self._items
+        while items:
+            oldest = next(iter(items.values()))
+            if oldest.expires >= now and len(items) <= self.max_size:
+                break
+            items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class GameStateStore(ABC):
+    """Base class for game state backends; games not saved for `ttl` seconds are evicted."""
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+
+    def create(self, bank=None, deck_seed=0, cursors=None):
+        """Starts a new game and returns its (already saved) state."""
+        state = GameState(secrets.token_urlsafe(16), bank=bank, deck_seed=deck_seed, cursors=cursors)
+        self.save(state)
+        return state
+
+    @abstractmethod
+    def get(self, game_id):
+        """Returns the unexpired state of `game_id`, or None."""
+
+    @abstractmethod
+    def save(self, state):
+        """Stores `state` and extends its expiry by `ttl` seconds."""
+
+    @abstractmethod
+    def delete(self, game_id):
+        """Drops the state of `game_id`, if there is one."""
+
+    @abstractmethod
+    def __len__(self):
+        """Number of games held, expired ones possibly included."""
+
+
+class MemoryGameStateStore(GameStateStore):
+    """In-process store of at most `max_games` games."""
+
+    def __init__(self, ttl=3600, max_games=100_000):
+        super().__init__(ttl)
+        self.max_games = max_games
+        self._games = ExpiringMap(ttl, max_games)
+
+    def get(self, game_id):
+        return self._games.get(game_id)
+
+    def save(self, state):
+        self._games.put(state.game_id, state)
+
+    def delete(self, game_id):
+        self._games.discard(game_id)
+
+    def __len__(self):
+        return len(self._games)
+
+
+class SqliteGameStateStore(GameStateStore):
+    """Store in an SQLite file (WAL mode), shared by the worker processes of a host."""
+
+    # Expired rows are purged every this many saves
+    PURGE_INTERVAL = 1000
+
+    def __init__(self, path, ttl=3600):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        self._saves = 0
+        conn = self._connection()
+        conn.execute('CREATE TABLE IF NOT EXISTS game_state '
+                     '(game_id TEXT PRIMARY KEY, expires REAL NOT NULL, data TEXT NOT NULL)')
+        conn.execute('CREATE INDEX IF NOT EXISTS game_state_expires ON game_state (expires)')
+
+    def _connection(self):
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, game_id):
+        row = self._connection().execute(
+            'SELECT expires, data FROM game_state WHERE game_id = ? AND expires >= ?',
+            (game_id, time.time())).fetchone()
+        if row is None:
+            return None
+        return GameState(game_id, *json.loads(row[1]), expires=row[0])
+
+    def save(self, state):
+        state.expires = time.time() + self.ttl
+        conn = self._connection()
+        conn.execute('INSERT OR REPLACE INTO game_state (game_id, expires, data) VALUES (?, ?, ?)',
+                     (state.game_id, state.expires, json.dumps(state.values())))
+        self._saves += 1
+        if self._saves % self.PURGE_INTERVAL == 0:
+            conn.execute('DELETE FROM game_state WHERE expires < ?', (time.time(),))
+
+    def delete(self, game_id):
+        self._connection().execute('DELETE FROM game_state WHERE game_id = ?', (game_id,))
+
+    def __len__(self):
+        return self._connection().execute(
+            'SELECT COUNT(*) FROM game_state WHERE expires >= ?', (time.time(),)).fetchone()[0]
+
+
+def create_game_state_store(url, ttl=3600):
+    """
+    Builds a store from a config value:
+        'memory'              -> MemoryGameStateStore
+        'sqlite:///<path>'    -> SqliteGameStateStore
+    """
+    if url == 'memory':
+        return MemoryGameStateStore(ttl=ttl)
+    if url.startswith('sqlite:///'):
+        return SqliteGameStateStore(os.path.abspath(url[len('sqlite:///'):]), ttl=ttl)
+    raise ValueError(f'Unknown game state store: {url}')
@@ -0,0 +1,209 @@
+"""
+Opt-in (METRICS_ENABLED=1) request, SQL and template timings served on /metrics
+in the Prometheus text format, and cProfile dumps of sampled slow requests.
+"""
+import cProfile
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+
+from flask import Response, g, has_request_context, request, before_render_template, template_rendered
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Distinct statement texts tracked; further statements are counted under 'other'
+MAX_STATEMENTS = 200
+# Length statement texts are cut to before being used as a label
+STATEMENT_LABEL_LENGTH = 120
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class Summary:
+    __slots__ = ('total', 'count')
+
+    def __init__(self):
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.total += value
+        self.count += 1
+
+
+class Metrics:
+    """Thread-safe in-process metric registry."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(Histogram)    # (endpoint, method, status) -> Histogram
+        self.sql = defaultdict(Summary)           # (endpoint, operation) -> Summary
+        self.statements = defaultdict(Summary)    # statement text -> Summary
+        self.templates = defaultdict(Summary)     # template name -> Summary
+        self.profiles_written = 0
+
+    def observe_request(self, endpoint, method, status, seconds):
+        with self.lock:
+            self.requests[(endpoint, method, status)].observe(seconds)
+
+    def observe_sql(self, endpoint, statement, seconds):
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+        text = ' '.join(statement.split())[:STATEMENT_LABEL_LENGTH]
+        with self.lock:
+            self.sql[(endpoint, operation)].observe(seconds)
+            if text not in self.statements and len(self.statements) >= MAX_STATEMENTS:
+                text = 'other'
+            self.statements[text].observe(seconds)
+
+    def observe_template(self, name, seconds):
+        with self.lock:
+            self.templates[name].observe(seconds)
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self.lock:
+            lines.append('# HELP millionaire_request_duration_seconds Wall time per request.')
+            lines.append('# TYPE millionaire_request_duration_seconds histogram')
+            for (endpoint, method, status), hist in sorted(self.requests.items()):
+                labels = f'endpoint="{_escape(endpoint)}",method="{method}",status="{status}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, hist.counts):
+                    cumulative += count
+                    lines.append(f'millionaire_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'millionaire_request_duration_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+                lines.append(f'millionaire_request_duration_seconds_sum{{{labels}}} {hist.total}')
+                lines.append(f'millionaire_request_duration_seconds_count{{{labels}}} {hist.count}')
+
+            _summary(lines, 'millionaire_sql_duration_seconds', 'SQL time per endpoint and operation.',
+                     {f'endpoint="{_escape(endpoint)}",operation="{operation}"': summary
+                      for (endpoint, operation), summary in self.sql.items()})
+            _summary(lines, 'millionaire_sql_statement_duration_seconds', 'SQL time per statement text.',
+                     {f'statement="{_escape(text)}"': summary for text, summary in self.statements.items()})
+            _summary(lines, 'millionaire_template_render_seconds', 'Template render time.',
+                     {f'template="{_escape(name)}"': summary for name, summary in self.templates.items()})
+
+            lines.append('# HELP millionaire_profiles_written_total Slow-request profiles dumped to disk.')
+            lines.append('# TYPE millionaire_profiles_written_total counter')
+            lines.append(f'millionaire_profiles_written_total {self.profiles_written}')
+        return '\n'.join(lines) + '\n'
+
+
+def _summary(lines, name, help_text, series):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} summary')
+    for labels, summary in sorted(series.items()):
+        lines.append(f'{name}_sum{{{labels}}} {summary.total}')
+        lines.append(f'{name}_count{{{labels}}} {summary.count}')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _current_endpoint():
+    return (request.endpoint or 'unknown') if has_request_context() else 'background'
+
+
+def init_instrumentation(app, db):
+    """Registers the hooks and the /metrics route if METRICS_ENABLED is set. Returns the registry or None."""
+    if not app.config.get('METRICS_ENABLED'):
+        return None
+
+    metrics = Metrics()
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+        sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+        if sample_rate and random.random() < sample_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active in this thread
+                return
+            g.metrics_profiler = profiler
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        metrics.observe_request(request.endpoint or 'unknown', request.method, response.status_code, elapsed)
+
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            if elapsed * 1000 >= app.config.get('PROFILE_SLOW_MS', 500):
+                profile_dir = app.config.get('PROFILE_DIR', 'profiles')
+                os.makedirs(profile_dir, exist_ok=True)
+                filename = f'{request.endpoint or "unknown"}-{time.strftime("%Y%m%d-%H%M%S")}-{int(elapsed * 1000)}ms.prof'
+                profiler.dump_stats(os.path.join(profile_dir, filename))
+                with metrics.lock:
+                    metrics.profiles_written += 1
+        return response
+
+    @app.teardown_request
+    def stop_profiler(exc):
+        # after_request is skipped when a view raises; never leave a profiler running on the thread
+        profiler = g.pop('metrics_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+    with app.app_context():
+        engine = db.engine
+
+    @db.event.listens_for(engine, 'before_cursor_execute')
+    def start_statement(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+    @db.event.listens_for(engine, 'after_cursor_execute')
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_start'].pop()
+        metrics.observe_sql(_current_endpoint(), statement, elapsed)
+
+    @db.event.listens_for(engine, 'handle_error')
+    def discard_statement(context):
+        # A failed statement gets no after_cursor_execute; drop its start time
+        starts = context.connection.info.get('metrics_start') if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    def start_template(sender, template, context, **extra):
+        g.setdefault('metrics_templates', []).append(time.perf_counter())
+
+    def record_template(sender, template, context, **extra):
+        starts = g.get('metrics_templates')
+        if starts:
+            metrics.observe_template(template.name, time.perf_counter() - starts.pop())
+
+    before_render_template.connect(start_template, app)
+    template_rendered.connect(record_template, app)
+    # Keep the receivers alive; blinker only holds weak references
+    app.extensions['instrumentation_receivers'] = (start_template, record_template)
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    app.extensions['metrics'] = metrics
+    return metrics
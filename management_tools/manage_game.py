@@ -1,24 +1,144 @@
 import requests
 import json
 import pprint
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Responses worth retrying: rate limiting and transient server/proxy errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class CallStats:
+    """Thread-safe per-operation call counts, errors, retries and durations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # operation -> [durations in seconds, errors, retries]
+
+    def record(self, operation, duration, error=False, retries=0):
+        with self._lock:
+            entry = self._calls.setdefault(operation, [[], 0, 0])
+            entry[0].append(duration)
+            entry[1] += error
+            entry[2] += retries
+
+    def summary(self):
+        """operation -> {calls, errors, retries, total_s, mean_ms, p50_ms, p95_ms, max_ms}"""
+        with self._lock:
+            calls = {operation: (sorted(durations), errors, retries)
+                     for operation, (durations, errors, retries) in self._calls.items()}
+        result = {}
+        for operation, (durations, errors, retries) in calls.items():
+            count = len(durations)
+            result[operation] = {
+                'calls': count,
+                'errors': errors,
+                'retries': retries,
+                'total_s': round(sum(durations), 3),
+                'mean_ms': round(sum(durations) / count * 1000, 2),
+                'p50_ms': round(durations[count // 2] * 1000, 2),
+                'p95_ms': round(durations[min(count - 1, int(count * 0.95))] * 1000, 2),
+                'max_ms': round(durations[-1] * 1000, 2),
+            }
+        return result
+
+    def print_summary(self):
+        for operation, entry in sorted(self.summary().items()):
+            print(f"{operation:>8}: {entry['calls']} calls, {entry['errors']} errors, {entry['retries']} retries, "
+                  f"mean {entry['mean_ms']} ms, p95 {entry['p95_ms']} ms, total {entry['total_s']} s")
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
 
 
 class GameManager:
     """
     Programmatic interface (Client) to manage Millionaire Game questions via REST API.
     Replaces the need for a web-based administration UI.
+    Calls share one keep-alive pool and are retried with backoff (POST only if never sent).
     """
 
-    def __init__(self, base_url="http://127.0.0.1:5000/api/questions"):
+    def __init__(self, base_url="http://127.0.0.1:5000/api/questions", concurrency=8,
+                 retries=3, backoff=0.2, timeout=10):
         self.base_url = base_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.stats = CallStats()
+        # Local copy of all questions (id -> question) and the change feed seq it is current at
+        self._questions = None
+        self._changes_seq = None
+
+        retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                      raise_on_status=False)  # the last response is returned and handled like any other
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency, 1), max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(self, operation, method, url, **kwargs):
+        """Sends one request through the pooled session and records its timing under `operation`."""
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.stats.record(operation, time.perf_counter() - start, error=True)
+            raise
+        retries = response.raw.retries.history if response.raw is not None and response.raw.retries else ()
+        self.stats.record(operation, time.perf_counter() - start, error=response.status_code >= 400,
+                          retries=len(retries))
+        return response
+
+    def _run_batch(self, func, items):
+        """Calls func(item) for every item on `concurrency` threads; results keep the input order."""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return list(executor.map(func, items))
+
+    def sync_questions(self):
+        """Updates the local copy of all questions from the change feed and returns it sorted by id."""
+        while self._questions is not None:
+            response = self._request('changes', 'GET', f"{self.base_url}/changes",
+                                     params={'since': self._changes_seq})
+            response.raise_for_status()
+            reply = response.json()
+            if reply['reset']:
+                self._questions = None
+                break
+            for change in reply['changes']:
+                if change['deleted']:
+                    self._questions.pop(change['id'], None)
+                else:
+                    self._questions[change['id']] = change['question']
+            self._changes_seq = reply['last_seq']
+            if not reply['more']:
+                return [self._questions[question_id] for question_id in sorted(self._questions)]
+
+        response = self._request('list', 'GET', self.base_url)
+        response.raise_for_status()
+        questions = response.json()
+        self._questions = {q['id']: q for q in questions}
+        self._changes_seq = int(response.headers.get('X-Changes-Seq', 0))
+        return questions
 
     def list_questions(self):
         """Fetches and displays all questions."""
         print(f"\n--- Listing All Questions from {self.base_url} ---")
         try:
-            response = requests.get(self.base_url)
-            response.raise_for_status()
-            questions = response.json()
+            questions = self.sync_questions()
             print(f"Total Questions: {len(questions)}")
             for q in questions:
                 print(f"[ID: {q['id']}] Level: {q['level']} | {q['text'][:60]}...")
@@ -27,6 +147,20 @@ class GameManager:
             print(f"Error listing questions: {e}")
             return []
 
+    def iter_questions(self, page_size=500):
+        """Yields all questions page by page using keyset pagination."""
+        after_id = None
+        while True:
+            params = {'limit': page_size}
+            if after_id is not None:
+                params['after_id'] = after_id
+            response = self._request('page', 'GET', self.base_url, params=params)
+            response.raise_for_status()
+            yield from response.json()
+            after_id = response.headers.get('X-Next-After-Id')
+            if after_id is None:
+                break
+
     def add_question(self, level, text, correct_answer, wrong_answers, info=""):
         """Adds a new question."""
         print("\n--- Adding New Question ---")
@@ -39,7 +173,7 @@ class GameManager:
         }
 
         try:
-            response = requests.post(self.base_url, json=payload)
+            response = self._request('add', 'POST', self.base_url, json=payload)
             if response.status_code == 200:
                 created_q = response.json()
                 print("Success! Created Question:")
@@ -54,6 +188,28 @@ class GameManager:
             print(f"Error adding question: {e}")
             return None
 
+    def bulk_add_questions(self, questions):
+        """Streams an iterable of add_question()-style dicts to POST /api/questions/bulk as NDJSON."""
+        print("\n--- Bulk Importing Questions ---")
+
+        def body():
+            for q in questions:
+                yield (json.dumps(q) + '\n').encode('utf-8')
+
+        try:
+            # Like every POST, only retried if the connection failed before the body was sent
+            response = self._request('bulk', 'POST', f"{self.base_url}/bulk", data=body(),
+                                     headers={'Content-Type': 'application/x-ndjson'})
+            response.raise_for_status()
+            result = response.json()
+            print(f"Inserted: {result['inserted']}, updated: {result['updated']}, rejected: {result['rejected']}")
+            for error in result['errors']:
+                print(f"  line {error['line']}: {error['error']}")
+            return result
+        except requests.exceptions.RequestException as e:
+            print(f"Error importing questions: {e}")
+            return None
+
     def update_question(self, question_id, **kwargs):
         """
         Updates an existing question.
@@ -70,7 +226,7 @@ class GameManager:
 
         try:
             url = f"{self.base_url}/{question_id}"
-            response = requests.put(url, json=clean_kwargs)
+            response = self._request('update', 'PUT', url, json=clean_kwargs)
 
             if response.status_code == 200:
                 updated_q = response.json()
@@ -89,7 +245,7 @@ class GameManager:
         print(f"\n--- Deleting Question ID: {question_id} ---")
         try:
             url = f"{self.base_url}/{question_id}"
-            response = requests.delete(url)
+            response = self._request('delete', 'DELETE', url)
 
             if response.status_code == 200:
                 print(f"Success! {response.json().get('message')}")
@@ -101,6 +257,91 @@ class GameManager:
             print(f"Error deleting question: {e}")
             return False
 
+    def add_questions(self, questions):
+        """
+        Adds many questions concurrently, without per-question output.
+        questions: iterable of dicts with the fields of add_question().
+        Returns the new ids in input order (None where the question was rejected).
+        """
+        def add(question):
+            try:
+                response = self._request('add', 'POST', self.base_url, json=question)
+            except requests.exceptions.RequestException:
+                return None
+            return response.json().get('id') if response.status_code == 200 else None
+
+        return self._run_batch(add, questions)
+
+    def update_questions(self, updates):
+        """
+        Updates many questions concurrently.
+        updates: iterable of (question_id, fields) pairs, fields being a dict like update_question()'s kwargs.
+        Returns the updated questions in input order (None where the update failed).
+        """
+        def update(item):
+            question_id, fields = item
+            fields = {k: v for k, v in fields.items() if v is not None}
+            try:
+                response = self._request('update', 'PUT', f"{self.base_url}/{question_id}", json=fields)
+            except requests.exceptions.RequestException:
+                return None
+            return response.json() if response.status_code == 200 else None
+
+        return self._run_batch(update, updates)
+
+    def delete_questions(self, question_ids):
+        """Deletes many questions concurrently. Returns a success flag per id, in input order."""
+        def delete(question_id):
+            try:
+                response = self._request('delete', 'DELETE', f"{self.base_url}/{question_id}")
+            except requests.exceptions.RequestException:
+                return False
+            return response.status_code == 200
+
+        return self._run_batch(delete, question_ids)
+
+    @staticmethod
+    def _selection(ids, level, text):
+        selection = {}
+        if ids is not None:
+            selection['ids'] = list(ids)
+        criteria = {k: v for k, v in (('level', level), ('text', text)) if v is not None}
+        if criteria:
+            selection['filter'] = criteria
+        return selection
+
+    def update_where(self, fields, ids=None, level=None, text=None, dry_run=False):
+        """
+        Sets `fields` (level and/or info) on all questions with the given ids and/or
+        level and text substring, in one request and one transaction on the server.
+        Returns the server's reply ({'updated'} or, with dry_run, {'matched', 'sample_ids'}) or None.
+        """
+        body = dict(self._selection(ids, level, text), set=fields, dry_run=dry_run)
+        try:
+            response = self._request('update_where', 'PATCH', self.base_url, json=body)
+        except requests.exceptions.RequestException as e:
+            print(f"Error updating questions: {e}")
+            return None
+        if response.status_code != 200:
+            print(f"Failed to update questions. Status: {response.status_code}")
+            print(response.text)
+            return None
+        return response.json()
+
+    def delete_where(self, ids=None, level=None, text=None, dry_run=False):
+        """Deletes all questions with the given ids and/or level and text substring in one request, like update_where()."""
+        body = dict(self._selection(ids, level, text), dry_run=dry_run)
+        try:
+            response = self._request('delete_where', 'DELETE', self.base_url, json=body)
+        except requests.exceptions.RequestException as e:
+            print(f"Error deleting questions: {e}")
+            return None
+        if response.status_code != 200:
+            print(f"Failed to delete questions. Status: {response.status_code}")
+            print(response.text)
+            return None
+        return response.json()
+
 
 def interactive_menu():
     manager = GameManager()
@@ -111,6 +352,7 @@ def interactive_menu():
         print("2. Add Question")
         print("3. Delete Question")
         print("4. Update Question (Text change)")
+        print("s. Show Call Statistics")
         print("q. Quit")
 
         choice = input("\nSelect option: ").strip().lower()
@@ -144,8 +386,12 @@ def interactive_menu():
             if qid and new_text:
                 manager.update_question(qid, text=new_text)
 
+        elif choice == 's':
+            manager.stats.print_summary()
+
         elif choice == 'q':
             print("Bye!")
+            manager.close()
             break
         else:
             print("Invalid option.")
@@ -1,9 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
-import random
+import os
+
+# Re-exported: the plain question types live in records.py so tools can use them without Flask
+from records import (CORRECT_POSITIONS, PERMUTATIONS, QuestionMixin, QuestionRecord, content_hash,
+                     draw_permutation, shuffled_index)
 
 db = SQLAlchemy()
 
-class Question(db.Model):
+
+class Question(db.Model, QuestionMixin):
     __tablename__ = 'millionaire'
 
     id = db.Column(db.Integer, primary_key=True)
@@ -14,45 +19,183 @@ class Question(db.Model):
     answer3 = db.Column(db.Text)
     answer4 = db.Column(db.Text)
     info = db.Column('background_information', db.Text)
+    # Identifies duplicate questions for bulk upserts, see content_hash()
+    content_hash = db.Column(db.Text)
+
+    # Index into PERMUTATIONS, drawn on first access to answers (not a column)
+    permutation = None
 
     def __repr__(self):
         return f'<Question {self.id}: {self.text}>'
 
-    @property
-    def wrong_answers(self):
-        return [self.answer2, self.answer3, self.answer4]
-
-    @wrong_answers.setter
-    def wrong_answers(self, value):
-        if len(value) >= 1: self.answer2 = value[0]
-        if len(value) >= 2: self.answer3 = value[1]
-        if len(value) >= 3: self.answer4 = value[2]
-
-    @property
-    def answers(self):
-        # Cache shuffled answers on the instance so it stays consistent during the request
-        if not hasattr(self, '_shuffled_answers'):
-            opts = [self.correct_answer, self.answer2, self.answer3, self.answer4]
-            # Filter out None values just in case
-            opts = [o for o in opts if o]
-            random.shuffle(opts)
-            self._shuffled_answers = opts
-        return self._shuffled_answers
-
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'level': self.level,
-            'text': self.text,
-            'answers': self.answers,
-            'correct_answer': self.correct_answer,
-            'info': self.info
-        }
-
-def get_rand_question(level, questions_query=None):
-    # questions_query is now ignored, we use DB
-    # We want a random question of a certain level
-    # SQLite random ordering: order_by(func.random())
-    from sqlalchemy.sql.expression import func
-    return Question.query.filter_by(level=level).order_by(func.random()).first()
 
+@db.event.listens_for(Question, 'before_insert')
+@db.event.listens_for(Question, 'before_update')
+def _set_content_hash(mapper, connection, target):
+    target.content_hash = content_hash(target.text, target.correct_answer, target.wrong_answers)
+
+
+class QuestionsVersion(db.Model):
+    """
+    Single-row counter bumped by SQLite triggers on every write to the
+    millionaire table. Used for ETags, so it also sees writes made by other
+    processes or by plain SQL.
+    """
+    __tablename__ = 'millionaire_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class GameResult(db.Model):
+    """A finished game. Written in batches by results.ResultLog, never on the request path."""
+    __tablename__ = 'game_results'
+
+    id = db.Column(db.Integer, primary_key=True)
+    finished_at = db.Column(db.Float, nullable=False)  # unix time
+    bank = db.Column(db.Text)  # None: the app's own database
+    level = db.Column(db.Integer, nullable=False)  # questions answered correctly
+    score = db.Column(db.Integer, nullable=False)
+    won = db.Column(db.Boolean, nullable=False)
+
+    # Lets ResultLog.load() read each bank's top scores straight from the index
+    __table_args__ = (db.Index('game_results_bank_score', 'bank', 'score'),)
+
+
+class QuestionStats(db.Model):
+    """How often a question of the app's database was shown and answered (correctly), see calibration.py."""
+    __tablename__ = 'question_stats'
+
+    question_id = db.Column(db.Integer, primary_key=True)
+    shown = db.Column(db.Integer, nullable=False, default=0)
+    answered = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+    # Share of wrong answers, smoothed towards the level's average; set by calibration.recalibrate()
+    difficulty_estimate = db.Column(db.Float)
+
+
+class GameRollup(db.Model):
+    """Finished games per hour and question bank, added up by results.ResultLog with every flush."""
+    __tablename__ = 'game_rollup'
+
+    hour = db.Column(db.Integer, primary_key=True)  # unix time of the hour's start
+    bank = db.Column(db.Text, primary_key=True)  # '' for the app's own database
+    games = db.Column(db.Integer, nullable=False, default=0)
+    won = db.Column(db.Integer, nullable=False, default=0)
+    score = db.Column(db.Integer, nullable=False, default=0)  # sum over the games
+    level = db.Column(db.Integer, nullable=False, default=0)  # sum of levels reached
+
+
+class AnswerRollup(db.Model):
+    """Answers per hour and level of the app's database, added up by calibration.AnswerCounters with every flush."""
+    __tablename__ = 'answer_rollup'
+
+    hour = db.Column(db.Integer, primary_key=True)
+    level = db.Column(db.Integer, primary_key=True)
+    answered = db.Column(db.Integer, nullable=False, default=0)
+    correct = db.Column(db.Integer, nullable=False, default=0)
+
+
+def hour_bucket(timestamp):
+    """Start of the hour (unix time) that `timestamp` falls into: the time key of the rollup tables."""
+    return int(timestamp) // 3600 * 3600
+
+
+class QuestionChange(db.Model):
+    """
+    Change log of the millionaire table, one row per written question,
+    appended by SQLite triggers inside the writing transaction (see changes.py).
+    """
+    __tablename__ = 'question_changes'
+    # AUTOINCREMENT: sequence numbers are never reused, even after old entries are pruned
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    seq = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False)
+    changed_at = db.Column(db.Float, nullable=False)  # unix time
+
+
+def _version_triggers():
+    statements = ["INSERT OR IGNORE INTO millionaire_version (id, version) VALUES (1, 0)"]
+    for op in ('INSERT', 'UPDATE', 'DELETE'):
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS millionaire_version_{op.lower()} AFTER {op} ON millionaire "
+            f"BEGIN UPDATE millionaire_version SET version = version + 1 WHERE id = 1; END")
+    return statements
+
+
+def _change_log_triggers():
+    now = "(julianday('now') - 2440587.5) * 86400.0"
+    statements = []
+    for op, row, deleted in (('INSERT', 'NEW', 0), ('UPDATE', 'NEW', 0), ('DELETE', 'OLD', 1)):
+        statements.append(
+            f"CREATE TRIGGER IF NOT EXISTS question_changes_{op.lower()} AFTER {op} ON millionaire "
+            f"BEGIN INSERT INTO question_changes (question_id, deleted, changed_at) "
+            f"VALUES ({row}.id, {deleted}, {now}); END")
+    # A question whose id changed is gone under its old id
+    statements.append(
+        f"CREATE TRIGGER IF NOT EXISTS question_changes_renumber AFTER UPDATE OF id ON millionaire "
+        f"WHEN OLD.id != NEW.id BEGIN INSERT INTO question_changes (question_id, deleted, changed_at) "
+        f"VALUES (OLD.id, 1, {now}); END")
+    return statements
+
+
+# MetaData.after_create runs on every create_all(), so all statements are idempotent
+for _statement in _version_triggers() + _change_log_triggers():
+    db.event.listen(db.metadata, 'after_create', db.DDL(_statement))
+
+
+def get_questions_version():
+    """Returns the current value of the question table's version counter."""
+    return db.session.execute(db.select(QuestionsVersion.version).filter_by(id=1)).scalar() or 0
+
+
+def default_database_uri():
+    """DATABASE_URL from the environment, else millionaire.sqlite3 next to this file."""
+    return os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(
+        os.path.abspath(os.path.dirname(__file__)), 'millionaire.sqlite3'))
+
+
+def create_db_app(database_uri=None):
+    """
+    Minimal Flask app with only `db` bound and the schema up to date, for
+    scripts that need the ORM but none of the routes (see app.create_app()).
+    """
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri or default_database_uri()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    init_db(app)
+    return app
+
+
+def init_db(app):
+    """Tunes the connections, creates missing tables and triggers and migrates the schema (see schema.py)."""
+    from schema import migrate, tune_engine
+    with app.app_context():
+        tune_engine(db.engine)
+        db.create_all()
+        with db.engine.begin() as connection:
+            migrate(connection)
+
+
+def on_questions_changed(app, func):
+    """Registers func(updated, deleted_ids) to be told about question writes made through `app`."""
+    app.extensions.setdefault('questions_changed', []).append(func)
+    return func
+
+
+def questions_changed(updated=(), deleted=(), app=None):
+    """
+    Notifies the in-process caches of `app` (default: the current app) after a commit.
+    updated: Question objects that were inserted or modified.
+    deleted: ids of removed questions.
+    Called without arguments it means "anything may have changed".
+    """
+    if app is None:
+        from flask import current_app
+        app = current_app
+    for listener in app.extensions.get('questions_changed', ()):
+        listener(updated, deleted)
@@ -22,4 +22,15 @@ def load_questions_from_file(file_path):
                 }
                 questions.append(question)
     return questions
-questions = load_questions_from_file('millionaire.txt')
+
+
+_questions = None
+
+def __getattr__(name):
+    # `questions` used to be loaded at import time; now the file is only read on first access
+    global _questions
+    if name == 'questions':
+        if _questions is None:
+            _questions = load_questions_from_file('millionaire.txt')
+        return _questions
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,99 @@
+"""
+Caches for rendered pages: pre-compressed CachedPages and a size-bounded LRUCache.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional; pages are then offered as gzip and identity only
+    brotli = None
+
+
+class CachedPage:
+    """A rendered page with its pre-compressed variants."""
+    __slots__ = ('etag', 'mimetype', 'variants', 'size')
+
+    def __init__(self, body, etag, mimetype='text/html'):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.etag = etag
+        self.mimetype = mimetype
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, 6)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body)
+        self.size = sum(len(variant) for variant in self.variants.values())
+
+    def response(self, request):
+        """Builds the response for `request`: 304 on a matching ETag, else the smallest accepted variant."""
+        if self.etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            encoding = 'identity'
+            for candidate in ('br', 'gzip'):
+                if candidate in self.variants and request.accept_encodings[candidate]:
+                    encoding = candidate
+                    break
+            response = Response(self.variants[encoding], mimetype=self.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(self.etag)
+        response.vary.add('Accept-Encoding')
+        return response
+
+
+def _size_of(value):
+    return value.size if isinstance(value, CachedPage) else len(value)
+
+
+class LRUCache:
+    """Thread-safe mapping bounded by the total size of its values (bytes, str or CachedPage)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= _size_of(old)
+            self._entries[key] = value
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= _size_of(evicted)
+
+    def discard(self, key):
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                self.size -= _size_of(value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
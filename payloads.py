@@ -0,0 +1,84 @@
+"""
+Pre-encoded question JSON: everything but the answer order is encoded once
+per question, with orjson if installed (optional) or the json module.
+"""
+import json
+from operator import itemgetter
+
+from flask import Response
+
+from records import PERMUTATIONS
+
+try:
+    import orjson
+except ImportError:  # optional; falls back to the json module
+    orjson = None
+
+# Picks the encoded answers in permutation order (see records.PERMUTATIONS)
+_ORDER = tuple(itemgetter(*permutation) for permutation in PERMUTATIONS)
+
+
+def _json_dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+_dumps = orjson.dumps if orjson is not None else _json_dumps
+
+
+def dumps(value):
+    """Encodes `value` to compact JSON bytes with the selected encoder."""
+    return _dumps(value)
+
+
+def use_encoder(name):
+    """Selects the encoder: 'orjson', 'json' or 'auto' (orjson if installed). Returns the name in use."""
+    global _dumps
+    if name == 'orjson' or (name == 'auto' and orjson is not None):
+        if orjson is None:
+            raise ValueError('JSON_ENCODER=orjson, but orjson is not installed')
+        _dumps = orjson.dumps
+        return 'orjson'
+    if name not in ('json', 'auto'):
+        raise ValueError(f'Unknown JSON encoder: {name}')
+    _dumps = _json_dumps
+    return 'json'
+
+
+def json_response(body, status=200):
+    """A response for an already encoded JSON body."""
+    return Response(body, status=status, mimetype='application/json')
+
+
+def _head(fields):
+    # '{...,' with the object left open for the answers
+    return _dumps(fields)[:-1] + b',"answers":['
+
+
+class EncodedQuestion:
+    """The encoded, answer-order independent parts of one question's JSON."""
+    __slots__ = ('head', 'game_head', 'choices', 'size')
+
+    def __init__(self, question):
+        self.head = _head({'id': question.id, 'level': question.level, 'text': question.text,
+                           'correct_answer': question.correct_answer, 'info': question.info})
+        self.game_head = _head({'text': question.text, 'level': question.level})
+        self.choices = tuple(_dumps(answer) for answer in question.choices)
+        self.size = len(self.head) + len(self.game_head) + sum(len(choice) for choice in self.choices)
+
+    def __len__(self):
+        # Size in bytes, for LRUCache
+        return self.size
+
+    def _answers(self, question):
+        permutation = question.permutation
+        if permutation is None:
+            permutation = question.shuffle()
+        return b','.join(_ORDER[permutation](self.choices))
+
+    def to_json(self, question):
+        """Same content as question.to_dict(), in `question`'s answer order."""
+        return self.head + self._answers(question) + b']}'
+
+    def game_json(self, question):
+        """Same content as app.question_payload(question)."""
+        return self.game_head + self._answers(question) + b']}'
@@ -0,0 +1,48 @@
+"""
+Background work run every few seconds on a daemon thread (flushes, polls, rebuilds).
+"""
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class PeriodicThread:
+    """
+    Calls func() every `interval` seconds on a daemon thread named `name` until close();
+    wake() runs it early. Exceptions are logged and the thread waits for the next run.
+    """
+
+    def __init__(self, func, interval, name):
+        self.func = func
+        self.interval = interval
+        self.name = name
+        self.thread = None
+        self._wake = threading.Event()
+        self._stopping = False
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stopping:
+                return
+            try:
+                self.func()
+            except Exception:  # keep the thread alive for the next run
+                log.exception('%s failed', self.name)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self, timeout=5):
+        """Stops the thread and waits up to `timeout` seconds for a running func() to return."""
+        self._stopping = True
+        self._wake.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
@@ -0,0 +1,110 @@
+import random
+import threading
+
+from model import db, draw_permutation, shuffled_index, Question, QuestionRecord
+
+
+class QuestionPool:
+    """
+    In-memory question rows per level, loaded on first use and kept in sync
+    through model.questions_changed() (apply_changes()). Writers replace a level's list, so readers need no lock.
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine   # None: the app's database through db.session
+        self._lock = threading.Lock()
+        self._levels = None    # level -> list of row tuples
+        self._positions = {}   # question id -> (level, index in that level's list)
+
+    def _load(self):
+        select = db.select(*[getattr(Question, field) for field in QuestionRecord.FIELDS])
+        if self.engine is None:
+            result = db.session.execute(select)
+        else:
+            with self.engine.connect() as connection:
+                result = connection.execute(select).all()
+        levels = {}
+        positions = {}
+        for row in result:
+            rows = levels.setdefault(row[1], [])
+            positions[row[0]] = (row[1], len(rows))
+            rows.append(QuestionRecord.pool_row(tuple(row)))
+        return levels, positions
+
+    def _ensure_loaded(self):
+        levels = self._levels
+        if levels is None:
+            with self._lock:
+                if self._levels is None:
+                    self._levels, self._positions = self._load()
+                levels = self._levels
+        return levels
+
+    def get_random(self, level, rng=random):
+        """Returns a shuffled QuestionRecord of the given level or None if there is none."""
+        rows = self._ensure_loaded().get(level)
+        if not rows:
+            return None
+        return QuestionRecord(*rng.choice(rows), permutation=draw_permutation(rng))
+
+    def get_nth(self, level, seed, position, rng=random):
+        """Returns question `position` of the level's order picked by `seed` (no repeats, see records.shuffled_index), or None."""
+        rows = self._ensure_loaded().get(level)
+        if not rows:
+            return None
+        row = rows[shuffled_index(position, len(rows), seed ^ level)]
+        return QuestionRecord(*row, permutation=draw_permutation(rng))
+
+    def count(self, level=None):
+        levels = self._ensure_loaded()
+        if level is None:
+            return sum(len(rows) for rows in levels.values())
+        return len(levels.get(level, ()))
+
+    def levels(self):
+        """Levels that have questions, lowest first."""
+        return sorted(level for level, rows in self._ensure_loaded().items() if rows and level is not None)
+
+    def invalidate(self):
+        """Drops everything; the next access reloads from the DB."""
+        with self._lock:
+            self._levels = None
+            self._positions = {}
+
+    def upsert(self, question):
+        with self._lock:
+            if self._levels is None:
+                return
+            self._remove(question.id)
+            rows = list(self._levels.get(question.level, ()))
+            self._positions[question.id] = (question.level, len(rows))
+            rows.append(QuestionRecord.row_of(question))
+            self._levels[question.level] = rows
+
+    def discard(self, question_id):
+        with self._lock:
+            if self._levels is not None:
+                self._remove(question_id)
+
+    def _remove(self, question_id):
+        # Swap-remove on a copy of the level's list; caller holds the lock
+        position = self._positions.pop(question_id, None)
+        if position is None:
+            return
+        level, index = position
+        rows = list(self._levels[level])
+        last = rows.pop()
+        if index < len(rows):
+            rows[index] = last
+            self._positions[last[0]] = (level, index)
+        self._levels[level] = rows
+
+    def apply_changes(self, updated, deleted):
+        if not updated and not deleted:
+            self.invalidate()
+            return
+        for question_id in deleted:
+            self.discard(question_id)
+        for question in updated:
+            self.upsert(question)
+
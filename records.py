@@ -0,0 +1,149 @@
+"""
+Standard-library-only question types (answer shuffling, content hashes, QuestionRecord),
+shared with the tools that run without Flask; model.py re-exports everything.
+"""
+from operator import itemgetter
+import hashlib
+import itertools
+import random
+
+# All 24 orders of the four answers. A shuffle is an index into this table,
+# so it is one randrange() and can be replayed from a seeded random.Random.
+PERMUTATIONS = tuple(itertools.permutations(range(4)))
+# Picks the answers of a choices tuple in permutation order (one C call)
+_PERMUTATION_GETTERS = tuple(itemgetter(*permutation) for permutation in PERMUTATIONS)
+# Position of the correct answer (choices[0]) after each permutation
+CORRECT_POSITIONS = tuple(permutation.index(0) for permutation in PERMUTATIONS)
+
+
+def draw_permutation(rng=random):
+    """Returns a random index into PERMUTATIONS."""
+    return rng.randrange(len(PERMUTATIONS))
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x):
+    # splitmix64 finalizer: spreads every input bit over the whole 64-bit output
+    x = (x ^ (x >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    x = (x ^ (x >> 27)) * 0x94D049BB133111EB & _MASK64
+    return x ^ (x >> 31)
+
+
+def shuffled_index(position, size, seed):
+    """
+    Element `position` of a seeded pseudo-random order of range(size), in O(1) (Feistel network
+    with cycle-walking); every further `size` positions start a new order.
+    """
+    if size <= 1:
+        return 0
+    passes, position = divmod(position, size)
+    # Nearby seeds (seed ^ level) must not share round keys, so the seed is mixed before adding the round
+    base = _mix64(seed & _MASK64) + passes * 0x9E3779B97F4A7C15
+    keys = [_mix64((base + round_number) & _MASK64) for round_number in range(8)]
+    bits = (size - 1).bit_length()
+    half = (bits + 1) // 2
+    mask = (1 << half) - 1
+    shift = 64 - half
+    x = position
+    while True:
+        left, right = x >> half, x & mask
+        for key in keys:
+            # Round function: the top `half` bits of a multiplicative hash of right and the round key
+            mixed = (right ^ key) * 0xBF58476D1CE4E5B9 & _MASK64
+            left, right = right, left ^ (((mixed ^ mixed >> 31) * 0x94D049BB133111EB & _MASK64) >> shift)
+        x = (left << half) | right
+        if x < size:
+            return x
+
+
+class QuestionMixin:
+    """Answer helpers shared by the ORM model, the pooled records and the snapshot views."""
+    __slots__ = ()
+
+    @property
+    def wrong_answers(self):
+        return [self.answer2, self.answer3, self.answer4]
+
+    @wrong_answers.setter
+    def wrong_answers(self, value):
+        if len(value) >= 1: self.answer2 = value[0]
+        if len(value) >= 2: self.answer3 = value[1]
+        if len(value) >= 3: self.answer4 = value[2]
+
+    @property
+    def choices(self):
+        """All four answers in stored order, correct answer first."""
+        return (self.correct_answer, self.answer2, self.answer3, self.answer4)
+
+    def shuffle(self, rng=random):
+        """Draws a new answer order. Pass a seeded random.Random to make it reproducible."""
+        self.permutation = draw_permutation(rng)
+        return self.permutation
+
+    @property
+    def answers(self):
+        # The order is drawn once per instance so it stays consistent during the request
+        if self.permutation is None:
+            self.shuffle()
+        return _PERMUTATION_GETTERS[self.permutation](self.choices)
+
+    @property
+    def correct_index(self):
+        """Position of the correct answer in self.answers (duplicate answer texts don't matter)."""
+        if self.permutation is None:
+            self.shuffle()
+        return CORRECT_POSITIONS[self.permutation]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'level': self.level,
+            'text': self.text,
+            'answers': self.answers,
+            'correct_answer': self.correct_answer,
+            'info': self.info
+        }
+
+
+def content_hash(text, correct_answer, wrong_answers):
+    """Hash of the text, correct answer and set of wrong answers; level and info are not part of it."""
+    wrong = sorted((answer or '').strip() for answer in wrong_answers)
+    parts = [(text or '').strip(), (correct_answer or '').strip()] + wrong
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+
+class QuestionRecord(QuestionMixin):
+    """Lightweight, session-free copy of a question row, handed out by the question pool."""
+    __slots__ = ('id', 'level', 'text', 'correct_answer', 'answer2', 'answer3', 'answer4', 'info',
+                 'choices', 'permutation')
+
+    # Column order of database rows; pooled rows append the choices tuple, see pool_row()
+    FIELDS = ('id', 'level', 'text', 'correct_answer', 'answer2', 'answer3', 'answer4', 'info')
+
+    def __init__(self, id, level, text, correct_answer, answer2, answer3, answer4, info,
+                 choices=None, permutation=None):
+        self.id = id
+        self.level = level
+        self.text = text
+        self.correct_answer = correct_answer
+        self.answer2 = answer2
+        self.answer3 = answer3
+        self.answer4 = answer4
+        self.info = info
+        self.choices = choices or (correct_answer, answer2, answer3, answer4)
+        self.permutation = permutation
+
+    def __repr__(self):
+        return f'<QuestionRecord {self.id}: {self.text}>'
+
+    @classmethod
+    def row_of(cls, question):
+        """Returns the compact tuple stored in the pool for a Question (or record)."""
+        return cls.pool_row(tuple(getattr(question, field) for field in cls.FIELDS))
+
+    @staticmethod
+    def pool_row(values):
+        """Appends the precomputed choices tuple to a FIELDS-ordered row."""
+        return (*values, tuple(values[3:7]))
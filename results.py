@@ -0,0 +1,189 @@
+"""
+Finished games: a write-behind result log (batched inserts on a background
+thread) and the per-process leaderboard and pass rates served by /api/leaderboard.
+"""
+import atexit
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+
+from model import GameResult, hour_bucket
+from periodic import PeriodicThread
+
+log = logging.getLogger(__name__)
+
+# Adds a flush's games to their hour's row of game_rollup
+ROLLUP_SQL = (
+    'INSERT INTO game_rollup (hour, bank, games, won, score, level) VALUES (?, ?, ?, ?, ?, ?) '
+    'ON CONFLICT(hour, bank) DO UPDATE SET games = games + excluded.games, won = won + excluded.won, '
+    'score = score + excluded.score, level = level + excluded.level'
+)
+
+# Tie breaker for equal heap entries, so result dicts are never compared
+_sequence = itertools.count()
+
+
+class Leaderboard:
+    """The k best results in a min-heap: adding one is O(log k), the worst of them is heap[0]."""
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []       # (score, -finished_at, sequence, result); earlier results win ties
+        self._sorted = None   # best first, rebuilt on the first read after a change
+
+    def add(self, result):
+        item = (result['score'], -result['finished_at'], next(_sequence), result)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item > self._heap[0]:
+            heapq.heapreplace(self._heap, item)
+        else:
+            return
+        self._sorted = None
+
+    def top(self, limit=None):
+        if self._sorted is None:
+            self._sorted = [item[-1] for item in sorted(self._heap, reverse=True)]
+        return self._sorted[:limit]
+
+
+class LevelStats:
+    """Per game level: how many games reached it and how many answered it correctly."""
+
+    def __init__(self):
+        self.games = 0
+        self.reached = []
+        self.passed = []
+
+    def add(self, level, won, count=1):
+        # A game that ended at `level` passed every level below it; a lost game also tried `level`
+        reached = level if won else level + 1
+        if len(self.reached) < reached:
+            self.reached.extend([0] * (reached - len(self.reached)))
+            self.passed.extend([0] * (reached - len(self.passed)))
+        for number in range(reached):
+            self.reached[number] += count
+        for number in range(level):
+            self.passed[number] += count
+        self.games += count
+
+    def rates(self):
+        return [{'level': level, 'reached': reached, 'passed': passed, 'pass_rate': round(passed / reached, 4)}
+                for level, (reached, passed) in enumerate(zip(self.reached, self.passed))]
+
+
+class ResultLog:
+    """
+    Write-behind log of finished games, flushed with their game_rollup totals every `flush_interval`
+    seconds or at `batch_size` rows. `flushes` counts the flushes that wrote anything.
+    """
+
+    def __init__(self, engine, leaderboard_size=100, batch_size=500, flush_interval=1.0):
+        self.engine = engine
+        self.leaderboard_size = leaderboard_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._boards = {}   # bank -> Leaderboard
+        self._levels = {}   # bank -> LevelStats
+        self._pending = []
+        self.flushes = 0
+        self._lock = threading.Lock()
+        self._worker = PeriodicThread(self.flush, flush_interval, 'result-log')
+
+    def _board(self, bank):
+        board = self._boards.get(bank)
+        if board is None:
+            board = self._boards[bank] = Leaderboard(self.leaderboard_size)
+        return board
+
+    def _level_stats(self, bank):
+        stats = self._levels.get(bank)
+        if stats is None:
+            stats = self._levels[bank] = LevelStats()
+        return stats
+
+    def load(self):
+        """Builds the aggregates from the results already in the database. Run once, before start()."""
+        table = GameResult.__table__
+        with self.engine.connect() as connection:
+            counts = connection.execute(
+                select(table.c.bank, table.c.level, table.c.won, func.count())
+                .group_by(table.c.bank, table.c.level, table.c.won)).all()
+            banks = {bank for bank, *_ in counts}
+            tops = {bank: connection.execute(
+                        select(table.c.finished_at, table.c.bank, table.c.level, table.c.score, table.c.won)
+                        .where(table.c.bank == bank)  # == None renders as IS NULL
+                        .order_by(table.c.score.desc()).limit(self.leaderboard_size)).mappings().all()
+                    for bank in banks}
+        with self._lock:
+            for bank, level, won, count in counts:
+                self._level_stats(bank).add(level, won, count)
+            for bank, rows in tops.items():
+                for row in rows:
+                    self._board(bank).add(dict(row))
+
+    def record(self, score, level, won, bank=None):
+        """Counts a finished game and queues it for the next flush."""
+        result = {'finished_at': time.time(), 'bank': bank, 'level': level, 'score': score, 'won': won}
+        with self._lock:
+            self._board(bank).add(result)
+            self._level_stats(bank).add(level, won)
+            self._pending.append(result)
+            if len(self._pending) >= self.batch_size:
+                self._worker.wake()
+
+    def leaderboard(self, bank=None, limit=10):
+        with self._lock:
+            board = self._boards.get(bank)
+            stats = self._levels.get(bank)
+            return {
+                'bank': bank,
+                'games': stats.games if stats else 0,
+                'top': board.top(limit) if board else [],
+                'levels': stats.rates() if stats else [],
+            }
+
+    def flush(self):
+        """Inserts the queued results and their hourly totals in one transaction. Returns the number written."""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        hours = {}  # (hour, bank) -> [games, won, score, level]
+        for result in batch:
+            key = (hour_bucket(result['finished_at']), result['bank'] or '')
+            totals = hours.get(key)
+            if totals is None:
+                totals = hours[key] = [0, 0, 0, 0]
+            totals[0] += 1
+            totals[1] += bool(result['won'])
+            totals[2] += result['score']
+            totals[3] += result['level']
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(GameResult.__table__.insert(), batch)
+                connection.exec_driver_sql(ROLLUP_SQL, [(*key, *totals) for key, totals in hours.items()])
+        except DBAPIError:
+            log.exception('Writing %d game results failed; retrying with the next flush', len(batch))
+            with self._lock:
+                self._pending[:0] = batch
+            return 0
+        self.flushes += 1
+        return len(batch)
+
+    def pending(self):
+        return len(self._pending)
+
+    def start(self):
+        """Starts the flush thread; queued results are also flushed when the process exits."""
+        atexit.register(self.close)
+        return self._worker.start()
+
+    def close(self):
+        self._worker.close()
+        self.flush()
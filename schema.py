@@ -0,0 +1,169 @@
+"""
+Schema migrations (numbered steps tracked in `PRAGMA user_version`) and SQLite connection tuning.
+"""
+import logging
+
+from sqlalchemy import event
+
+from periodic import PeriodicThread
+from records import content_hash
+
+log = logging.getLogger(__name__)
+
+# Applied to every new SQLite connection, in this order (WAL: reads go on during writes)
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),  # bytes
+    ('cache_size', -64 * 1024),        # negative: KiB, i.e. 64 MiB per connection
+    ('temp_store', 'MEMORY'),
+)
+
+# Read-only question banks (see banks.py) only need the read-side settings;
+# the cache is smaller since many banks can be open at once
+READ_ONLY_PRAGMAS = (
+    ('mmap_size', 256 * 1024 * 1024),
+    ('cache_size', -8 * 1024),
+    ('temp_store', 'MEMORY'),
+)
+
+# Seconds between `PRAGMA optimize` runs of the background optimizer
+OPTIMIZE_INTERVAL = 3600
+
+
+def add_content_hash(connection):
+    """Adds and backfills millionaire.content_hash on databases created before it existed."""
+    columns = [row[1] for row in connection.exec_driver_sql('PRAGMA table_info(millionaire)')]
+    if 'content_hash' not in columns:
+        connection.exec_driver_sql('ALTER TABLE millionaire ADD COLUMN content_hash TEXT')
+        rows = connection.exec_driver_sql(
+            'SELECT id, question, correct_answer, answer2, answer3, answer4 FROM millionaire').fetchall()
+        seen = set()
+        updates = []
+        for id, text, correct, *wrong in rows:
+            digest = content_hash(text, correct, wrong)
+            # Duplicates already in the table keep a NULL hash instead of failing the unique index
+            if digest not in seen:
+                seen.add(digest)
+                updates.append((digest, id))
+        if updates:
+            connection.exec_driver_sql('UPDATE millionaire SET content_hash = ? WHERE id = ?', updates)
+    connection.exec_driver_sql(
+        'CREATE UNIQUE INDEX IF NOT EXISTS millionaire_content_hash ON millionaire (content_hash)')
+
+
+def add_level_index(connection):
+    """
+    Index for level lookups. (difficulty, id) covers counting a level and
+    paging through its ids without touching the table rows.
+    """
+    connection.exec_driver_sql(
+        'CREATE INDEX IF NOT EXISTS millionaire_difficulty ON millionaire (difficulty, id)')
+
+
+def _has_tables(connection, *names):
+    found = connection.exec_driver_sql(
+        f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({', '.join('?' * len(names))})",
+        names).scalar()
+    return found == len(names)
+
+
+def backfill_game_rollup(connection):
+    """Adds the games logged before game_rollup existed to their hours (nothing to do without game_results)."""
+    from model import GameRollup
+
+    if not _has_tables(connection, 'game_results'):
+        return
+    GameRollup.__table__.create(connection, checkfirst=True)
+    connection.exec_driver_sql(
+        "INSERT INTO game_rollup (hour, bank, games, won, score, level) "
+        "SELECT CAST(finished_at AS INTEGER) / 3600 * 3600, COALESCE(bank, ''), COUNT(*), SUM(won), SUM(score), "
+        "SUM(level) FROM game_results GROUP BY 1, 2")
+
+
+# (version, step) in order; append new steps with the next version number, never renumber
+MIGRATIONS = (
+    (1, add_content_hash),
+    (2, add_level_index),
+    (3, backfill_game_rollup),
+)
+
+
+def schema_version(connection):
+    return connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def migrate(connection):
+    """
+    Runs the migrations newer than the database's user_version.
+    connection: an SQLAlchemy connection inside a transaction.
+    Returns the list of versions applied.
+    """
+    current = schema_version(connection)
+    applied = []
+    for version, step in MIGRATIONS:
+        if version > current:
+            log.info('Applying migration %d (%s)', version, step.__name__)
+            step(connection)
+            # PRAGMA does not take bound parameters; version is an int from MIGRATIONS
+            connection.exec_driver_sql(f'PRAGMA user_version = {int(version)}')
+            applied.append(version)
+    if applied:
+        # Fresh statistics so the planner picks up the new indexes right away
+        connection.exec_driver_sql('ANALYZE')
+    return applied
+
+
+def _apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas:
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+def _set_pragmas(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, SQLITE_PRAGMAS)
+
+
+def _set_read_only_pragmas(dbapi_connection, connection_record):
+    _apply_pragmas(dbapi_connection, READ_ONLY_PRAGMAS)
+
+
+def tune_engine(engine, read_only=False):
+    """Applies SQLITE_PRAGMAS (or READ_ONLY_PRAGMAS) to every connection the engine opens from now on."""
+    if engine.dialect.name != 'sqlite':
+        return
+    listener = _set_read_only_pragmas if read_only else _set_pragmas
+    if not event.contains(engine, 'connect', listener):
+        event.listen(engine, 'connect', listener)
+
+
+def optimize(engine):
+    """Lets SQLite refresh the statistics of tables that changed enough (cheap when nothing did)."""
+    with engine.connect() as connection:
+        connection.exec_driver_sql('PRAGMA optimize')
+
+
+class Optimizer:
+    """Runs optimize() every `interval` seconds on a daemon thread until close()."""
+
+    def __init__(self, engine, interval=OPTIMIZE_INTERVAL):
+        self.engine = engine
+        self.interval = interval
+        self._worker = PeriodicThread(self.run_once, interval, 'sqlite-optimize')
+
+    def run_once(self):
+        optimize(self.engine)
+
+    def start(self):
+        return self._worker.start()
+
+    def close(self):
+        self._worker.close()
+
+
+def start_optimizer(engine, interval=OPTIMIZE_INTERVAL):
+    """Starts an Optimizer on `engine`. Returns it; close() stops it."""
+    optimizer = Optimizer(engine, interval)
+    optimizer.start()
+    return optimizer
@@ -0,0 +1,111 @@
+import re
+
+from sqlalchemy import or_, text
+from sqlalchemy.exc import OperationalError
+
+from model import db, Question, QuestionRecord
+
+# Columns of the millionaire table that are searchable, with their bm25 weights
+SEARCH_COLUMNS = (('question', 10.0), ('correct_answer', 2.0),
+                  ('answer2', 1.0), ('answer3', 1.0), ('answer4', 1.0))
+
+_columns = ', '.join(name for name, _ in SEARCH_COLUMNS)
+_new_values = ', '.join(f'new.{name}' for name, _ in SEARCH_COLUMNS)
+_old_values = ', '.join(f'old.{name}' for name, _ in SEARCH_COLUMNS)
+_weights = ', '.join(str(weight) for _, weight in SEARCH_COLUMNS)
+
+# External-content FTS5 table: the text lives only in millionaire, the index
+# is kept in sync by triggers so every write path (ORM, bulk SQL) is covered.
+SEARCH_INDEX_DDL = [
+    f"CREATE VIRTUAL TABLE millionaire_fts USING fts5({_columns}, content='millionaire', "
+    f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    f"CREATE TRIGGER millionaire_fts_insert AFTER INSERT ON millionaire BEGIN "
+    f"INSERT INTO millionaire_fts(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    f"CREATE TRIGGER millionaire_fts_delete AFTER DELETE ON millionaire BEGIN "
+    f"INSERT INTO millionaire_fts(millionaire_fts, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); END",
+    f"CREATE TRIGGER millionaire_fts_update AFTER UPDATE OF {_columns} ON millionaire BEGIN "
+    f"INSERT INTO millionaire_fts(millionaire_fts, rowid, {_columns}) VALUES ('delete', old.id, {_old_values}); "
+    f"INSERT INTO millionaire_fts(rowid, {_columns}) VALUES (new.id, {_new_values}); END",
+    "INSERT INTO millionaire_fts(millionaire_fts) VALUES ('rebuild')",
+]
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+# SELECT list producing QuestionRecord rows from the joined millionaire table
+_record_columns = ', '.join(f'm.{getattr(Question, field).expression.name}' for field in QuestionRecord.FIELDS)
+
+
+def create_search_index(connection):
+    """
+    Creates and fills the FTS5 index unless it already exists.
+    Returns False when the SQLite build has no FTS5 support.
+    """
+    exists = connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'millionaire_fts'")).first()
+    if exists:
+        return True
+    try:
+        for statement in SEARCH_INDEX_DDL:
+            connection.execute(text(statement))
+    except OperationalError:
+        # No FTS5 compiled in: searches fall back to LIKE
+        return False
+    return True
+
+
+@db.event.listens_for(db.metadata, 'after_create')
+def _create_search_index(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        create_search_index(connection)
+
+
+def has_search_index():
+    return db.session.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'millionaire_fts'")).first() is not None
+
+
+def match_expression(query, prefix=True):
+    """
+    Turns free user input into an FTS5 MATCH expression.
+    Every word must occur (in any column); with prefix=True words also match
+    as prefixes, e.g. 'pres wash' finds 'President ... Washington'.
+    """
+    terms = _TERM.findall(query)
+    suffix = '*' if prefix else ''
+    return ' '.join(f'"{term}"{suffix}' for term in terms)
+
+
+def search_questions(query, level=None, limit=50, offset=0, prefix=True):
+    """Returns QuestionRecords matching query, best matches first."""
+    if not has_search_index():
+        return like_search(query, level, limit, offset)
+
+    expression = match_expression(query, prefix)
+    if not expression:
+        return []
+
+    sql = (f"SELECT {_record_columns} FROM millionaire_fts JOIN millionaire m ON m.id = millionaire_fts.rowid "
+           f"WHERE millionaire_fts MATCH :expression")
+    params = {'expression': expression, 'limit': limit, 'offset': offset}
+    if level is not None:
+        sql += " AND m.difficulty = :level"
+        params['level'] = level
+    sql += f" ORDER BY bm25(millionaire_fts, {_weights}) LIMIT :limit OFFSET :offset"
+    return [QuestionRecord(*row) for row in db.session.execute(text(sql), params)]
+
+
+def like_search(query, level=None, limit=50, offset=0):
+    """The original substring search; used when FTS5 is not available."""
+    search = f"%{query}%"
+    q = Question.query.filter(
+        or_(
+            Question.text.like(search),
+            Question.correct_answer.like(search),
+            Question.answer2.like(search),
+            Question.answer3.like(search),
+            Question.answer4.like(search)
+        )
+    )
+    if level is not None:
+        q = q.filter(Question.level == level)
+    return q.order_by(Question.id).limit(limit).offset(offset).all()
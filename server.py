@@ -0,0 +1,50 @@
+"""
+Production entry point: serves the web game, the REST API and the WebSocket
+game channel on eventlet's cooperative workers instead of the blocking
+development server started by `python app.py`.
+
+Usage:
+    python server.py [--host 0.0.0.0] [--port 5000]
+
+Environment:
+    DB_POOL_SIZE       maximum concurrent DB connections (default 10)
+    GAME_STATE_STORE   'memory' or 'sqlite:///<path>' (see game_state.py)
+    MQTT_BROKER_URL    also broadcast live shows over this MQTT broker (see show.py)
+    CHANGES_POLL_INTERVAL  seconds between checks for question edits of other processes (default 2)
+"""
+import eventlet
+
+# Must run before anything else imports socket/threading
+eventlet.monkey_patch()
+
+import argparse
+
+from app import create_app
+from game_socket import attach_shows, socketio
+
+
+def unbuffered_event_streams(wsgi_app):
+    """eventlet collects 4 KiB of a streamed response before sending it; Server-Sent Events must go out at once."""
+    def middleware(environ, start_response):
+        if 'text/event-stream' in environ.get('HTTP_ACCEPT', ''):
+            environ['eventlet.minimum_write_chunk_size'] = 0
+        return wsgi_app(environ, start_response)
+    return middleware
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the Millionaire server on eventlet.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app()
+    socketio.init_app(app, async_mode='eventlet')
+    attach_shows(app.extensions['millionaire'].shows)
+    # Outside Flask-SocketIO's middleware, which hands the app a copy of the environ
+    app.wsgi_app = unbuffered_event_streams(app.wsgi_app)
+    socketio.run(app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
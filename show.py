@@ -0,0 +1,283 @@
+"""
+Live show mode: a host opens rounds and every player gets the same question,
+published once per transport (Socket.IO room '/show', optionally MQTT).
+
+MQTT topics (prefix MQTT_SHOW_TOPIC, default 'millionaire/show'):
+    <prefix>/<show id>/question   round opened (retained for late joiners)
+    <prefix>/<show id>/results    round closed
+    <prefix>/<show id>/end        no questions left
+    <prefix>/<show id>/answer     players publish {"player", "round", "answer"}
+"""
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+
+from game_state import ExpiringMap
+
+log = logging.getLogger(__name__)
+
+# Players listed in a round's results and the final leaderboard
+TOP_PLAYERS = 10
+
+
+class ShowRound:
+    """One question of a show and the answers to it."""
+    __slots__ = ('number', 'question_id', 'correct_index', 'payload', 'opened_at', 'closed', 'answers', 'results')
+
+    def __init__(self, show_id, number, question):
+        self.number = number
+        self.question_id = question.id
+        self.correct_index = question.correct_index
+        # Sent to players as is; the correct index stays on the server until the round closes
+        self.payload = {'show': show_id, 'round': number, 'level': question.level,
+                        'text': question.text, 'answers': question.answers}
+        self.opened_at = time.monotonic()
+        self.closed = False
+        self.answers = {}  # player -> (answer index, seconds after opening)
+        self.results = None
+
+    def answer(self, player, choice):
+        """Records a player's first answer. Returns False if it came late, twice or out of range."""
+        if self.closed or not isinstance(choice, int) or not 0 <= choice < len(self.payload['answers']):
+            return False
+        entry = (choice, time.monotonic() - self.opened_at)
+        # setdefault() is one atomic dict operation: concurrent answers need no lock
+        return self.answers.setdefault(player, entry) is entry
+
+    def close(self, points):
+        """Closes the round and counts it. Returns {player: points} for the correct answers."""
+        self.closed = True
+        answers = dict(self.answers)  # answers racing the close are simply not counted
+        tally = [0] * len(self.payload['answers'])
+        correct = []
+        for player, (choice, seconds) in answers.items():
+            tally[choice] += 1
+            if choice == self.correct_index:
+                correct.append((seconds, player))
+        correct.sort()
+        self.results = {
+            'show': self.payload['show'],
+            'round': self.number,
+            'correct_index': self.correct_index,
+            'tally': tally,
+            'answers': len(answers),
+            'correct': len(correct),
+            'fastest': [{'player': player, 'seconds': round(seconds, 3)} for seconds, player in correct[:TOP_PLAYERS]],
+        }
+        return {player: points for _, player in correct}
+
+
+class Show:
+    """
+    A running show. Round n asks a question of level n (or of the highest
+    level, once there are no more), dealt from the bank in the order picked
+    by `seed`. It ends when the host ends it or the bank has no questions.
+    """
+
+    def __init__(self, show_id, bank_name, seed, broadcasters):
+        self.show_id = show_id
+        self.bank_name = bank_name
+        self.seed = seed
+        self.host_token = secrets.token_urlsafe(16)
+        self.broadcasters = broadcasters
+        self.rounds = []
+        self.cursors = {}  # level -> next position in the level's order (see QuestionPool.get_nth)
+        self.top_level = None  # highest level with questions, once a round went past it
+        self.scores = {}
+        self.names = {}  # player -> display name, for players who gave one
+        self.finished = False
+        self.expires = 0.0  # set by ShowRegistry.touch()
+        self._lock = threading.Lock()  # host actions only; players never take it
+
+    @property
+    def current(self):
+        return self.rounds[-1] if self.rounds else None
+
+    def publish(self, event, payload):
+        for broadcaster in self.broadcasters:
+            try:
+                broadcaster.publish(self.show_id, event, payload)
+            except Exception:
+                log.exception('Publishing %s of show %s via %r failed', event, self.show_id, broadcaster)
+
+    def next_round(self, bank, rng=random):
+        """Closes the open round, draws the next question and publishes it. Returns the round or None at the end."""
+        with self._lock:
+            self._close_round()
+            question = self._draw(bank, len(self.rounds), rng)
+            if question is None:
+                self._end()
+                return None
+            show_round = ShowRound(self.show_id, len(self.rounds), question)
+            self.rounds.append(show_round)
+        self.publish('question', show_round.payload)
+        return show_round
+
+    def close_round(self):
+        """Closes the open round and publishes its results. Returns them, or None if no round is open."""
+        with self._lock:
+            show_round = self._close_round()
+        return show_round.results if show_round else None
+
+    def _draw(self, bank, round_number, rng):
+        # Rounds climb the levels, then stay on the highest one; no repeats until a level is used up
+        level = round_number if self.top_level is None else self.top_level
+        while level >= 0:
+            position = self.cursors.get(level, 0)
+            question = bank.get_nth(level, self.seed, position, rng)
+            if question is not None:
+                self.cursors[level] = position + 1
+                return question
+            level = self.top_level = level - 1
+        return None
+
+    def end(self):
+        """Closes the open round and publishes the final leaderboard."""
+        with self._lock:
+            self._close_round()
+            self._end()
+
+    def _end(self):
+        if not self.finished:
+            self.finished = True
+            self.publish('end', {'show': self.show_id, 'leaderboard': self.leaderboard()})
+
+    def _close_round(self):
+        # Caller holds the lock
+        show_round = self.current
+        if show_round is None or show_round.closed:
+            return None
+        for player, points in show_round.close(100 * (show_round.number + 1)).items():
+            self.scores[player] = self.scores.get(player, 0) + points
+        for entry in show_round.results['fastest']:
+            entry['player'] = self.names.get(entry['player'], entry['player'])
+        show_round.results['leaderboard'] = self.leaderboard()
+        self.publish('results', show_round.results)
+        return show_round
+
+    def answer(self, player, round_number, choice):
+        """A player's answer to round `round_number`; False unless that round is open and it is the first answer."""
+        show_round = self.current
+        if show_round is None or show_round.number != round_number:
+            return False
+        return show_round.answer(player, choice)
+
+    def leaderboard(self):
+        best = sorted(self.scores.items(), key=lambda item: item[1], reverse=True)[:TOP_PLAYERS]
+        return [{'player': self.names.get(player, player), 'score': score} for player, score in best]
+
+    def status(self):
+        show_round = self.current
+        return {
+            'show': self.show_id,
+            'bank': self.bank_name,
+            'round': show_round.number if show_round else None,
+            'open': bool(show_round and not show_round.closed),
+            'answers': len(show_round.answers) if show_round else 0,
+            'finished': self.finished,
+        }
+
+
+class ShowRegistry:
+    """
+    Running shows by id. Broadcasters added here reach the shows created afterwards.
+    Shows are dropped `ttl` seconds after their host's last action (see touch()) and beyond `max_shows`.
+    """
+
+    def __init__(self, ttl=3600, max_shows=10_000):
+        self.ttl = ttl
+        self.max_shows = max_shows
+        self.broadcasters = []
+        self._shows = ExpiringMap(ttl, max_shows)
+
+    def create(self, bank_name, seed):
+        show = Show(secrets.token_urlsafe(8), bank_name, seed, self.broadcasters)
+        self.touch(show)
+        return show
+
+    def get(self, show_id):
+        return self._shows.get(show_id)
+
+    def touch(self, show):
+        """Keeps `show` for another `ttl` seconds; called on every host action."""
+        self._shows.put(show.show_id, show)
+
+    def remove(self, show_id):
+        self._shows.discard(show_id)
+
+    def answer(self, show_id, player, round_number, choice):
+        show = self.get(show_id)
+        return show is not None and show.answer(player, round_number, choice)
+
+    def __len__(self):
+        return len(self._shows)
+
+
+class SocketIOBroadcaster:
+    """Publishes to the Socket.IO room named after the show: one emit, encoded once for all players."""
+
+    def __init__(self, socketio, namespace='/show'):
+        self.socketio = socketio
+        self.namespace = namespace
+
+    def publish(self, show_id, event, payload):
+        self.socketio.emit(event, payload, namespace=self.namespace, to=show_id)
+
+
+class MqttBroadcaster:
+    """
+    Publishes to MQTT topics <prefix>/<show id>/<event> and feeds answers
+    from <prefix>/+/answer into `registry`. mqtt: a connected flask_mqtt.Mqtt.
+    """
+
+    def __init__(self, mqtt, registry, prefix='millionaire/show'):
+        self.mqtt = mqtt
+        self.prefix = prefix
+        self.registry = registry
+        mqtt.subscribe(f'{prefix}/+/answer')
+
+        @mqtt.on_topic(f'{prefix}/+/answer')
+        def on_answer(client, userdata, message):
+            self.on_answer(message.topic, message.payload)
+
+    def publish(self, show_id, event, payload):
+        # The open question is retained, so players subscribing mid-round get it right away
+        self.mqtt.publish(f'{self.prefix}/{show_id}/{event}', json.dumps(payload), qos=0, retain=event == 'question')
+
+    def on_answer(self, topic, body):
+        show_id = topic[len(self.prefix) + 1:].split('/', 1)[0]
+        try:
+            data = json.loads(body)
+            self.registry.answer(show_id, str(data['player']), int(data['round']), int(data['answer']))
+        except (ValueError, KeyError, TypeError):
+            pass  # malformed answers from the public topic are dropped
+
+
+class LocalBroadcaster:
+    """
+    In-process stand-in for a broker, for simulations: delivers each
+    publish, JSON-encoded once like on the wire, to subscriber callbacks
+    callback(event, body) in the publishing thread.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # show id -> list of callbacks
+
+    def subscribe(self, show_id, callback):
+        self._subscribers.setdefault(show_id, []).append(callback)
+
+    def publish(self, show_id, event, payload):
+        body = json.dumps(payload)
+        for callback in self._subscribers.get(show_id, ()):
+            callback(event, body)
+
+
+def init_mqtt(app, registry):
+    """Connects flask-mqtt (MQTT_BROKER_URL, MQTT_BROKER_PORT, ...) and adds an MqttBroadcaster to `registry`."""
+    from flask_mqtt import Mqtt
+    mqtt = Mqtt(app)
+    registry.broadcasters.append(MqttBroadcaster(mqtt, registry, app.config.get('MQTT_SHOW_TOPIC', 'millionaire/show')))
+    return mqtt
@@ -0,0 +1,279 @@
+"""
+Read-only binary question snapshots, mmap()ed by the readers so worker
+processes share one copy of the questions instead of building Python objects.
+
+File layout (little endian, every section 8-byte aligned):
+
+    header          magic, format version, level count, source table version,
+                    question count, string count, string data size
+    ids             int64   per question
+    levels          int32   per question
+    string refs     uint32  x 6 per question (text, correct answer,
+                            answer2-4, info), indexes into the string table
+    level index     int32   x 3 per level (level, first question, count);
+                            questions are sorted by level, so every level is
+                            a contiguous range
+    string offsets  uint64  per string + 1, into the string data
+    string data     UTF-8, every distinct string stored once
+
+Usage:
+    python snapshot.py export <out.snap> [--db millionaire.sqlite3 | --tsv millionaire.txt]
+    python snapshot.py info <file.snap>
+"""
+import argparse
+import mmap
+import os
+import random
+import sqlite3
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from urllib.parse import quote
+
+from records import QuestionMixin, shuffled_index
+
+MAGIC = b'MQSNAP\x00\x00'
+FORMAT_VERSION = 1
+# magic, format version, level count, source version, question count, string count, string data size
+HEADER = struct.Struct('<8sIIQQQQ')
+# Strings per question: text, correct answer, answer2-4, info
+STRINGS_PER_QUESTION = 6
+
+SNAPSHOT_SUFFIX = '.snap'
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _sections(level_count, question_count, string_count):
+    """Returns the start offsets of the sections after the header, and the start of the string data."""
+    ids = _align(HEADER.size)
+    levels = _align(ids + 8 * question_count)
+    refs = _align(levels + 4 * question_count)
+    level_index = _align(refs + 4 * STRINGS_PER_QUESTION * question_count)
+    offsets = _align(level_index + 12 * level_count)
+    data = _align(offsets + 8 * (string_count + 1))
+    return ids, levels, refs, level_index, offsets, data
+
+
+def write_snapshot(path, rows, source_version=0):
+    """
+    Writes rows of (id, level, text, correct_answer, answer2-4, info) to `path`, replacing it
+    atomically. Returns the number of questions written.
+    """
+    rows = sorted(rows, key=lambda row: (row[1], row[0]))
+    strings = {}
+    refs = []
+    for row in rows:
+        for value in row[2:8]:
+            refs.append(strings.setdefault(value or '', len(strings)))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+
+    level_index = []
+    for number, row in enumerate(rows):
+        if not level_index or level_index[-1][0] != row[1]:
+            level_index.append([row[1], number, 0])
+        level_index[-1][2] += 1
+
+    count = len(rows)
+    sections = _sections(len(level_index), count, len(encoded))
+    parts = [
+        array('q', [row[0] for row in rows]),
+        array('i', [row[1] for row in rows]),
+        array('I', refs),
+        array('i', [value for entry in level_index for value in entry]),
+        array('Q', offsets),
+    ]
+    if sys.byteorder != 'little':
+        for part in parts:
+            part.byteswap()
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=SNAPSHOT_SUFFIX)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(level_index), source_version,
+                                   count, len(encoded), offsets[-1]))
+            for start, part in zip(sections, parts):
+                file.write(b'\x00' * (start - file.tell()))
+                part.tofile(file)
+            file.write(b'\x00' * (sections[-1] - file.tell()))
+            file.write(b''.join(encoded))
+        os.chmod(temp_path, 0o644)  # mkstemp creates 0600; workers may run as other users
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return count
+
+
+class QuestionSnapshot:
+    """A mapped snapshot file. Behaves like a read-only question pool."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        (magic, format_version, level_count, self.source_version,
+         count, string_count, data_size) = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a question snapshot')
+        if format_version != FORMAT_VERSION:
+            raise ValueError(f'{path} has snapshot format {format_version}, expected {FORMAT_VERSION}')
+
+        # The sections are read with memoryview.cast(), i.e. in native byte order
+        if sys.byteorder != 'little':
+            raise ValueError('Question snapshots can only be mapped on little-endian machines')
+        ids, levels, refs, level_index, offsets, data = _sections(level_count, count, string_count)
+        self._ids = buffer[ids:ids + 8 * count].cast('q')
+        self._levels = buffer[levels:levels + 4 * count].cast('i')
+        self._refs = buffer[refs:refs + 4 * STRINGS_PER_QUESTION * count].cast('I')
+        self._offsets = buffer[offsets:offsets + 8 * (string_count + 1)].cast('Q')
+        self._data = buffer[data:data + data_size]
+        index = buffer[level_index:level_index + 12 * level_count].cast('i')
+        # level -> range of question numbers
+        self._ranges = {index[i]: range(index[i + 1], index[i + 1] + index[i + 2])
+                        for i in range(0, len(index), 3)}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, number):
+        if not 0 <= number < len(self._ids):
+            raise IndexError(number)
+        return QuestionView(self, number)
+
+    def __iter__(self):
+        return (QuestionView(self, number) for number in range(len(self._ids)))
+
+    def string(self, ref):
+        offsets = self._offsets
+        return str(self._data[offsets[ref]:offsets[ref + 1]], 'utf-8')
+
+    def levels(self):
+        """Levels that have questions, lowest first."""
+        return sorted(self._ranges)
+
+    def count(self, level=None):
+        if level is None:
+            return len(self._ids)
+        return len(self._ranges.get(level, ()))
+
+    def get_random(self, level, rng=random):
+        """Returns a shuffled QuestionView of the given level or None if there is none."""
+        numbers = self._ranges.get(level)
+        if not numbers:
+            return None
+        view = QuestionView(self, rng.choice(numbers))
+        view.shuffle(rng)
+        return view
+
+    def get_nth(self, level, seed, position, rng=random):
+        """Returns view `position` of the level's order picked by `seed`, see QuestionPool.get_nth."""
+        numbers = self._ranges.get(level)
+        if not numbers:
+            return None
+        view = QuestionView(self, numbers[shuffled_index(position, len(numbers), seed ^ level)])
+        view.shuffle(rng)
+        return view
+
+
+def _string_field(slot):
+    def get(self):
+        return self._snapshot.string(self._snapshot._refs[STRINGS_PER_QUESTION * self._number + slot])
+    return property(get)
+
+
+class QuestionView(QuestionMixin):
+    """One question of a snapshot; its strings are decoded from the mapped file on access."""
+    __slots__ = ('_snapshot', '_number', 'permutation')
+
+    def __init__(self, snapshot, number, permutation=None):
+        self._snapshot = snapshot
+        self._number = number
+        self.permutation = permutation
+
+    def __repr__(self):
+        return f'<QuestionView {self.id}: {self.text}>'
+
+    @property
+    def id(self):
+        return self._snapshot._ids[self._number]
+
+    @property
+    def level(self):
+        return self._snapshot._levels[self._number]
+
+    text = _string_field(0)
+    correct_answer = _string_field(1)
+    answer2 = _string_field(2)
+    answer3 = _string_field(3)
+    answer4 = _string_field(4)
+    info = _string_field(5)
+
+
+def open_snapshot(path):
+    return QuestionSnapshot(path)
+
+
+def rows_from_db(path):
+    """Returns (rows, table version) of an SQLite question database, opened read-only."""
+    conn = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro', uri=True)
+    try:
+        rows = conn.execute('SELECT id, difficulty, question, correct_answer, answer2, answer3, answer4, '
+                            'background_information FROM millionaire WHERE difficulty IS NOT NULL').fetchall()
+        try:
+            version = conn.execute('SELECT version FROM millionaire_version WHERE id = 1').fetchone()
+        except sqlite3.OperationalError:
+            version = None  # database the app never ran on
+    finally:
+        conn.close()
+    return rows, version[0] if version else 0
+
+
+def rows_from_tsv(path):
+    """Returns the rows of a millionaire.txt style file, numbered by line. Invalid lines are skipped."""
+    from bulk_import import read_tsv
+    with open(path, 'r', encoding='utf-8', newline='') as file:
+        return [(number, *row[:7]) for number, row in read_tsv(file) if not isinstance(row, ValueError)]
+
+
+def main(argv):
+    root = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Export and inspect binary question snapshots.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='write a snapshot of a question database or TSV file')
+    export.add_argument('output')
+    source = export.add_mutually_exclusive_group()
+    source.add_argument('--db', default=os.path.join(root, 'millionaire.sqlite3'))
+    source.add_argument('--tsv')
+    info = commands.add_parser('info', help='print a snapshot header')
+    info.add_argument('file')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        start = time.perf_counter()
+        rows, version = (rows_from_tsv(args.tsv), 0) if args.tsv else rows_from_db(args.db)
+        count = write_snapshot(args.output, rows, version)
+        print(f'Wrote {count:,} questions to {args.output} '
+              f'({os.path.getsize(args.output):,} bytes, {time.perf_counter() - start:.2f}s)')
+    else:
+        start = time.perf_counter()
+        snapshot = open_snapshot(args.file)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f'{args.file}: {len(snapshot):,} questions, source version {snapshot.source_version}, '
+              f'opened in {elapsed:.2f} ms')
+        for level in snapshot.levels():
+            print(f'  level {level}: {snapshot.count(level):,}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
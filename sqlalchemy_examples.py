@@ -1,4 +1,4 @@
-from app import app, db, Question
+from model import create_db_app, db, Question
 
 def run_examples():
     """
@@ -6,6 +6,9 @@ def run_examples():
     """
     print("--- SQLAlchemy ORM Examples ---")
 
+    # Only the database is needed here, not the routes and services of app.create_app()
+    app = create_db_app()
+
     # We must push an application context to access the database
     with app.app_context():
 
@@ -1,17 +1,29 @@
 #main file for who wants to be a millionare
+import os
 import random
-from model import questions
-from model.questions import load_questions_from_file
+import sys
 
-path = 'millionaire.txt'
+# The shared modules live in the project root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
 
-questions = load_questions_from_file(path)
+from snapshot import open_snapshot, rows_from_tsv, write_snapshot
+
+path = os.path.join(ROOT, 'millionaire.txt')
+snapshot_path = os.path.join(ROOT, 'millionaire.snap')
+
+def load_questions():
+    # millionaire.txt is only parsed when the snapshot is missing or older than it;
+    # otherwise the snapshot is mapped and questions are read straight from it
+    if not os.path.exists(snapshot_path) or os.path.getmtime(snapshot_path) < os.path.getmtime(path):
+        write_snapshot(snapshot_path, rows_from_tsv(path))
+    return open_snapshot(snapshot_path)
 
 def ask_question(question):
     print("\nQuestion:")
-    print(question['question'])
-    answers = question['answers']
-    random.shuffle(answers)
+    print(question.text)
+    question.shuffle()
+    answers = question.answers
     for idx, answer in enumerate(answers, 1):
         print(f"{idx}. {answer}")
     return answers
@@ -26,18 +38,20 @@ def get_user_answer():
         except ValueError:
             print("Invalid input. Please enter a number between 1 and 4.")
 def main():
+    questions = load_questions()
     score = 0
-    random.shuffle(questions)
-    for question in questions:
-        answers = ask_question(question)
+    order = list(range(len(questions)))
+    random.shuffle(order)
+    for number in order:
+        question = questions[number]
+        ask_question(question)
         user_choice = get_user_answer()
-        selected_answer = answers[user_choice - 1]
-        if selected_answer == question['correct_answer']:
+        if user_choice - 1 == question.correct_index:
             print("Correct!")
             score += 1
         else:
-            print(f"Wrong! The correct answer was: {question['correct_answer']}")
-        print(f"Background info: {question['background_info']}")
+            print(f"Wrong! The correct answer was: {question.correct_answer}")
+        print(f"Background info: {question.info}")
     print(f"\nGame over! Your final score is: {score}/{len(questions)}")
 if __name__ == "__main__":
     main()# Compare this snippet from src/main.py:
\ No newline at end of file
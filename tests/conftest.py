@@ -0,0 +1,28 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a copy of millionaire.sqlite3, without the background services that poll the database."""
+    import app as millionaire
+
+    path = tmp_path / 'millionaire.sqlite3'
+    shutil.copy(os.path.join(PROJECT_ROOT, 'millionaire.sqlite3'), path)
+    app = millionaire.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'TESTING': True,
+                                  'CALIBRATION_INTERVAL': 0, 'DB_OPTIMIZE_INTERVAL': 0,
+                                  'CHANGES_POLL_INTERVAL': 0, 'STATS_REFRESH_INTERVAL': 0})
+    yield app
+    app.extensions['millionaire'].close()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
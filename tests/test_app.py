@@ -0,0 +1,48 @@
+import shutil
+import sqlite3
+
+from conftest import PROJECT_ROOT
+
+
+def make_app(tmp_path, name, prefix):
+    import app as millionaire
+
+    path = tmp_path / f'{name}.sqlite3'
+    shutil.copy(f'{PROJECT_ROOT}/millionaire.sqlite3', path)
+    connection = sqlite3.connect(path)
+    connection.execute("UPDATE millionaire SET question = ? || question", (prefix,))
+    connection.commit()
+    connection.close()
+    return millionaire.create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'TESTING': True,
+                                   'CALIBRATION_INTERVAL': 0, 'DB_OPTIMIZE_INTERVAL': 0,
+                                   'CHANGES_POLL_INTERVAL': 0, 'STATS_REFRESH_INTERVAL': 0})
+
+
+def test_apps_keep_their_own_services(tmp_path):
+    first = make_app(tmp_path, 'a', 'A-DB ')
+    second = make_app(tmp_path, 'b', 'B-DB ')
+    try:
+        for app, prefix in ((first, 'A-DB '), (second, 'B-DB ')):
+            client = app.test_client()
+            assert client.get('/game_random_question?level=1').get_json()['text'].startswith(prefix)
+            client.post('/api/start')
+            assert client.get('/api/question').get_json()['text'].startswith(prefix)
+        assert first.extensions['millionaire'].results_log is not second.extensions['millionaire'].results_log
+    finally:
+        first.extensions['millionaire'].close()
+        second.extensions['millionaire'].close()
+
+
+def test_writes_reach_only_their_own_app(tmp_path):
+    first = make_app(tmp_path, 'a', 'A-DB ')
+    second = make_app(tmp_path, 'b', 'B-DB ')
+    try:
+        pools = [app.extensions['millionaire'].question_pool for app in (first, second)]
+        counts = [pool.count(1) for pool in pools]
+        question = {'level': 1, 'text': 'Only in B?', 'correct_answer': 'Yes',
+                    'wrong_answers': ['No', 'Maybe', 'Later'], 'info': ''}
+        assert second.test_client().post('/api/questions', json=question).status_code == 200
+        assert [pool.count(1) for pool in pools] == [counts[0], counts[1] + 1]
+    finally:
+        first.extensions['millionaire'].close()
+        second.extensions['millionaire'].close()
@@ -0,0 +1,113 @@
+import time
+
+import schema
+
+
+def test_optimizer_survives_errors_and_stops(monkeypatch):
+    calls = []
+
+    def optimize(engine):
+        calls.append(engine)
+        raise RuntimeError('not a database error')
+
+    monkeypatch.setattr(schema, 'optimize', optimize)
+    optimizer = schema.start_optimizer('engine', interval=0.01)
+    time.sleep(0.1)
+    optimizer.close()
+    optimizer._worker.thread.join(1)
+    assert len(calls) > 1
+    assert not optimizer._worker.thread.is_alive()
+
+
+def test_closing_the_services_stops_the_optimizer(app):
+    from schema import start_optimizer
+    from model import db
+
+    services = app.extensions['millionaire']
+    with app.app_context():
+        services.optimizer = start_optimizer(db.engine, 3600)
+    services.close()
+    services.optimizer._worker.thread.join(1)
+    assert not services.optimizer._worker.thread.is_alive()
+
+
+def test_calibrator_survives_errors_and_stops(monkeypatch):
+    import calibration
+
+    calls = []
+
+    def recalibrate(*args):
+        calls.append(args)
+        raise ValueError('not a database error')
+
+    class Engine:
+        def begin(self):
+            import contextlib
+            return contextlib.nullcontext('connection')
+
+    monkeypatch.setattr(calibration, 'recalibrate', recalibrate)
+    calibrator = calibration.start_calibration(Engine(), interval=0.01)
+    time.sleep(0.1)
+    calibrator.close()
+    calibrator._worker.thread.join(1)
+    assert len(calls) > 1
+    assert not calibrator._worker.thread.is_alive()
+
+
+def test_dashboard_survives_errors_and_stops(monkeypatch):
+    import dashboard
+
+    calls = []
+
+    def refresh(self, force=False):
+        calls.append(force)
+        raise ValueError('not a database error')
+
+    monkeypatch.setattr(dashboard.StatsDashboard, 'refresh', refresh)
+    stats = dashboard.StatsDashboard('engine', interval=0.01)
+    stats.start()
+    time.sleep(0.1)
+    stats.close()
+    assert len(calls) > 1
+    assert not stats._worker.thread.is_alive()
+
+
+def test_periodic_thread_runs_early_on_wake():
+    from periodic import PeriodicThread
+
+    calls = []
+    worker = PeriodicThread(lambda: calls.append(1), 3600, 'test-worker')
+    worker.start()
+    worker.wake()
+    for _ in range(100):
+        if calls:
+            break
+        time.sleep(0.01)
+    worker.close()
+    assert calls == [1]
+    assert not worker.thread.is_alive()
+
+
+def test_change_follower_survives_listener_errors(app):
+    from changes import ChangeFollower
+    from model import db
+
+    reports = []
+
+    def notify(updated=(), deleted=()):
+        reports.append((updated, deleted))
+        raise RuntimeError('listener failed')
+
+    with app.app_context():
+        engine = db.engine
+    follower = ChangeFollower(engine, notify, interval=0.01)
+    follower.start()
+    question = {'level': 1, 'text': 'Still followed?', 'correct_answer': 'Yes',
+                'wrong_answers': ['No', 'Maybe', 'Later'], 'info': ''}
+    client = app.test_client()
+    for number in range(2):
+        client.post('/api/questions', json=dict(question, text=f'Still followed {number}?'))
+        time.sleep(0.1)
+    follower.close()
+    assert len(reports) == 2
+    assert not follower._worker.thread.is_alive()
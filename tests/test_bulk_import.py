@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from bulk_import import make_row, read_ndjson
+
+
+def ndjson(*objects):
+    return [json.dumps(obj) + '\n' for obj in objects]
+
+
+VALID = {'level': 2, 'text': 'Capital of France?', 'correct_answer': 'Paris',
+         'wrong_answers': ['Lyon', 'Nice', 'Lille'], 'info': ''}
+
+
+def test_make_row_strips_and_hashes():
+    row = make_row('2', ' Q? ', ' A ', [' b', 'c ', 'd'], None)
+    assert row[:7] == (2, 'Q?', 'A', 'b', 'c', 'd', '')
+
+
+@pytest.mark.parametrize('field', ['text', 'correct_answer', 'info'])
+def test_numeric_field_is_rejected(field):
+    rows = list(read_ndjson(ndjson(dict(VALID, **{field: 42}))))
+    assert len(rows) == 1
+    assert isinstance(rows[0][1], ValueError)
+
+
+def test_numeric_wrong_answer_is_rejected():
+    rows = list(read_ndjson(ndjson(dict(VALID, wrong_answers=['Lyon', 7, 'Lille']))))
+    assert isinstance(rows[0][1], ValueError)
+
+
+def test_string_wrong_answers_is_rejected():
+    rows = list(read_ndjson(ndjson(dict(VALID, wrong_answers='xyz'))))
+    assert isinstance(rows[0][1], ValueError)
+
+
+def test_bad_line_is_rejected_alone(client):
+    body = ''.join(ndjson(dict(VALID, correct_answer=42), dict(VALID, wrong_answers='xyz'), VALID))
+    response = client.post('/api/questions/bulk', data=body)
+    assert response.status_code == 200
+    result = response.get_json()
+    assert result['inserted'] + result['updated'] == 1
+    assert result['rejected'] == 2
+    assert [error['line'] for error in result['errors']] == [1, 2]
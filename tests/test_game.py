@@ -0,0 +1,16 @@
+import sqlite3
+
+from model import db
+
+
+def test_restarts_keep_dealing_unseen_questions(app, client):
+    with app.app_context():
+        path = db.engine.url.database
+    connection = sqlite3.connect(path)
+    level_size = connection.execute('SELECT COUNT(*) FROM millionaire WHERE difficulty = 0').fetchone()[0]
+    connection.close()
+    seen = set()
+    for _ in range(level_size):
+        reply = client.post('/api/turn', json={'start': True}).get_json()
+        seen.add(reply['question']['text'])
+    assert len(seen) == level_size
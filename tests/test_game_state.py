@@ -0,0 +1,45 @@
+import time
+
+import pytest
+
+from game_state import ExpiringMap, GameStateStore, MemoryGameStateStore
+
+
+class Entry:
+    expires = 0.0
+
+
+def test_expiring_map_drops_expired_and_oldest_values():
+    items = ExpiringMap(ttl=0.05, max_size=2)
+    items.put('a', Entry())
+    time.sleep(0.1)
+    assert items.get('a') is None
+    items.put('b', Entry())
+    items.put('c', Entry())
+    assert len(items) == 2  # 'a' expired
+    items.put('d', Entry())
+    assert items.get('b') is None and items.get('d') is not None
+    assert len(items) == 2
+
+
+def test_memory_store_keeps_games_until_they_expire():
+    store = MemoryGameStateStore(ttl=0.05)
+    state = store.create()
+    assert store.get(state.game_id) is state
+    time.sleep(0.1)
+    assert store.get(state.game_id) is None
+
+
+def test_incomplete_store_fails_on_instantiation():
+    class NoDelete(GameStateStore):
+        def get(self, game_id):
+            return None
+
+        def save(self, state):
+            pass
+
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        NoDelete()
@@ -0,0 +1,34 @@
+import sys
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture
+def metrics_app(app):
+    from instrumentation import init_instrumentation
+    from model import db
+
+    app.config.update(METRICS_ENABLED=True, PROFILE_SAMPLE_RATE=1.0)
+    init_instrumentation(app, db)
+    return app
+
+
+def test_failed_statement_leaves_no_start_time(metrics_app):
+    from model import db
+
+    with metrics_app.app_context(), db.engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.exec_driver_sql('SELECT * FROM no_such_table')
+        assert not connection.info.get('metrics_start')
+
+
+def test_profiler_stops_when_a_view_raises(metrics_app):
+    @metrics_app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+
+    # TESTING propagates the exception, so after_request never runs
+    with pytest.raises(RuntimeError):
+        metrics_app.test_client().get('/boom')
+    assert sys.getprofile() is None
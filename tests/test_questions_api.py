@@ -0,0 +1,53 @@
+import pytest
+
+QUESTION = {'level': 1, 'text': 'Largest planet?', 'correct_answer': 'Jupiter',
+            'wrong_answers': ['Mars', 'Venus', 'Earth'], 'info': ''}
+
+
+@pytest.mark.parametrize('wrong_answers', [['Mars'], ['Mars', 'Venus', ''], ['Mars', 'Venus', None], 'xyz'])
+def test_post_requires_three_wrong_answers(client, wrong_answers):
+    response = client.post('/api/questions', json=dict(QUESTION, wrong_answers=wrong_answers))
+    assert response.status_code == 400
+
+
+def test_put_requires_three_wrong_answers(client):
+    created = client.post('/api/questions', json=QUESTION).get_json()
+    response = client.put(f"/api/questions/{created['id']}", json={'wrong_answers': ['Mars', 'Venus']})
+    assert response.status_code == 400
+    served = client.get(f"/api/questions/{created['id']}").get_json()
+    assert sorted(served['answers']) == ['Earth', 'Jupiter', 'Mars', 'Venus']
+
+
+def test_put_keeps_missing_fields(client):
+    created = client.post('/api/questions', json=QUESTION).get_json()
+    updated = client.put(f"/api/questions/{created['id']}", json={'info': 'Gas giant'}).get_json()
+    assert updated['info'] == 'Gas giant'
+    assert updated['text'] == QUESTION['text']
+    assert None not in updated['answers'] and len(updated['answers']) == 4
+
+
+@pytest.mark.parametrize('query', ['', '?limit=10'])
+def test_listing_etag_is_weak(client, query):
+    response = client.get(f'/api/questions{query}')
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert client.get(f'/api/questions{query}', headers={'If-None-Match': etag}).status_code == 304
+
+
+@pytest.mark.parametrize('body', [{'ids': [True]}, {'filter': {'level': True}}, {'ids': [1], 'set': {'level': False}},
+                                  {'ids': [1], 'set': {'info': 5}}])
+def test_bulk_requests_reject_bools_and_non_string_info(client, body):
+    def stored():
+        question = client.get('/api/questions/1').get_json()
+        return question['level'], question['info']
+
+    before = stored()
+    method = client.patch if 'set' in body else client.delete
+    assert method('/api/questions', json=body).status_code == 400
+    assert stored() == before
+
+
+def test_bulk_patch_sets_info(client):
+    response = client.patch('/api/questions', json={'ids': [1], 'set': {'info': ' Checked '}})
+    assert response.get_json()['updated'] == 1
+    assert client.get('/api/questions/1').get_json()['info'] == 'Checked'
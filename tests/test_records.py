@@ -0,0 +1,23 @@
+import pytest
+
+from records import shuffled_index
+
+SIZES = [1, 2, 3, 5, 7, 15, 16, 17, 31, 32, 33, 100, 255, 256, 257, 1000]
+SEEDS = [0, 1, 2, 12345, 2 ** 63 - 1, -1]
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('size', SIZES)
+def test_each_pass_is_a_permutation(size, seed):
+    for start in (0, size):
+        assert sorted(shuffled_index(position, size, seed) for position in range(start, start + size)) == \
+            list(range(size))
+
+
+def test_orders_depend_on_seed_and_pass():
+    size = 1000
+    first = [shuffled_index(position, size, 7) for position in range(size)]
+    assert first != list(range(size))
+    assert first != [shuffled_index(position, size, 8) for position in range(size)]
+    assert first != [shuffled_index(position, size, 7) for position in range(size, 2 * size)]
+
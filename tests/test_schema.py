@@ -0,0 +1,15 @@
+import sqlite3
+
+from sqlalchemy import create_engine
+
+from schema import MIGRATIONS, migrate
+
+
+def test_migrations_run_on_a_plain_question_table(tmp_path):
+    path = tmp_path / 'plain.sqlite3'
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE millionaire (id INTEGER PRIMARY KEY, difficulty INTEGER, question TEXT, '
+                       'correct_answer TEXT, answer2 TEXT, answer3 TEXT, answer4 TEXT, background_information TEXT)')
+    connection.close()
+    with create_engine(f'sqlite:///{path}').begin() as connection:
+        assert migrate(connection) == [version for version, _ in MIGRATIONS]
@@ -0,0 +1,33 @@
+import time
+
+from show import ShowRegistry
+
+
+def test_idle_shows_expire():
+    registry = ShowRegistry(ttl=0.05)
+    show = registry.create(None, 1)
+    assert registry.get(show.show_id) is show
+    time.sleep(0.1)
+    assert registry.get(show.show_id) is None
+    registry.create(None, 2)  # evicts the expired show
+    assert len(registry) == 1
+
+
+def test_host_actions_keep_a_show(app, client):
+    shows = app.extensions['millionaire'].shows
+    started = client.post('/api/show').get_json()
+    headers = {'X-Show-Token': started['host_token']}
+    show = shows.get(started['show'])
+    expires = show.expires
+    time.sleep(0.01)
+    assert client.post(f"/api/show/{started['show']}/next", headers=headers).status_code == 200
+    assert show.expires > expires
+    assert client.delete(f"/api/show/{started['show']}", headers=headers).status_code == 200
+    assert len(shows) == 0
+
+
+def test_max_shows():
+    registry = ShowRegistry(max_shows=3)
+    ids = [registry.create(None, seed).show_id for seed in range(5)]
+    assert len(registry) == 3
+    assert registry.get(ids[0]) is None and registry.get(ids[-1]) is not None
@@ -0,0 +1,61 @@
+import pytest
+
+from snapshot import FORMAT_VERSION, HEADER, MAGIC, QuestionSnapshot, write_snapshot
+
+ROWS = [
+    (3, 1, 'Wie heißt die Hauptstadt von Österreich?', 'Wien', 'Graz', 'Linz', 'Salzburg', 'Ümlaut-Info ✓'),
+    (1, 0, '2 + 2?', '4', '3', '5', '22', None),
+    (7, 2, '最大的行星？', '木星', '火星', '金星', None, ''),
+    (2, 0, 'Same answers?', '4', '3', '5', '22', 'shared strings'),
+]
+
+
+def fields(question):
+    return (question.id, question.level, question.text, question.correct_answer,
+            question.answer2, question.answer3, question.answer4, question.info)
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / 'questions.snap'
+    assert write_snapshot(path, ROWS, source_version=42) == len(ROWS)
+    snapshot = QuestionSnapshot(path)
+    assert snapshot.source_version == 42
+    assert len(snapshot) == len(ROWS)
+    assert snapshot.levels() == [0, 1, 2]
+    assert [snapshot.count(level) for level in (0, 1, 2, 9)] == [2, 1, 1, 0]
+    # None is stored as an empty string; questions are ordered by (level, id)
+    expected = sorted((tuple('' if value is None else value for value in row) for row in ROWS),
+                      key=lambda row: (row[1], row[0]))
+    assert [fields(question) for question in snapshot] == expected
+
+
+def test_get_nth_deals_each_question_of_a_level_once(tmp_path):
+    path = tmp_path / 'questions.snap'
+    write_snapshot(path, ROWS)
+    snapshot = QuestionSnapshot(path)
+    dealt = [snapshot.get_nth(0, 5, position) for position in range(2)]
+    assert sorted(question.id for question in dealt) == [1, 2]
+    assert all(question.level == 0 and question.permutation is not None for question in dealt)
+    assert snapshot.get_nth(9, 5, 0) is None
+
+
+def test_empty_snapshot(tmp_path):
+    path = tmp_path / 'empty.snap'
+    assert write_snapshot(path, []) == 0
+    snapshot = QuestionSnapshot(path)
+    assert len(snapshot) == 0
+    assert snapshot.levels() == []
+    assert snapshot.get_nth(0, 1, 0) is None and snapshot.get_random(0) is None
+
+
+@pytest.mark.parametrize('magic, version', [(b'NOTSNAP\x00', FORMAT_VERSION), (MAGIC, FORMAT_VERSION + 1)])
+def test_bad_header_is_rejected(tmp_path, magic, version):
+    path = tmp_path / 'questions.snap'
+    write_snapshot(path, ROWS)
+    with open(path, 'r+b') as file:
+        header = list(HEADER.unpack(file.read(HEADER.size)))
+        header[0], header[1] = magic, version
+        file.seek(0)
+        file.write(HEADER.pack(*header))
+    with pytest.raises(ValueError):
+        QuestionSnapshot(path)